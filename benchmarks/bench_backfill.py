@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da carga histórica por exportação CSV contra a extração paginada
+Este script mede, contra o Graph API local com um histórico grande (padrão: 100k leads em
+10 formulários, distribuídos em 180 dias, 50 ms por chamada), a leitura do mesmo intervalo
+pelos dois caminhos do main.py: backfill() (exportações CSV em fatias de datas, em paralelo)
+e extract_leads() (páginas do edge /leads com days_back cobrindo o intervalo). Só a leitura
+é medida: o envio ao B2Cor é o mesmo nos dois caminhos e fica de fora. Cada caminho roda em
+um processo novo.
+
+Uso:
+    python benchmarks/bench_backfill.py
+    python benchmarks/bench_backfill.py --leads 500000 --days 365 --shard-days 30 --workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import StubGraphServer, StubB2CorServer
+from benchmarks.bench_pipeline import build_config, create_integration, run_in_subprocess
+from scripts.metrics import peak_rss_bytes
+
+
+def run_read(path, graph_url, b2cor_url, form_ids, options):
+    """
+    Lê o histórico por um dos caminhos (chamado em um processo novo)
+
+    Args:
+        path (str): 'csv' (backfill) ou 'paged' (extract_leads)
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+        form_ids (list): Formulários
+        options (dict): Opções da integração (ver bench_pipeline.build_config), days,
+            shard_days e backfill_workers
+
+    Returns:
+        dict: seconds, leads, leads_per_second e peak_rss_bytes
+    """
+    logging.basicConfig(level=logging.DEBUG if options['verbose'] else logging.ERROR)
+    state_dir = tempfile.mkdtemp(prefix='bench_backfill_')
+    try:
+        config = build_config(graph_url, b2cor_url, form_ids, options)
+        config['facebook'].update({
+            'days_back': options['days'] + 1,
+            'backfill_shard_days': options['shard_days'],
+            'backfill_workers': options['backfill_workers']
+        })
+        integration = create_integration(state_dir, config)
+
+        started_at = time.perf_counter()
+        if path == 'csv':
+            # Só a exportação é medida
+            integration.send_leads = lambda leads_file, **kwargs: {'total': 0}
+            today = datetime.now()
+            integration.backfill((today - timedelta(days=options['days'])).strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d'))
+            leads = integration.run_stats.get('backfill', {}).get('leads_new', 0)
+        else:
+            integration.extract_leads()
+            leads = integration.run_stats.get('extract', {}).get('leads_new', 0)
+        seconds = time.perf_counter() - started_at
+
+        return {
+            'seconds': seconds,
+            'leads': leads,
+            'leads_per_second': leads / seconds if seconds > 0 else None,
+            'peak_rss_bytes': peak_rss_bytes()
+        }
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga histórica por exportação CSV contra a extração paginada')
+    parser.add_argument('--leads', type=int, default=100000, help='Número total de leads (padrão: 100000)')
+    parser.add_argument('--forms', type=int, default=10, help='Número de formulários (padrão: 10)')
+    parser.add_argument('--days', type=int, default=180, help='Dias de histórico (padrão: 180)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latência de cada chamada ao Graph API em segundos (padrão: 0.05)')
+    parser.add_argument('--workers', type=int, default=4, help='facebook.max_workers e facebook.backfill_workers (padrão: 4)')
+    parser.add_argument('--shard-days', type=int, default=7, help='facebook.backfill_shard_days (padrão: 7)')
+    parser.add_argument('--output', help='Arquivo JSON dos resultados (opcional)')
+    parser.add_argument('--verbose', action='store_true', help='Exibe os logs da integração')
+    args = parser.parse_args()
+
+    options = {
+        'facebook_workers': args.workers,
+        'b2cor_workers': 1,
+        'batch_size': 50,
+        'batch_requests': False,
+        'graph_rpm': 0,
+        'b2cor_rpm': 0,
+        'max_retries': 5,
+        'backoff_base': 0.01,
+        'days': args.days,
+        'shard_days': args.shard_days,
+        'backfill_workers': args.workers,
+        'verbose': args.verbose
+    }
+    # Leads de cada formulário espalhados pelo intervalo, o mais antigo perto do início
+    spacing = max(1, (args.days - 1) * 86400 // max(1, args.leads // args.forms))
+
+    results = {'leads': args.leads, 'forms': args.forms, 'days': args.days, 'latency': args.latency, 'runs': {}}
+    with StubGraphServer(total_leads=args.leads, forms=args.forms, latency=args.latency, spacing=spacing) as graph, \
+            StubB2CorServer() as b2cor:
+        for path, name in (('csv', 'exportação CSV'), ('paged', 'paginada')):
+            requests_before = graph.stats['requests']
+            summary = run_in_subprocess(run_read, path, graph.url, b2cor.url, graph.form_ids, options)
+            summary['api_calls'] = graph.stats['requests'] - requests_before
+            results['runs'][path] = summary
+            print(
+                f"{name:<16} {summary['leads']:>8} leads {summary['seconds']:>8.2f}s "
+                f"{summary['leads_per_second'] or 0:>10.1f} leads/s  chamadas: {summary['api_calls']:<6} "
+                f"memória: {(summary['peak_rss_bytes'] or 0) / 2 ** 20:.1f} MiB"
+            )
+
+    csv_run, paged_run = results['runs']['csv'], results['runs']['paged']
+    print(f"Exportação CSV {paged_run['seconds'] / csv_run['seconds']:.1f}x mais rápida que a extração paginada.")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Resultados salvos em: {args.output}")
+
+    if csv_run['leads'] != paged_run['leads']:
+        print(f"Os caminhos leram números diferentes de leads: {csv_run['leads']} e {paged_run['leads']}.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
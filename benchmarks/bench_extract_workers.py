@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da extração por formulário com diferentes números de workers
+Este script mede o tempo de extract_leads contra o Graph API local com latência por chamada
+(ex: 80 formulários, 50 ms por página), variando facebook.max_workers, e opcionalmente com
+as requisições em lote. O tempo deve cair à medida que o número de workers aumenta, até o
+limite de taxa configurado (--graph-rpm).
+
+Uso:
+    python benchmarks/bench_extract_workers.py
+    python benchmarks/bench_extract_workers.py --forms 80 --leads 40000 --latency 0.1 --workers 1 4 16
+"""
+
+import os
+import sys
+import json
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import StubGraphServer, StubB2CorServer
+from benchmarks.bench_pipeline import run_case, run_in_subprocess
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da extração com diferentes números de workers')
+    parser.add_argument('--forms', type=int, default=80, help='Número de formulários (padrão: 80)')
+    parser.add_argument('--leads', type=int, default=16000, help='Número total de leads (padrão: 16000)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latência de cada chamada ao Graph API em segundos (padrão: 0.05)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Valores de facebook.max_workers')
+    parser.add_argument('--graph-rpm', type=int, default=0, help='facebook.requests_per_minute (0 = sem limite)')
+    parser.add_argument('--batch-requests', action='store_true', help='Mede também a extração com requisições em lote')
+    parser.add_argument('--output', help='Arquivo JSON dos resultados (opcional)')
+    args = parser.parse_args()
+
+    options = {
+        'b2cor_workers': 1,
+        'batch_size': 50,
+        'batch_requests': False,
+        'graph_rpm': args.graph_rpm,
+        'b2cor_rpm': 0,
+        'max_retries': 5,
+        'backoff_base': 0.01,
+        'verbose': False
+    }
+    variants = [(f"workers={workers}", dict(options, facebook_workers=workers)) for workers in args.workers]
+    if args.batch_requests:
+        variants.append(('lote', dict(options, facebook_workers=1, batch_requests=True)))
+
+    results = {'forms': args.forms, 'leads': args.leads, 'latency': args.latency, 'runs': {}}
+    with StubGraphServer(total_leads=args.leads, forms=args.forms, latency=args.latency) as graph, StubB2CorServer() as b2cor:
+        baseline_seconds = None
+        for name, variant in variants:
+            summary = run_in_subprocess(run_case, 'extract_leads', graph.url, b2cor.url, graph.form_ids, variant)
+            results['runs'][name] = summary
+            baseline_seconds = baseline_seconds or summary['seconds']
+            print(
+                f"{name:<12} {summary['leads_total']:>7} leads {summary['seconds']:>7.2f}s "
+                f"{summary['leads_per_second'] or 0:>9.1f} leads/s  chamadas: {summary['api_calls']:<6} "
+                f"aceleração: {baseline_seconds / summary['seconds']:.1f}x"
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Resultados salvos em: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do mapeamento de campos (field_data -> campos do B2Cor)
+Este script gera leads sintéticos (padrão: 1 milhão, em vários formulários, com nomes em
+maiúsculas, emails com espaços, estados por sigla ou por nome e telefones em vários formatos)
+e mede a vazão em leads/s do FieldMapper.transform por lotes, como em send_leads com
+b2cor.map_fields, contra map_lead(): a mesma conversão escrita lead a lead, com operações de
+str/regex por valor, como um enviador faria ao montar cada payload. Também confere, em uma
+amostra, que os dois caminhos produzem os mesmos campos.
+
+Uso:
+    python benchmarks/bench_field_mapping.py
+    python benchmarks/bench_field_mapping.py --leads 200000 --chunk 500 --per-lead-leads 20000
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import argparse
+import unicodedata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import make_lead
+from scripts.field_mapping import FieldMapper, DEFAULT_MAPPING, PHONE_TARGETS, UFS, UF_NAMES
+from scripts.metrics import peak_rss_bytes
+
+NAMES = ('MARIA DA SILVA', '  joão  dos santos ', 'Ana de Souza e Lima', 'PEDRO HENRIQUE')
+EMAILS = ('{local}@Exemplo.com.br', ' {local}@exemplo.com.br ', '{local}@EXEMPLO.COM')
+STATES = ('SP', 'São Paulo', 'rio de janeiro', ' mg ', 'Paraná', 'XX')
+PHONES = ('+55 (11) 9{number}', '11 9{number}', '(21) 3{short}-{tail}', '123')
+
+NAME_PARTICLES = ('Da', 'De', 'Do', 'Das', 'Dos', 'E')
+PHONE = re.compile(r'(?:55(?=\d{10,11}$))?(\d{2})(\d{8,9})')
+
+
+def map_lead(lead, spec=DEFAULT_MAPPING):
+    """
+    Converte um lead nos campos do B2Cor, um valor por vez (referência do benchmark)
+
+    Args:
+        lead (dict): Lead no formato do Graph API
+        spec (dict): Campo do B2Cor -> nomes aceitos no field_data (em minúsculas)
+
+    Returns:
+        dict: Campos do B2Cor preenchidos
+    """
+    row = {}
+    for field in lead.get('field_data') or ():
+        if field.get('values'):
+            row[str(field.get('name', '')).lower()] = field['values'][0]
+
+    payload = {}
+    for target, names in spec.items():
+        value = next((row[name] for name in names if row.get(name)), '')
+        if not value:
+            continue
+        value = str(value)
+        if target in PHONE_TARGETS:
+            match = PHONE.fullmatch(''.join(char for char in value if char in '0123456789'))
+            if match:
+                payload[f"{target}_ddd"], payload[f"{target}_numero"] = match.groups()
+        elif target in ('nome', 'cidade'):
+            value = ' '.join(value.split()).title()
+            for particle in NAME_PARTICLES:
+                value = value.replace(f" {particle} ", f" {particle.lower()} ")
+            payload[target] = value
+        elif target == 'email':
+            payload[target] = ''.join(value.split()).lower()
+        elif target == 'uf':
+            value = unicodedata.normalize('NFKD', ' '.join(value.split()).upper()).encode('ascii', 'ignore').decode('ascii')
+            value = value if value in UFS else UF_NAMES.get(value, '')
+            if value:
+                payload[target] = value
+        else:
+            payload[target] = ' '.join(value.split())
+    return {name: value for name, value in payload.items() if value}
+
+
+def synthetic_leads(start, count, forms, newest_ts):
+    """
+    Gera leads sintéticos com valores em vários formatos
+
+    Args:
+        start (int): Posição do primeiro lead
+        count (int): Número de leads
+        forms (int): Número de formulários (os leads são distribuídos entre eles)
+        newest_ts (int): created_time do lead mais recente (timestamp Unix)
+
+    Returns:
+        list: Leads no formato do Graph API
+    """
+    leads = []
+    for number in range(start, start + count):
+        lead = make_lead(number % forms, number // forms, newest_ts)
+        digits = f"{number % 10 ** 8:08d}"
+        values = {
+            'full_name': NAMES[number % len(NAMES)],
+            'email': EMAILS[number % len(EMAILS)].format(local=f"Lead{number}"),
+            'state': STATES[number % len(STATES)],
+            'phone_number': PHONES[number % len(PHONES)].format(number=digits, short=digits[:3], tail=digits[3:7])
+        }
+        for field in lead['field_data']:
+            if field['name'] in values:
+                field['values'] = [values[field['name']]]
+        leads.append(lead)
+    return leads
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do mapeamento de campos para o B2Cor')
+    parser.add_argument('--leads', type=int, default=1000000, help='Número de leads (padrão: 1000000)')
+    parser.add_argument('--forms', type=int, default=5, help='Número de formulários (padrão: 5)')
+    parser.add_argument('--chunk', type=int, default=50000, help='Leads por chamada de transform (padrão: 50000)')
+    parser.add_argument('--per-lead-leads', type=int, default=100000, help='Leads convertidos um por vez (padrão: 100000)')
+    parser.add_argument('--output', help='Arquivo JSON dos resultados (opcional)')
+    args = parser.parse_args()
+
+    mapper = FieldMapper()
+    newest_ts = int(time.time())
+
+    # Os leads são gerados por partes: 1 milhão de leads não precisam estar em memória ao mesmo tempo
+    batch_seconds = 0.0
+    for start in range(0, args.leads, args.chunk):
+        leads = synthetic_leads(start, min(args.chunk, args.leads - start), args.forms, newest_ts)
+        started_at = time.perf_counter()
+        mapper.transform(leads)
+        batch_seconds += time.perf_counter() - started_at
+
+    sample = synthetic_leads(0, min(args.per_lead_leads, args.leads), args.forms, newest_ts)
+    started_at = time.perf_counter()
+    per_lead = [map_lead(lead) for lead in sample]
+    per_lead_seconds = time.perf_counter() - started_at
+
+    mismatches = sum(1 for batch, single in zip(mapper.transform(sample), per_lead) if batch != single)
+
+    results = {
+        'leads': args.leads,
+        'forms': args.forms,
+        'chunk': args.chunk,
+        'batch_seconds': batch_seconds,
+        'batch_leads_per_second': args.leads / batch_seconds if batch_seconds > 0 else None,
+        'per_lead_leads': len(sample),
+        'per_lead_seconds': per_lead_seconds,
+        'per_lead_leads_per_second': len(sample) / per_lead_seconds if per_lead_seconds > 0 else None,
+        'mismatches': mismatches,
+        'peak_rss_bytes': peak_rss_bytes()
+    }
+
+    print(f"Em lotes de {args.chunk} (FieldMapper): {args.leads} leads em {batch_seconds:.2f}s ({results['batch_leads_per_second'] or 0:,.0f} leads/s)")
+    print(f"Um lead por vez (map_lead): {len(sample)} leads em {per_lead_seconds:.2f}s ({results['per_lead_leads_per_second'] or 0:,.0f} leads/s)")
+    if results['batch_leads_per_second'] and results['per_lead_leads_per_second']:
+        print(f"Aceleração: {results['batch_leads_per_second'] / results['per_lead_leads_per_second']:.1f}x")
+    print(f"Divergências entre os dois caminhos na amostra: {mismatches}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Resultados salvos em: {args.output}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
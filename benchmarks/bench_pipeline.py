@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do pipeline de leads contra servidores locais do Graph API e do B2Cor
+Este script mede extract_leads, send_leads e process do main.py com 1k, 10k e 100k leads
+(configurável), com latência, taxa de erros e limite de taxa ajustáveis em cada servidor.
+Cada caso roda em um processo novo (pico de memória isolado), enquanto os servidores rodam
+no processo principal. Os resultados são gravados em JSON e podem ser comparados com uma
+execução de referência (--baseline), encerrando com código 1 se houver regressões. O envio
+faz 4 chamadas por lead (criação, funil, responsável, histórico): o caso de 100k leads leva
+vários minutos.
+
+Uso:
+    python benchmarks/bench_pipeline.py --output benchmarks/results.json
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 --baseline benchmarks/results.json
+    python benchmarks/bench_pipeline.py --b2cor-error-rate 0.02 --graph-throttle-rate 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import StubGraphServer, StubB2CorServer
+from scripts.metrics import compare_summaries
+
+STAGES = ('extract_leads', 'send_leads', 'process')
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def build_config(graph_url, b2cor_url, form_ids, options):
+    """
+    Monta a configuração da integração apontada para os servidores locais
+
+    Args:
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+        form_ids (list): Formulários a extrair
+        options (dict): Opções do benchmark (workers, lotes, backoff, ...)
+
+    Returns:
+        dict: Configuração no formato do config.json
+    """
+    return {
+        'facebook': {
+            'form_ids': form_ids,
+            'days_back': 30,
+            'max_workers': options['facebook_workers'],
+            'incremental': True,
+            'batch_requests': options['batch_requests'],
+            'graph_url': graph_url,
+            'export_url': f"{graph_url}/ads/lead_gen/export_csv/",
+            'requests_per_minute': options['graph_rpm'],
+            'forms_cache_ttl': 0
+        },
+        'b2cor': {
+            'base_url': b2cor_url,
+            'api_key': 'benchmark',
+            'max_workers': options['b2cor_workers'],
+            'batch_size': options['batch_size'],
+            'requests_per_minute': options['b2cor_rpm'],
+            'journal': True
+        },
+        'general': {
+            'snapshot_store': True,
+            'dedup': True,
+            'auth_cache_ttl': 0,
+            'retry': {
+                'max_retries': options['max_retries'],
+                'backoff_base': options['backoff_base'],
+                'backoff_max': 1.0
+            }
+        }
+    }
+
+
+def create_integration(state_dir, config):
+    """
+    Cria a integração com os clientes dos servidores locais e a política HTTP instalada
+
+    Args:
+        state_dir (str): Diretório de estado (leads, índices, diários)
+        config (dict): Configuração da integração
+
+    Returns:
+        FacebookB2CorIntegration: Integração pronta para extract_leads/send_leads/process
+    """
+    from main import FacebookB2CorIntegration
+
+    config_file = os.path.join(state_dir, 'config.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4)
+
+    return use_stub_clients(FacebookB2CorIntegration(config_file, state_dir=state_dir))
+
+
+def use_stub_clients(integration):
+    """
+    Substitui os clientes da integração pelos clientes dos servidores locais (no lugar de setup())
+
+    Args:
+        integration (FacebookB2CorIntegration): Integração carregada de uma configuração de build_config()
+
+    Returns:
+        FacebookB2CorIntegration: A própria integração, com a política HTTP instalada
+    """
+    from benchmarks.stub_clients import StubAuth, StubLeadsExtractor, StubLeadsSender
+
+    integration.facebook_auth = integration.b2cor_auth = StubAuth()
+    integration.facebook_extractor = StubLeadsExtractor(integration.config['facebook']['graph_url'])
+    integration.b2cor_sender = StubLeadsSender(integration.config['b2cor']['base_url'])
+    integration._install_http_policy()
+    return integration
+
+
+def run_case(stage, graph_url, b2cor_url, form_ids, options):
+    """
+    Executa um caso do benchmark (chamado em um processo novo)
+
+    Args:
+        stage (str): 'extract_leads', 'send_leads' ou 'process'
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+        form_ids (list): Formulários a extrair
+        options (dict): Opções do benchmark
+
+    Returns:
+        dict: Indicadores no formato de benchmark_summary(), com o tempo do caso
+    """
+    logging.basicConfig(level=logging.DEBUG if options['verbose'] else logging.ERROR)
+    state_dir = tempfile.mkdtemp(prefix='bench_')
+    try:
+        integration = create_integration(state_dir, build_config(graph_url, b2cor_url, form_ids, options))
+
+        leads_file = None
+        if stage == 'send_leads':
+            # A extração não entra na medição do envio
+            leads_file = integration.extract_leads()
+            integration.metrics.reset()
+            integration.http_metrics.reset()
+
+        started_at = time.perf_counter()
+        if stage == 'extract_leads':
+            ok = integration.extract_leads() is not None
+        elif stage == 'send_leads':
+            ok = integration.send_leads(leads_file) is not None
+        else:
+            ok = integration.process()
+        seconds = time.perf_counter() - started_at
+
+        if stage == 'extract_leads':
+            leads_total = integration.run_stats.get('extract', {}).get('leads_new', 0)
+        else:
+            leads_total = integration.run_stats.get('send', {}).get('total', 0)
+
+        summary = integration.benchmark_summary()
+        summary.update({
+            'ok': bool(ok),
+            'seconds': seconds,
+            'leads_total': leads_total,
+            'leads_per_second': leads_total / seconds if seconds > 0 else None,
+            'failed': integration.run_stats.get('send', {}).get('failed', 0)
+        })
+        return summary
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def run_in_subprocess(function, *args):
+    """
+    Executa uma função em um processo novo (spawn), para medir o pico de memória isolado
+
+    Args:
+        function (callable): Função de nível de módulo
+        *args: Argumentos da função
+
+    Returns:
+        object: Retorno da função
+    """
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(function, args)
+
+
+def server_options(args, prefix):
+    """
+    Obtém os controles de falhas de um servidor a partir dos argumentos
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando
+        prefix (str): 'graph' ou 'b2cor'
+
+    Returns:
+        dict: latency, error_rate, throttle_rate e seed
+    """
+    return {
+        'latency': getattr(args, f"{prefix}_latency"),
+        'error_rate': getattr(args, f"{prefix}_error_rate"),
+        'throttle_rate': getattr(args, f"{prefix}_throttle_rate"),
+        'seed': args.seed
+    }
+
+
+def check_results(results, baseline, tolerance):
+    """
+    Compara cada caso com o mesmo caso de uma execução de referência
+
+    Args:
+        results (dict): Resultados atuais
+        baseline (dict): Resultados de referência
+        tolerance (float): Variação relativa aceita
+
+    Returns:
+        list: Regressões encontradas, prefixadas pelo caso
+    """
+    regressions = []
+    for name, summary in results['runs'].items():
+        reference = baseline.get('runs', {}).get(name)
+        if reference:
+            regressions.extend(f"{name}: {regression}" for regression in compare_summaries(summary, reference, tolerance))
+    return regressions
+
+
+def print_summary(name, summary, server_stats):
+    """
+    Exibe o resultado de um caso
+
+    Args:
+        name (str): Nome do caso (etapa/tamanho)
+        summary (dict): Indicadores do caso
+        server_stats (dict): Requisições, erros e limites de taxa injetados pelos servidores
+    """
+    rss = summary.get('peak_rss_bytes') or 0
+    rate = summary.get('leads_per_second') or 0
+    print(
+        f"{name:<22} {summary['leads_total']:>8} leads {summary['seconds']:>8.2f}s {rate:>9.1f} leads/s "
+        f"{rss / 2 ** 20:>7.1f} MiB  chamadas: {summary.get('api_calls') or 0:<7} "
+        f"falhas: {summary.get('failed', 0):<5} injetados: {server_stats['errors']} erros, {server_stats['throttled']} limites"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline de leads contra servidores locais')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Números de leads (padrão: 1000 10000 100000)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help='Etapas medidas')
+    parser.add_argument('--forms', type=int, default=10, help='Número de formulários')
+    parser.add_argument('--facebook-workers', type=int, default=4, help='facebook.max_workers')
+    parser.add_argument('--b2cor-workers', type=int, default=8, help='b2cor.max_workers')
+    parser.add_argument('--batch-size', type=int, default=50, help='b2cor.batch_size')
+    parser.add_argument('--batch-requests', action='store_true', help='Extrai com requisições em lote do Graph API')
+    parser.add_argument('--graph-rpm', type=int, default=0, help='facebook.requests_per_minute (0 = sem limite)')
+    parser.add_argument('--b2cor-rpm', type=int, default=0, help='b2cor.requests_per_minute (0 = sem limite)')
+    parser.add_argument('--max-retries', type=int, default=5, help='general.retry.max_retries')
+    parser.add_argument('--backoff-base', type=float, default=0.01, help='general.retry.backoff_base (segundos)')
+    for prefix, name in (('graph', 'Graph API'), ('b2cor', 'B2Cor')):
+        parser.add_argument(f"--{prefix}-latency", type=float, default=0.0, help=f"Latência de cada resposta do {name} (segundos)")
+        parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.0, help=f"Fração de respostas 500 do {name}")
+        parser.add_argument(f"--{prefix}-throttle-rate", type=float, default=0.0, help=f"Fração de respostas de limite de taxa do {name}")
+    parser.add_argument('--seed', type=int, default=0, help='Semente do sorteio das falhas')
+    parser.add_argument('--output', help='Arquivo JSON dos resultados (padrão: benchmarks/results_<data>.json)')
+    parser.add_argument('--baseline', help='Resultados de referência: encerra com código 1 se houver regressão')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Variação aceita em relação à referência (padrão: 0.2)')
+    parser.add_argument('--verbose', action='store_true', help='Exibe os logs da integração')
+    args = parser.parse_args()
+
+    options = {
+        'facebook_workers': args.facebook_workers,
+        'b2cor_workers': args.b2cor_workers,
+        'batch_size': args.batch_size,
+        'batch_requests': args.batch_requests,
+        'graph_rpm': args.graph_rpm,
+        'b2cor_rpm': args.b2cor_rpm,
+        'max_retries': args.max_retries,
+        'backoff_base': args.backoff_base,
+        'verbose': args.verbose
+    }
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': dict(options, forms=args.forms, graph=server_options(args, 'graph'), b2cor=server_options(args, 'b2cor')),
+        'runs': {}
+    }
+
+    for size in args.sizes:
+        with StubGraphServer(total_leads=size, forms=args.forms, **server_options(args, 'graph')) as graph:
+            for stage in args.stages:
+                # Um B2Cor vazio por caso: os leads de um caso não contam como duplicados no seguinte
+                with StubB2CorServer(**server_options(args, 'b2cor')) as b2cor:
+                    before = {key: graph.stats[key] for key in ('errors', 'throttled')}
+                    summary = run_in_subprocess(run_case, stage, graph.url, b2cor.url, graph.form_ids, options)
+                    injected = {key: graph.stats[key] - before[key] + b2cor.stats[key] for key in before}
+
+                name = f"{stage}/{size}"
+                summary['injected'] = injected
+                results['runs'][name] = summary
+                print_summary(name, summary, injected)
+
+    # O maior processamento completo também serve de referência para main.py --baseline
+    process_runs = [name for name in results['runs'] if name.startswith('process/')]
+    if process_runs:
+        results['benchmark'] = results['runs'][process_runs[-1]]
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', f"results_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4)
+    print(f"Resultados salvos em: {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = check_results(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regressão de desempenho: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("Nenhuma regressão em relação à referência.")
+
+
+if __name__ == '__main__':
+    main()
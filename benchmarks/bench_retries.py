@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cenários de limite de taxa e erros 5xx reproduzidos pelos servidores locais
+Este script executa a extração, o envio e a conciliação contra o Graph API e o B2Cor locais
+configurados para responder uma sequência fixa de falhas (limite de taxa do Graph API, 429
+com Retry-After, 500) e confere os contadores da política HTTP (novas tentativas, desistências,
+pausas por uso, POSTs não repetidos) e o resultado de cada cenário. Encerra com código 1 se
+algum cenário divergir do esperado.
+
+Uso:
+    python benchmarks/bench_retries.py
+    python benchmarks/bench_retries.py --scenario b2cor_429 --verbose
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import StubGraphServer, StubB2CorServer
+from benchmarks.bench_pipeline import build_config, create_integration
+
+LEADS = 200
+FORMS = 2
+MAX_RETRIES = 5
+
+# Cada cenário: etapa executada, controles dos servidores e valores esperados
+# (além de EXPECT_ALWAYS)
+# Em todos os cenários: nenhum lead é criado duas vezes no B2Cor
+EXPECT_ALWAYS = {'repeated': 0}
+
+SCENARIOS = [
+    {
+        'name': 'graph_throttle',
+        'description': 'Graph API responde 3 erros de limite de taxa (código 4) seguidos',
+        'stage': 'extract_leads',
+        'graph': {'replay': ['throttle'] * 3},
+        'expect': {'graph.retries': 3, 'graph.give_ups': 0, 'leads': LEADS}
+    },
+    {
+        'name': 'graph_500',
+        'description': 'Graph API responde 500 duas vezes (GET é repetido)',
+        'stage': 'extract_leads',
+        'graph': {'replay': ['error'] * 2},
+        'expect': {'graph.retries': 2, 'graph.give_ups': 0, 'leads': LEADS}
+    },
+    {
+        'name': 'graph_give_up',
+        'description': f"Graph API responde 500 em {MAX_RETRIES + 1} tentativas de um formulário",
+        'stage': 'extract_leads',
+        'graph': {'replay': ['error'] * (MAX_RETRIES + 1)},
+        'expect': {'graph.retries': MAX_RETRIES, 'graph.give_ups': 1, 'leads': LEADS - LEADS // FORMS}
+    },
+    {
+        'name': 'graph_usage',
+        'description': 'Graph API informa 76% de uso em x-app-usage (chamadas desaceleradas)',
+        'stage': 'extract_leads',
+        'graph': {'usage_percent': 76},
+        'expect': {'graph.usage_pauses': FORMS, 'graph.retries': 0, 'leads': LEADS}
+    },
+    {
+        'name': 'b2cor_429',
+        'description': 'B2Cor responde 429 com Retry-After três vezes (POST é repetido)',
+        'stage': 'send_leads',
+        'b2cor': {'replay': ['throttle'] * 3},
+        'expect': {'b2cor.retries': 3, 'b2cor.unsafe_not_retried': 0, 'failed': 0, 'created': LEADS}
+    },
+    {
+        'name': 'b2cor_500_post',
+        'description': 'B2Cor responde 500 na criação de um lead (POST não é repetido, nenhum lead é criado duas vezes)',
+        'stage': 'send_leads',
+        'b2cor': {'replay': ['error']},
+        'expect': {'b2cor.retries': 0, 'b2cor.unsafe_not_retried': 1, 'failed': 1, 'created': LEADS - 1}
+    },
+    {
+        'name': 'b2cor_find_500',
+        'description': 'B2Cor responde 500 duas vezes no /lead/find da conciliação (POST de leitura é repetido)',
+        'stage': 'reconcile',
+        'b2cor_after_send': {'replay': ['error'] * 2},
+        'expect': {'b2cor.retries': 2, 'remote_total': LEADS, 'missing': 0}
+    }
+]
+
+
+def run_scenario(scenario, options):
+    """
+    Executa um cenário
+
+    Args:
+        scenario (dict): Cenário de SCENARIOS
+        options (dict): Opções da integração (ver bench_pipeline.build_config)
+
+    Returns:
+        dict: Valores observados (contadores HTTP por serviço e resultados da etapa)
+    """
+    state_dir = tempfile.mkdtemp(prefix='bench_retries_')
+    graph = StubGraphServer(total_leads=LEADS, forms=FORMS, **scenario.get('graph', {})).start()
+    b2cor = StubB2CorServer(**scenario.get('b2cor', {})).start()
+    try:
+        integration = create_integration(state_dir, build_config(graph.url, b2cor.url, graph.form_ids, options))
+        started_at = time.perf_counter()
+
+        observed = {}
+        leads_file = integration.extract_leads()
+        observed['leads'] = integration.run_stats.get('extract', {}).get('leads_new', 0)
+
+        if scenario['stage'] in ('send_leads', 'reconcile'):
+            stats = integration.send_leads(leads_file) or {}
+            observed['failed'] = stats.get('failed', 0)
+
+        if scenario['stage'] == 'reconcile':
+            integration.http_metrics.reset()
+            b2cor.replay = list(scenario['b2cor_after_send']['replay'])
+            report = integration.reconcile() or {}
+            observed['remote_total'] = report.get('remote_total')
+            observed['missing'] = len(report.get('missing', []))
+
+        observed['seconds'] = time.perf_counter() - started_at
+        observed['created'] = b2cor.stats['created']
+        observed['repeated'] = b2cor.stats['repeated']
+        http = integration.http_metrics.snapshot()
+        observed['graph'] = http.get(graph.url_host, {})
+        observed['b2cor'] = http.get(b2cor.url_host, {})
+        return observed
+    finally:
+        graph.stop()
+        b2cor.stop()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def check(observed, expect):
+    """
+    Compara os valores observados com os esperados
+
+    Args:
+        observed (dict): Valores observados
+        expect (dict): Valores esperados ('serviço.contador' ou nome do resultado)
+
+    Returns:
+        list: Divergências encontradas
+    """
+    mismatches = []
+    for key, expected in expect.items():
+        if '.' in key:
+            service, counter = key.split('.', 1)
+            value = observed.get(service, {}).get(counter, 0)
+        else:
+            value = observed.get(key)
+        if value != expected:
+            mismatches.append(f"{key}: esperado {expected}, obtido {value}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cenários de limite de taxa e erros 5xx contra servidores locais')
+    parser.add_argument('--scenario', nargs='+', choices=[scenario['name'] for scenario in SCENARIOS], help='Cenários a executar (padrão: todos)')
+    parser.add_argument('--verbose', action='store_true', help='Exibe os logs da integração')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    options = {
+        'facebook_workers': 1,
+        'b2cor_workers': 1,
+        'batch_size': 50,
+        'batch_requests': False,
+        'graph_rpm': 0,
+        'b2cor_rpm': 0,
+        'max_retries': MAX_RETRIES,
+        'backoff_base': 0.01,
+        'verbose': args.verbose
+    }
+
+    failures = 0
+    for scenario in SCENARIOS:
+        if args.scenario and scenario['name'] not in args.scenario:
+            continue
+        observed = run_scenario(scenario, options)
+        mismatches = check(observed, {**EXPECT_ALWAYS, **scenario['expect']})
+        failures += bool(mismatches)
+
+        counters = {service: {key: value for key, value in observed[service].items() if key != 'requests' and value} for service in ('graph', 'b2cor')}
+        print(f"[{'OK' if not mismatches else 'FALHA'}] {scenario['name']}: {scenario['description']} ({observed['seconds']:.2f}s)")
+        print(f"      Graph API: {counters['graph']}  B2Cor: {counters['b2cor']}")
+        for mismatch in mismatches:
+            print(f"      {mismatch}")
+
+    if failures:
+        print(f"{failures} cenários divergiram do esperado.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
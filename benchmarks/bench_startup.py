@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da inicialização do main.py
+Este script mede, em processos novos:
+- o tempo de importação do main.py com python -X importtime (total, módulos mais lentos e se
+  o requests e os clientes de API foram importados sem necessidade)
+- o tempo de python main.py --help em relação a python -c pass
+- o tempo desde o início do processo até a primeira requisição aos servidores locais (com
+  latência por chamada) e até a primeira busca de leads, com a verificação das credenciais
+  sem cache (cold) e com as verificações reaproveitadas do cache de credenciais (warm)
+
+Uso:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --output benchmarks/startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Módulos que main.py não deve importar na inicialização (são importados pelos métodos que os usam)
+LAZY_MODULES = ('requests', 'scripts.http_policy', 'scripts.facebook_webhook', 'scripts.graph_batch', 'sqlite3', 'cProfile')
+
+VERIFY_PATHS = ('/me', '/debug_token', '/lead/listAll')
+
+
+def import_times():
+    """
+    Mede a importação do main.py com python -X importtime
+
+    Returns:
+        dict: Tempo total (segundos), módulos importados com seus tempos cumulativos e os
+            módulos de LAZY_MODULES importados
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            seconds = int(cumulative) / 1e6
+        except ValueError:
+            continue
+        # Os módulos aninhados aparecem antes do módulo de nível superior que os importou
+        # (com mais recuo): mantém só os importados pelo main, e não pelo site, por exemplo
+        if name.startswith('  '):
+            modules[name.strip()] = seconds
+        elif name.strip() == 'main':
+            modules['main'] = seconds
+            break
+        else:
+            modules = {}
+    return {
+        'main_seconds': modules.get('main', 0.0),
+        'modules': modules,
+        'lazy_imported': [name for name in LAZY_MODULES if name in modules]
+    }
+
+
+def wall_clock(command, repeat):
+    """
+    Mede o tempo de execução de um comando em processos novos
+
+    Args:
+        command (list): Comando e argumentos
+        repeat (int): Número de execuções
+
+    Returns:
+        float: Mediana em segundos
+    """
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples)
+
+
+def child(state_dir, graph_url, b2cor_url):
+    """
+    Inicializa a integração como em main.py --process e extrai os leads (executado em um processo novo)
+
+    As credenciais são verificadas com _verify_credential(), como em setup(), por consultas
+    aos servidores locais; os clientes reais não fazem parte do repositório.
+
+    Args:
+        state_dir (str): Diretório de estado com config.json (e o cache de credenciais)
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+    """
+    import logging
+    from main import FacebookB2CorIntegration
+    from benchmarks.stub_clients import StubAuth
+    from benchmarks.bench_pipeline import use_stub_clients
+
+    logging.basicConfig(level=logging.ERROR)
+
+    integration = use_stub_clients(FacebookB2CorIntegration(os.path.join(state_dir, 'config.json'), state_dir=state_dir))
+    auth = StubAuth(graph_url=graph_url, b2cor_url=b2cor_url)
+    if not integration._verify_credential('facebook', auth, 'access_token', 'verify_token'):
+        sys.exit(1)
+    if not integration._verify_credential('b2cor', auth, 'api_key', 'verify_api_key'):
+        sys.exit(1)
+    integration.extract_leads()
+
+
+def time_to_first_request(graph, b2cor, state_dir, warm, repeat):
+    """
+    Mede o tempo desde o início do processo até a primeira requisição e até a primeira busca de leads
+
+    Args:
+        graph (StubGraphServer): Graph API local
+        b2cor (StubB2CorServer): B2Cor local
+        state_dir (str): Diretório de estado com config.json
+        warm (bool): Mantém o cache de credenciais entre as execuções (False = cache removido antes de cada uma)
+        repeat (int): Número de execuções
+
+    Returns:
+        dict: Medianas (segundos) de first_request, first_leads_request e total, e o número de
+            verificações de credenciais por execução
+    """
+    cache_file = os.path.join(state_dir, 'auth_cache.json')
+    command = [sys.executable, os.path.abspath(__file__), '--child', state_dir, graph.url, b2cor.url]
+    if warm and not os.path.exists(cache_file):
+        # Preenche o cache
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+
+    samples = {'first_request': [], 'first_leads_request': [], 'total': [], 'verifications': []}
+    for _ in range(repeat):
+        if not warm and os.path.exists(cache_file):
+            os.remove(cache_file)
+        graph.first_request_at.clear()
+        b2cor.first_request_at.clear()
+
+        started_at = time.time()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        samples['total'].append(time.time() - started_at)
+
+        requests_at = {**b2cor.first_request_at, **graph.first_request_at}
+        samples['first_request'].append(min(requests_at.values()) - started_at)
+        samples['first_leads_request'].append(
+            min(at for path, at in graph.first_request_at.items() if path.endswith('/leads')) - started_at
+        )
+        samples['verifications'].append(sum(1 for path in requests_at if path.endswith(VERIFY_PATHS)))
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da inicialização do main.py')
+    parser.add_argument('--repeat', type=int, default=5, help='Execuções de cada medição (padrão: 5)')
+    parser.add_argument('--leads', type=int, default=100, help='Leads do Graph API local (padrão: 100)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latência de cada chamada aos servidores locais em segundos (padrão: 0.05)')
+    parser.add_argument('--output', help='Arquivo JSON dos resultados (opcional)')
+    parser.add_argument('--child', nargs=3, metavar=('STATE_DIR', 'GRAPH_URL', 'B2COR_URL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from benchmarks.stub_servers import StubGraphServer, StubB2CorServer
+    from benchmarks.bench_pipeline import build_config
+
+    results = {'import': import_times()}
+    slowest = sorted(
+        ((name, seconds) for name, seconds in results['import']['modules'].items() if name != 'main'),
+        key=lambda item: item[1], reverse=True
+    )[:5]
+    print(f"import main:          {results['import']['main_seconds'] * 1000:7.1f} ms")
+    print("  mais lentos:        " + ', '.join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in slowest))
+    lazy_imported = results['import']['lazy_imported']
+    print(f"  importados sem necessidade: {', '.join(lazy_imported) if lazy_imported else 'nenhum'}")
+
+    results['python_seconds'] = wall_clock([sys.executable, '-c', 'pass'], args.repeat)
+    results['help_seconds'] = wall_clock([sys.executable, 'main.py', '--help'], args.repeat)
+    print(f"python -c pass:       {results['python_seconds'] * 1000:7.1f} ms")
+    print(f"main.py --help:       {results['help_seconds'] * 1000:7.1f} ms")
+
+    state_dir = tempfile.mkdtemp(prefix='bench_startup_')
+    try:
+        with StubGraphServer(total_leads=args.leads, forms=1, latency=args.latency) as graph, \
+                StubB2CorServer(latency=args.latency) as b2cor:
+            config = build_config(graph.url, b2cor.url, graph.form_ids, {
+                'facebook_workers': 1, 'b2cor_workers': 1, 'batch_size': 50, 'batch_requests': False,
+                'graph_rpm': 0, 'b2cor_rpm': 0, 'max_retries': 5, 'backoff_base': 0.01
+            })
+            config['general']['auth_cache_ttl'] = 3600
+            with open(os.path.join(state_dir, 'config.json'), 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=4)
+
+            for name, warm in (('cold', False), ('warm', True)):
+                run = time_to_first_request(graph, b2cor, state_dir, warm, args.repeat)
+                results[f"first_request_{name}"] = run
+                print(
+                    f"primeira requisição ({name}): {run['first_request'] * 1000:7.1f} ms  "
+                    f"primeira busca de leads: {run['first_leads_request'] * 1000:7.1f} ms  "
+                    f"processo: {run['total'] * 1000:7.1f} ms  verificações: {run['verifications']:.0f}"
+                )
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Resultados salvos em: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de memória e CPU de várias corretoras em um processo ou em processos separados
+Este script executa um ciclo process() de N corretoras (padrão: 50) contra o Graph API e o
+B2Cor locais de duas formas: todas no mesmo processo, com o MultiTenantRunner de main.py
+(--tenants-dir), e cada uma em seu próprio processo, como em uma instalação por corretora.
+Compara o tempo total, o CPU (usuário + sistema) e a memória: o pico do processo único contra
+a soma dos picos dos processos separados. Cada corretora tem os próprios formulários.
+
+Uso:
+    python benchmarks/bench_tenants.py
+    python benchmarks/bench_tenants.py --tenants 50 --leads-per-tenant 200 --max-workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import StubGraphServer, StubB2CorServer
+from benchmarks.bench_pipeline import build_config, create_integration, use_stub_clients, run_in_subprocess
+from scripts.metrics import peak_rss_bytes
+
+
+def cpu_seconds():
+    """
+    Obtém o tempo de CPU (usuário + sistema) consumido pelo processo
+
+    Returns:
+        float: Segundos de CPU, ou time.process_time() se resource não estiver disponível
+    """
+    if resource is None:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_multi_tenant(graph_url, b2cor_url, tenant_forms, options, max_workers):
+    """
+    Executa um ciclo de todas as corretoras com o MultiTenantRunner (chamado em um processo novo)
+
+    Args:
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+        tenant_forms (list): Formulários de cada corretora
+        options (dict): Opções da integração (ver bench_pipeline.build_config)
+        max_workers (int): Corretoras processadas simultaneamente
+
+    Returns:
+        dict: seconds, cpu_seconds, peak_rss_bytes e succeeded
+    """
+    from main import MultiTenantRunner
+
+    logging.basicConfig(level=logging.DEBUG if options['verbose'] else logging.ERROR)
+    tenants_dir = tempfile.mkdtemp(prefix='bench_tenants_')
+    try:
+        for index, form_ids in enumerate(tenant_forms):
+            with open(os.path.join(tenants_dir, f"corretora{index:03d}.json"), 'w', encoding='utf-8') as f:
+                json.dump(build_config(graph_url, b2cor_url, form_ids, options), f, indent=4)
+
+        started_at = time.perf_counter()
+        runner = MultiTenantRunner(tenants_dir, max_workers=max_workers)
+        runner.load()
+        # No lugar de setup(): clientes dos servidores locais
+        for integration in runner.tenants.values():
+            use_stub_clients(integration)
+        results = runner.run_once()
+        seconds = time.perf_counter() - started_at
+        runner.executor.shutdown()
+
+        return {
+            'seconds': seconds,
+            'cpu_seconds': cpu_seconds(),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'succeeded': sum(1 for ok in results.values() if ok)
+        }
+    finally:
+        shutil.rmtree(tenants_dir, ignore_errors=True)
+
+
+def run_single_tenant(graph_url, b2cor_url, form_ids, options):
+    """
+    Executa um ciclo de uma corretora isolada (chamado em um processo novo por corretora)
+
+    Args:
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+        form_ids (list): Formulários da corretora
+        options (dict): Opções da integração
+
+    Returns:
+        dict: seconds, cpu_seconds, peak_rss_bytes e succeeded
+    """
+    logging.basicConfig(level=logging.DEBUG if options['verbose'] else logging.ERROR)
+    state_dir = tempfile.mkdtemp(prefix='bench_tenant_')
+    try:
+        started_at = time.perf_counter()
+        ok = create_integration(state_dir, build_config(graph_url, b2cor_url, form_ids, options)).process()
+        return {
+            'seconds': time.perf_counter() - started_at,
+            'cpu_seconds': cpu_seconds(),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'succeeded': 1 if ok else 0
+        }
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def run_standalone(graph_url, b2cor_url, tenant_forms, options, max_workers):
+    """
+    Executa um ciclo de cada corretora em seu próprio processo, até max_workers ao mesmo tempo
+
+    Args:
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+        tenant_forms (list): Formulários de cada corretora
+        options (dict): Opções da integração
+        max_workers (int): Processos simultâneos
+
+    Returns:
+        dict: seconds, cpu_seconds e peak_rss_bytes somados entre os processos, e succeeded
+    """
+    context = multiprocessing.get_context('spawn')
+    started_at = time.perf_counter()
+    # maxtasksperchild=1: um processo novo por corretora, como em uma instalação separada
+    with context.Pool(max_workers, maxtasksperchild=1) as pool:
+        runs = pool.starmap(run_single_tenant, [(graph_url, b2cor_url, form_ids, options) for form_ids in tenant_forms], chunksize=1)
+    return {
+        'seconds': time.perf_counter() - started_at,
+        'cpu_seconds': sum(run['cpu_seconds'] for run in runs),
+        'peak_rss_bytes': sum(run['peak_rss_bytes'] or 0 for run in runs) or None,
+        'max_process_rss_bytes': max((run['peak_rss_bytes'] or 0 for run in runs), default=0) or None,
+        'succeeded': sum(run['succeeded'] for run in runs)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memória e CPU de várias corretoras em um processo ou em processos separados')
+    parser.add_argument('--tenants', type=int, default=50, help='Número de corretoras (padrão: 50)')
+    parser.add_argument('--leads-per-tenant', type=int, default=100, help='Leads de cada corretora (padrão: 100)')
+    parser.add_argument('--forms-per-tenant', type=int, default=2, help='Formulários de cada corretora (padrão: 2)')
+    parser.add_argument('--max-workers', type=int, default=8, help='Corretoras processadas simultaneamente (padrão: 8)')
+    parser.add_argument('--output', help='Arquivo JSON dos resultados (opcional)')
+    parser.add_argument('--verbose', action='store_true', help='Exibe os logs da integração')
+    args = parser.parse_args()
+
+    options = {
+        'facebook_workers': 1,
+        'b2cor_workers': 1,
+        'batch_size': 50,
+        'batch_requests': False,
+        'graph_rpm': 0,
+        'b2cor_rpm': 0,
+        'max_retries': 5,
+        'backoff_base': 0.01,
+        'verbose': args.verbose
+    }
+
+    forms = args.tenants * args.forms_per_tenant
+    results = {'tenants': args.tenants, 'leads_per_tenant': args.leads_per_tenant, 'max_workers': args.max_workers, 'runs': {}}
+    with StubGraphServer(total_leads=args.leads_per_tenant * args.tenants, forms=forms) as graph:
+        tenant_forms = [graph.form_ids[index::args.tenants] for index in range(args.tenants)]
+        for name, runner in (('um processo', run_multi_tenant), ('processos separados', None)):
+            # B2Cor novo por modo: os leads de um modo não são repetidos no outro
+            with StubB2CorServer() as b2cor:
+                if runner:
+                    summary = run_in_subprocess(runner, graph.url, b2cor.url, tenant_forms, options, args.max_workers)
+                else:
+                    summary = run_standalone(graph.url, b2cor.url, tenant_forms, options, args.max_workers)
+                summary['leads_created'] = b2cor.stats['created']
+            results['runs'][name] = summary
+            print(
+                f"{name:<20} {summary['succeeded']:>3}/{args.tenants} corretoras {summary['leads_created']:>7} leads "
+                f"{summary['seconds']:>7.2f}s  CPU {summary['cpu_seconds']:>7.2f}s  "
+                f"memória {(summary['peak_rss_bytes'] or 0) / 2 ** 20:>8.1f} MiB"
+            )
+
+    single, separate = results['runs']['um processo'], results['runs']['processos separados']
+    if single['peak_rss_bytes'] and separate['peak_rss_bytes']:
+        print(
+            f"Um processo usa {single['peak_rss_bytes'] / separate['peak_rss_bytes']:.1%} da memória e "
+            f"{single['cpu_seconds'] / separate['cpu_seconds']:.1%} do CPU dos processos separados."
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Resultados salvos em: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste de carga do recebimento de webhooks leadgen
+Este script inicia main.py --serve (FacebookB2CorIntegration.serve) em um processo novo,
+apontado para o Graph API e o B2Cor locais, e envia notificações leadgen assinadas
+(X-Hub-Signature-256) a partir de vários geradores concorrentes, na taxa máxima ou em uma
+taxa fixa (--rate). Mede os eventos aceitos por segundo, a vazão de ponta a ponta até a
+criação dos leads no B2Cor local e a latência de cada lead (envio do webhook → criação no
+B2Cor). Encerra com código 1 se algum lead não for entregue dentro de --timeout.
+
+Uso:
+    python benchmarks/bench_webhook.py
+    python benchmarks/bench_webhook.py --events 20000 --generators 16 --rate 500 --b2cor-workers 8
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import signal
+import shutil
+import socket
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_servers import StubGraphServer, StubB2CorServer, form_id, page_id
+from benchmarks.bench_pipeline import build_config, create_integration
+from scripts.metrics import percentile
+
+VERIFY_TOKEN = 'benchmark'
+APP_SECRET = 'benchmark-secret'
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve_webhooks(graph_url, b2cor_url, form_ids, options, port):
+    """
+    Executa o servidor de webhooks da integração até receber SIGTERM (chamado em um processo novo)
+
+    Args:
+        graph_url (str): URL do StubGraphServer
+        b2cor_url (str): URL do StubB2CorServer
+        form_ids (list): Formulários configurados
+        options (dict): Opções da integração (ver bench_pipeline.build_config)
+        port (int): Porta de escuta dos webhooks
+    """
+    logging.basicConfig(level=logging.INFO if options['verbose'] else logging.ERROR)
+    # serve() trata KeyboardInterrupt: o servidor é encerrado e a fila é esvaziada
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    state_dir = tempfile.mkdtemp(prefix='bench_webhook_')
+    try:
+        config = build_config(graph_url, b2cor_url, form_ids, options)
+        config['webhook'] = {
+            'host': '127.0.0.1',
+            'port': port,
+            'verify_token': VERIFY_TOKEN,
+            'app_secret': APP_SECRET,
+            'access_token': 'benchmark',
+            'batch_size': options['webhook_batch_size'],
+            'batch_wait': options['webhook_batch_wait']
+        }
+        create_integration(state_dir, config).serve()
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def free_port():
+    """
+    Obtém uma porta TCP livre
+
+    Returns:
+        int: Número da porta
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url, timeout):
+    """
+    Aguarda o handshake de verificação do webhook responder
+
+    Args:
+        url (str): URL do servidor de webhooks
+        timeout (float): Tempo máximo de espera em segundos
+
+    Returns:
+        bool: True se o servidor respondeu ao handshake
+    """
+    params = {'hub.mode': 'subscribe', 'hub.verify_token': VERIFY_TOKEN, 'hub.challenge': 'pronto'}
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, params=params, timeout=1).text == 'pronto':
+                return True
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def leadgen_payload(lead_ids, forms):
+    """
+    Monta uma notificação leadgen no formato enviado pelo Facebook
+
+    Args:
+        lead_ids (list): Posições dos leads (0, 1, ...) distribuídas entre os formulários
+        forms (int): Número de formulários do StubGraphServer
+
+    Returns:
+        tuple: (corpo em bytes, IDs dos leads)
+    """
+    now = int(time.time())
+    changes, ids = [], []
+    for number in lead_ids:
+        form_index, position = number % forms, number // forms
+        leadgen_id = str(10 ** 15 + form_index * 10 ** 7 + position)
+        ids.append(leadgen_id)
+        changes.append({
+            'field': 'leadgen',
+            'value': {'leadgen_id': leadgen_id, 'form_id': form_id(form_index), 'page_id': page_id(0), 'created_time': now}
+        })
+    body = json.dumps({'object': 'page', 'entry': [{'id': page_id(0), 'time': now, 'changes': changes}]}).encode('utf-8')
+    return body, ids
+
+
+class WebhookGenerator(threading.Thread):
+    """
+    Gerador de notificações leadgen assinadas, em uma taxa fixa ou na taxa máxima
+    """
+
+    def __init__(self, url, numbers, forms, events_per_post, rate, sent_at):
+        """
+        Inicializa o gerador
+
+        Args:
+            url (str): URL do servidor de webhooks
+            numbers (list): Posições dos leads enviados por este gerador
+            forms (int): Número de formulários do StubGraphServer
+            events_per_post (int): Eventos por notificação
+            rate (float): Eventos por segundo deste gerador (0 = sem limite)
+            sent_at (dict): Instante (time.monotonic) do envio de cada lead, preenchido pelo gerador
+        """
+        super().__init__(daemon=True)
+        self.url = url
+        self.numbers = numbers
+        self.forms = forms
+        self.events_per_post = events_per_post
+        self.rate = rate
+        self.sent_at = sent_at
+        self.stats = {'posts': 0, 'accepted': 0, 'rejected': 0, 'errors': 0}
+
+    def run(self):
+        session = requests.Session()
+        session.trust_env = False
+        started_at = time.monotonic()
+        for start in range(0, len(self.numbers), self.events_per_post):
+            if self.rate:
+                delay = started_at + start / self.rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            body, ids = leadgen_payload(self.numbers[start:start + self.events_per_post], self.forms)
+            signature = 'sha256=' + hmac.new(APP_SECRET.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            sent_at = time.monotonic()
+            self.stats['posts'] += 1
+            try:
+                response = session.post(self.url, data=body, headers={'Content-Type': 'application/json', 'X-Hub-Signature-256': signature}, timeout=30)
+            except requests.exceptions.RequestException:
+                self.stats['errors'] += 1
+                continue
+            if response.status_code == 200:
+                self.stats['accepted'] += len(ids)
+                for leadgen_id in ids:
+                    self.sent_at[leadgen_id] = sent_at
+            else:
+                self.stats['rejected'] += len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do recebimento de webhooks leadgen')
+    parser.add_argument('--events', type=int, default=5000, help='Número de eventos leadgen (padrão: 5000)')
+    parser.add_argument('--generators', type=int, default=8, help='Geradores concorrentes (padrão: 8)')
+    parser.add_argument('--events-per-post', type=int, default=1, help='Eventos por notificação (padrão: 1)')
+    parser.add_argument('--rate', type=float, default=0, help='Eventos por segundo somados de todos os geradores (0 = taxa máxima)')
+    parser.add_argument('--forms', type=int, default=10, help='Número de formulários (padrão: 10)')
+    parser.add_argument('--b2cor-workers', type=int, default=4, help='b2cor.max_workers (padrão: 4)')
+    parser.add_argument('--batch-size', type=int, default=50, help='webhook.batch_size (padrão: 50)')
+    parser.add_argument('--batch-wait', type=float, default=0.2, help='webhook.batch_wait em segundos (padrão: 0.2)')
+    parser.add_argument('--graph-latency', type=float, default=0.0, help='Latência de cada chamada ao Graph API em segundos')
+    parser.add_argument('--b2cor-latency', type=float, default=0.0, help='Latência de cada chamada ao B2Cor em segundos')
+    parser.add_argument('--timeout', type=float, default=300, help='Tempo máximo de espera pela entrega em segundos (padrão: 300)')
+    parser.add_argument('--output', help='Arquivo JSON dos resultados (opcional)')
+    parser.add_argument('--verbose', action='store_true', help='Exibe os logs da integração')
+    args = parser.parse_args()
+
+    options = {
+        'facebook_workers': 1,
+        'b2cor_workers': args.b2cor_workers,
+        'batch_size': args.batch_size,
+        'batch_requests': False,
+        'graph_rpm': 0,
+        'b2cor_rpm': 0,
+        'max_retries': 5,
+        'backoff_base': 0.01,
+        'webhook_batch_size': args.batch_size,
+        'webhook_batch_wait': args.batch_wait,
+        'verbose': args.verbose
+    }
+
+    with StubGraphServer(total_leads=args.events, forms=args.forms, latency=args.graph_latency) as graph, \
+            StubB2CorServer(latency=args.b2cor_latency) as b2cor:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}/"
+        process = multiprocessing.get_context('spawn').Process(
+            target=serve_webhooks, args=(graph.url, b2cor.url, graph.form_ids, options, port)
+        )
+        process.start()
+        try:
+            if not wait_ready(url, 30):
+                print("O servidor de webhooks não respondeu ao handshake.")
+                sys.exit(1)
+
+            sent_at = {}
+            generators = [
+                WebhookGenerator(url, list(range(index, args.events, args.generators)), args.forms,
+                                 args.events_per_post, args.rate / args.generators, sent_at)
+                for index in range(args.generators)
+            ]
+            started_at = time.monotonic()
+            for generator in generators:
+                generator.start()
+            for generator in generators:
+                generator.join()
+            sending_seconds = time.monotonic() - started_at
+
+            deadline = time.monotonic() + args.timeout
+            while b2cor.stats['created'] < len(sent_at) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            delivered_at = dict(b2cor.created_at)
+        finally:
+            process.terminate()
+            process.join(30)
+
+    stats = {key: sum(generator.stats[key] for generator in generators) for key in ('posts', 'accepted', 'rejected', 'errors')}
+    latencies = sorted(delivered_at[lead_id] - sent for lead_id, sent in sent_at.items() if lead_id in delivered_at)
+    total_seconds = (max(delivered_at.values()) - started_at) if delivered_at else None
+    results = {
+        'events': args.events,
+        'generators': args.generators,
+        'rate': args.rate,
+        'posts': stats['posts'],
+        'accepted': stats['accepted'],
+        'rejected': stats['rejected'],
+        'errors': stats['errors'],
+        'delivered': len(latencies),
+        'sending_seconds': sending_seconds,
+        'accepted_per_second': stats['accepted'] / sending_seconds if sending_seconds > 0 else None,
+        'end_to_end_seconds': total_seconds,
+        'delivered_per_second': len(latencies) / total_seconds if total_seconds else None,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p95': percentile(latencies, 0.95),
+        'latency_max': latencies[-1] if latencies else 0.0,
+        'graph_requests': graph.stats['requests'],
+        'b2cor_requests': b2cor.stats['requests']
+    }
+
+    print(f"Eventos aceitos:    {results['accepted']}/{args.events} em {sending_seconds:.2f}s ({results['accepted_per_second'] or 0:.1f} eventos/s), "
+          f"rejeitados: {results['rejected']}, erros: {results['errors']}")
+    print(f"Leads entregues:    {results['delivered']}/{results['accepted']} em {total_seconds or 0:.2f}s ({results['delivered_per_second'] or 0:.1f} leads/s)")
+    print(f"Latência ponta a ponta: p50 {results['latency_p50']:.3f}s  p95 {results['latency_p95']:.3f}s  máx {results['latency_max']:.3f}s")
+    print(f"Chamadas: Graph API {results['graph_requests']}, B2Cor {results['b2cor_requests']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Resultados salvos em: {args.output}")
+
+    if results['delivered'] < results['accepted'] or results['accepted'] < args.events:
+        print("Nem todos os eventos foram aceitos e entregues.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Clientes de API usados nos benchmarks contra os servidores locais
+Este script implementa, com a mesma interface do FacebookLeadsExtractor e do
+B2CorLeadsSender, clientes HTTP mínimos apontados para os servidores de stub_servers.py.
+Eles expõem a sessão do requests em 'session', para que a integração instale a mesma
+política HTTP (limite de taxa, novas tentativas e métricas) usada com os clientes reais.
+O que se mede é o pipeline do main.py (partições, deduplicação, diário, filas, lotes e
+política HTTP), não os clientes em si.
+"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from benchmarks.stub_servers import API_VERSION
+
+
+def _session():
+    """
+    Cria a sessão HTTP dos clientes locais
+
+    Returns:
+        requests.Session: Sessão sem leitura de proxies e .netrc do ambiente (feita a cada
+            requisição, domina o tempo de chamadas a um servidor local)
+    """
+    session = requests.Session()
+    session.trust_env = False
+    return session
+
+
+class StubAuth:
+    """
+    Credenciais dos servidores locais (no lugar do FacebookAdsAuth e do B2CorAuth)
+    """
+
+    def __init__(self, access_token='benchmark', api_key='benchmark', graph_url=None, b2cor_url=None):
+        """
+        Inicializa as credenciais
+
+        Args:
+            access_token (str): Token do Graph API
+            api_key (str): Chave da API do B2Cor
+            graph_url (str): URL do StubGraphServer: verify_token() consulta /me (None = não consulta)
+            b2cor_url (str): URL do StubB2CorServer: verify_api_key() consulta /lead/listAll (None = não consulta)
+        """
+        self.access_token = access_token
+        self.api_key = api_key
+        self.graph_url = graph_url
+        self.b2cor_url = b2cor_url
+
+    def verify_token(self):
+        if not self.graph_url:
+            return True
+        response = _session().get(f"{self.graph_url.rstrip('/')}/{API_VERSION}/me", params={'access_token': self.access_token}, timeout=30)
+        return response.status_code == 200
+
+    def verify_api_key(self):
+        if not self.b2cor_url:
+            return True
+        response = _session().get(f"{self.b2cor_url.rstrip('/')}/lead/listAll", params={'limite': 1}, headers={'x-api-key': self.api_key}, timeout=30)
+        return response.status_code == 200
+
+
+class StubLeadsExtractor:
+    """
+    Extrator de leads do Graph API local, com a interface do FacebookLeadsExtractor
+    """
+
+    def __init__(self, graph_url, page_ids=None, access_token='benchmark', page_limit=100):
+        """
+        Inicializa o extrator
+
+        Args:
+            graph_url (str): URL do StubGraphServer
+            page_ids (list): Páginas cujos formulários são listados em get_forms()
+            access_token (str): Token de acesso
+            page_limit (int): Número de leads por página
+        """
+        self.graph_url = graph_url.rstrip('/')
+        self.page_ids = page_ids or []
+        self.access_token = access_token
+        self.page_limit = page_limit
+        self.session = _session()
+
+    def _get(self, url, params=None):
+        """
+        Executa uma chamada GET ao Graph API
+
+        Args:
+            url (str): URL absoluta
+            params (dict): Parâmetros da chamada
+
+        Returns:
+            dict: Corpo da resposta
+        """
+        params = dict(params or {}, access_token=self.access_token)
+        response = self.session.get(url, params=params, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def get_forms(self):
+        """
+        Lista os formulários das Páginas configuradas
+
+        Returns:
+            list: Formulários
+        """
+        forms = []
+        for page_id in self.page_ids:
+            body = self._get(f"{self.graph_url}/{API_VERSION}/{page_id}/leadgen_forms", {'fields': 'id,name,status'})
+            forms.extend(body.get('data', []))
+        return forms
+
+    def extract_leads_to_json(self, output_file, form_ids=None, ad_ids=None, days_back=30):
+        """
+        Extrai os leads dos formulários/anúncios e os salva em um arquivo JSON
+
+        Args:
+            output_file (str): Caminho do arquivo de saída
+            form_ids (list): IDs dos formulários
+            ad_ids (list): IDs dos anúncios
+            days_back (int): Número de dias para trás
+
+        Returns:
+            int: Número de leads extraídos
+        """
+        since = int((datetime.now(timezone.utc) - timedelta(days=days_back)).timestamp())
+        filtering = json.dumps([{'field': 'time_created', 'operator': 'GREATER_THAN', 'value': since}])
+
+        leads = []
+        for object_id in list(form_ids or []) + list(ad_ids or []):
+            url = f"{self.graph_url}/{API_VERSION}/{object_id}/leads"
+            params = {'fields': 'created_time,id,ad_id,campaign_id,form_id,field_data', 'limit': self.page_limit, 'filtering': filtering}
+            while url:
+                body = self._get(url, params)
+                leads.extend(body.get('data', []))
+                # paging.next já traz todos os parâmetros
+                url, params = body.get('paging', {}).get('next'), None
+
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(leads, f, ensure_ascii=False)
+        return len(leads)
+
+
+def _field(lead, name):
+    """
+    Obtém o primeiro valor de um campo do field_data
+
+    Args:
+        lead (dict): Lead no formato do Graph API
+        name (str): Nome do campo
+
+    Returns:
+        str: Valor ou ''
+    """
+    for field in lead.get('field_data', []):
+        if field.get('name') == name and field.get('values'):
+            return field['values'][0]
+    return ''
+
+
+class StubLeadsSender:
+    """
+    Enviador de leads para o B2Cor local, com a interface do B2CorLeadsSender: cada lead é
+    criado e depois adicionado ao funil, atribuído a um responsável e anotado no histórico.
+    Informa o resultado de cada lead, o que permite lotes de b2cor.batch_size leads, e usa os
+    campos calculados por b2cor.map_fields ('b2cor_fields') quando presentes.
+    """
+
+    reports_lead_results = True
+    uses_b2cor_fields = True
+
+    def __init__(self, base_url, api_key='benchmark'):
+        """
+        Inicializa o enviador
+
+        Args:
+            base_url (str): URL do StubB2CorServer
+            api_key (str): Chave da API
+        """
+        self.base_url = base_url.rstrip('/')
+        self.session = _session()
+        self.session.headers.update({'x-api-key': api_key, 'Content-Type': 'application/json'})
+
+    def _post(self, path, payload):
+        """
+        Executa uma chamada POST ao B2Cor
+
+        Args:
+            path (str): Caminho do endpoint
+            payload (dict): Corpo JSON
+
+        Returns:
+            dict: Corpo da resposta
+        """
+        response = self.session.post(f"{self.base_url}{path}", data=json.dumps(payload), timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def process_facebook_leads(self, leads_file, add_to_funnel=True, change_user=True, add_history=True):
+        """
+        Envia os leads de um arquivo JSON
+
+        Args:
+            leads_file (str): Caminho do arquivo de leads
+            add_to_funnel (bool): Adiciona cada lead ao funil
+            change_user (bool): Atribui cada lead a um responsável
+            add_history (bool): Registra o histórico de cada lead
+
+        Returns:
+            dict: Estatísticas (total, success, failed, skipped), os IDs dos leads entregues
+                (delivered_ids) e dos criados com falha em uma etapa seguinte (partial_ids)
+        """
+        with open(leads_file, 'r', encoding='utf-8') as f:
+            leads = json.load(f)
+        if isinstance(leads, dict):
+            leads = leads.get('leads', leads.get('data', []))
+
+        stats = {'total': len(leads), 'success': 0, 'failed': 0, 'skipped': 0, 'delivered_ids': [], 'partial_ids': []}
+        for lead in leads:
+            fields = lead.get('b2cor_fields')
+            if fields is None:
+                phone = ''.join(char for char in _field(lead, 'phone_number') if char.isdigit())[-11:]
+                fields = {
+                    'nome': _field(lead, 'full_name'),
+                    'email': _field(lead, 'email'),
+                    'celular_ddd': phone[:2],
+                    'celular_numero': phone[2:],
+                    'uf': _field(lead, 'state'),
+                    'cidade': _field(lead, 'city')
+                }
+            lead_id = None
+            try:
+                created = self._post('/lead/add/fbleads', {'id_facebook': lead.get('id'), **fields})
+                lead_id = created['id_cliente']
+                if add_to_funnel:
+                    self._post('/lead/addFunnel', {'id_cliente': lead_id, 'id_funil': 1, 'id_etapa': 1})
+                if change_user:
+                    self._post(f"/lead/updateLead/{lead_id}", {'id_usuario': 1})
+                if add_history:
+                    self._post(f"/lead/addHistory/{lead_id}", {'historico': f"Lead {lead.get('id')} importado em {time.strftime('%Y-%m-%d %H:%M:%S')}"})
+                stats['success'] += 1
+                stats['delivered_ids'].append(str(lead.get('id')))
+            except (requests.exceptions.RequestException, KeyError, ValueError):
+                stats['failed'] += 1
+                if lead_id is not None:
+                    stats['partial_ids'].append(str(lead.get('id')))
+        return stats
@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidores locais que imitam o Graph API do Facebook e a API do B2Cor
+Este script sobe servidores HTTP em threads para os benchmarks: o Graph API gera leads
+determinísticos sob demanda (paginação, filtro por time_created, lotes, ?ids=, listagem de
+formulários com ETag e exportação CSV) e o B2Cor grava os leads recebidos em memória
+(criação, funil, responsável, histórico, /lead/find e /lead/listAll). Cada servidor tem
+controles de latência, taxa de erros 500 e taxa de respostas de limite de taxa.
+"""
+
+import csv
+import io
+import json
+import sys
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+API_VERSION = 'v22.0'
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Conexões mantidas abertas pelos clientes são fechadas ao fim de cada caso
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """
+    Classe base dos servidores locais, com os controles de falhas
+    """
+
+    # Host usado nas URLs: os clientes separam limites de taxa e métricas por hostname
+    url_host = '127.0.0.1'
+
+    def __init__(self, latency=0.0, error_rate=0.0, throttle_rate=0.0, seed=0, replay=None):
+        """
+        Inicializa o servidor
+
+        Args:
+            latency (float): Atraso (em segundos) de cada resposta
+            error_rate (float): Fração das requisições respondidas com erro 500
+            throttle_rate (float): Fração das requisições respondidas com limite de taxa
+            seed (int): Semente do sorteio das falhas (execuções reproduzíveis)
+            replay (list): Falhas das primeiras requisições, em ordem ('throttle', 'error' ou
+                None para responder normalmente), antes do sorteio
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.replay = list(replay or [])
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+        # Instante (time.time, comparável entre processos) da primeira requisição de cada caminho
+        self.first_request_at = {}
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        URL base do servidor (ex: http://127.0.0.1:54321)
+        """
+        return f"http://{self.url_host}:{self.httpd.server_address[1]}"
+
+    def start(self, host='127.0.0.1', port=0):
+        """
+        Inicia o servidor em uma thread
+
+        Args:
+            host (str): Endereço de escuta
+            port (int): Porta de escuta (0 = porta livre)
+
+        Returns:
+            StubServer: O próprio servidor
+        """
+        self.httpd = _Server((host, port), self._make_handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Encerra o servidor
+        """
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, name):
+        """
+        Incrementa um contador
+
+        Args:
+            name (str): Nome do contador
+        """
+        with self.lock:
+            self.stats[name] += 1
+
+    def _draw_fault(self):
+        """
+        Obtém a falha de uma requisição (da lista de replay ou por sorteio)
+
+        Returns:
+            str: 'throttle', 'error' ou None
+        """
+        with self.lock:
+            if self.replay:
+                return self.replay.pop(0)
+            draw = self.random.random()
+        if draw < self.throttle_rate:
+            return 'throttle'
+        if draw < self.throttle_rate + self.error_rate:
+            return 'error'
+        return None
+
+    def throttle_response(self):
+        """
+        Resposta de limite de taxa do serviço
+
+        Returns:
+            tuple: (status, cabeçalhos, corpo)
+        """
+        return 429, {'Retry-After': '0'}, {'error': 'Too Many Requests'}
+
+    def handle(self, method, path, params, body, headers):
+        """
+        Trata uma requisição (implementado pelas subclasses)
+
+        Args:
+            method (str): Método HTTP
+            path (str): Caminho da URL
+            params (dict): Parâmetros da query string (um valor por nome)
+            body (bytes): Corpo da requisição
+            headers (dict): Cabeçalhos da requisição (nomes em minúsculas)
+
+        Returns:
+            tuple: (status, cabeçalhos, corpo como dict/list, str ou bytes)
+        """
+        raise NotImplementedError
+
+    def _make_handler(self):
+        """
+        Cria a classe de tratamento das requisições HTTP
+
+        Returns:
+            type: Subclasse de BaseHTTPRequestHandler
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Cabeçalhos e corpo saem em escritas separadas: sem isso o Nagle espera o ACK atrasado
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                params = {name: values[0] for name, values in parse_qs(parsed.query).items()}
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+                headers = {name.lower(): value for name, value in self.headers.items()}
+
+                server._count('requests')
+                server.first_request_at.setdefault(parsed.path, time.time())
+                if server.latency:
+                    time.sleep(server.latency)
+
+                fault = server._draw_fault()
+                if fault == 'throttle':
+                    server._count('throttled')
+                    status, reply_headers, payload = server.throttle_response()
+                elif fault == 'error':
+                    server._count('errors')
+                    status, reply_headers, payload = 500, {}, {'error': 'Internal Server Error'}
+                else:
+                    try:
+                        status, reply_headers, payload = server.handle(method, parsed.path, params, body, headers)
+                    except Exception as e:
+                        status, reply_headers, payload = 500, {}, {'error': str(e)}
+
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode('utf-8')
+                    reply_headers.setdefault('Content-Type', 'application/json')
+                elif isinstance(payload, str):
+                    payload = payload.encode('utf-8')
+
+                self.send_response(status)
+                for name, value in reply_headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+        return Handler
+
+
+def make_lead(form_index, position, newest_ts, spacing=1):
+    """
+    Gera um lead determinístico no formato do Graph API
+
+    Args:
+        form_index (int): Posição do formulário (0, 1, ...)
+        position (int): Posição do lead no formulário (0 = mais recente)
+        newest_ts (int): created_time do lead mais recente (timestamp Unix)
+        spacing (int): Segundos entre leads consecutivos do formulário
+
+    Returns:
+        dict: Lead com id, created_time, ad_id, campaign_id, form_id e field_data
+    """
+    # Um lead a cada spacing segundos, do mais recente para o mais antigo
+    number = form_index * 10 ** 7 + position
+    created_ts = newest_ts - position * spacing
+    return {
+        'id': str(10 ** 15 + number),
+        'created_time': time.strftime('%Y-%m-%dT%H:%M:%S+0000', time.gmtime(created_ts)),
+        'ad_id': str(2 * 10 ** 15 + form_index),
+        'campaign_id': str(3 * 10 ** 15 + form_index % 3),
+        'form_id': form_id(form_index),
+        'field_data': [
+            {'name': 'full_name', 'values': [f"LEAD DE TESTE {number}"]},
+            {'name': 'email', 'values': [f"lead{number}@exemplo.com.br"]},
+            # Telefone único até 100 formulários com 1 milhão de leads cada (a deduplicação usa o telefone)
+            {'name': 'phone_number', 'values': [f"+55 (11) 9{form_index % 100:02d}{position % 10 ** 6:06d}"]},
+            {'name': 'state', 'values': ['São Paulo']},
+            {'name': 'city', 'values': ['sao paulo']}
+        ]
+    }
+
+
+def form_id(form_index):
+    """
+    ID do formulário gerado na posição informada
+
+    Args:
+        form_index (int): Posição do formulário
+
+    Returns:
+        str: ID do formulário
+    """
+    return str(4 * 10 ** 15 + form_index)
+
+
+def page_id(page_index):
+    """
+    ID da Página gerada na posição informada
+
+    Args:
+        page_index (int): Posição da Página
+
+    Returns:
+        str: ID da Página
+    """
+    return str(5 * 10 ** 15 + page_index)
+
+
+class StubGraphServer(StubServer):
+    """
+    Servidor local que imita o Graph API (leads gerados sob demanda, sem guardá-los em memória)
+    """
+
+    def __init__(self, total_leads=1000, forms=10, pages=1, usage_percent=0, spacing=1, **kwargs):
+        """
+        Inicializa o servidor
+
+        Args:
+            total_leads (int): Número total de leads, distribuídos igualmente entre os formulários
+            forms (int): Número de formulários
+            pages (int): Número de Páginas (os formulários são distribuídos entre elas)
+            usage_percent (float): Percentual informado no cabeçalho x-app-usage (0 = sem cabeçalho)
+            spacing (int): Segundos entre leads consecutivos de um formulário (ex: 86400 * 180 //
+                leads por formulário para um histórico de 6 meses)
+            **kwargs: Controles de falhas de StubServer
+        """
+        super().__init__(**kwargs)
+        self.forms = forms
+        self.pages = pages
+        self.usage_percent = usage_percent
+        self.spacing = max(1, int(spacing))
+        self.newest_ts = int(time.time()) - 60
+        self.leads_per_form = [total_leads // forms + (1 if i < total_leads % forms else 0) for i in range(forms)]
+        self.form_index = {form_id(i): i for i in range(forms)}
+        self.stats.update({'batches': 0, 'sub_requests': 0, 'leads_served': 0, 'not_modified': 0})
+
+    @property
+    def form_ids(self):
+        """
+        IDs dos formulários gerados
+        """
+        return [form_id(i) for i in range(self.forms)]
+
+    @property
+    def page_ids(self):
+        """
+        IDs das Páginas geradas
+        """
+        return [page_id(i) for i in range(self.pages)]
+
+    def throttle_response(self):
+        """
+        Erro de limite de taxa do Graph API (código 4)
+        """
+        return 400, {}, {'error': {'message': '(#4) Application request limit reached', 'type': 'OAuthException', 'code': 4}}
+
+    def _headers(self):
+        """
+        Cabeçalhos de uso do Graph API
+
+        Returns:
+            dict: Cabeçalhos da resposta
+        """
+        if not self.usage_percent:
+            return {}
+        usage = {'call_count': self.usage_percent, 'total_cputime': 1, 'total_time': 1}
+        return {'x-app-usage': json.dumps(usage)}
+
+    def _since_position(self, form_index, filtering):
+        """
+        Calcula quantos leads do formulário passam no filtro time_created GREATER_THAN
+
+        Args:
+            form_index (int): Posição do formulário
+            filtering (str): Parâmetro filtering (JSON) ou None
+
+        Returns:
+            int: Número de leads a servir (os mais recentes)
+        """
+        total = self.leads_per_form[form_index]
+        if not filtering:
+            return total
+        for rule in json.loads(filtering):
+            if rule.get('field') == 'time_created' and rule.get('operator') == 'GREATER_THAN':
+                # Posições p com newest_ts - p * spacing > value
+                total = max(0, min(total, -(-(self.newest_ts - int(rule['value'])) // self.spacing)))
+        return total
+
+    def _leads_page(self, object_id, params):
+        """
+        Página de leads de um formulário ou anúncio
+
+        Args:
+            object_id (str): ID do formulário (ou do anúncio, que aponta para um formulário)
+            params (dict): Parâmetros da chamada (limit, after, filtering)
+
+        Returns:
+            tuple: (status, corpo)
+        """
+        if object_id not in self.form_index:
+            ad_index = int(object_id) - 2 * 10 ** 15
+            if not 0 <= ad_index < self.forms:
+                return 404, {'error': {'message': f"Unknown object {object_id}", 'code': 100}}
+            object_id = form_id(ad_index)
+
+        form_index = self.form_index[object_id]
+        total = self._since_position(form_index, params.get('filtering'))
+        limit = int(params.get('limit', 25))
+        start = int(params.get('after', 0))
+        end = min(total, start + limit)
+        data = [make_lead(form_index, position, self.newest_ts, self.spacing) for position in range(start, end)]
+        with self.lock:
+            self.stats['leads_served'] += len(data)
+
+        body = {'data': data, 'paging': {'cursors': {'before': str(start), 'after': str(end)}}}
+        if end < total:
+            query = dict(params, after=str(end))
+            body['paging']['next'] = f"{self.url}/{API_VERSION}/{object_id}/leads?{urlencode(query)}"
+        return 200, body
+
+    def _forms_page(self, page, headers):
+        """
+        Lista de formulários de uma Página, com ETag
+
+        Args:
+            page (str): ID da Página
+            headers (dict): Cabeçalhos da requisição
+
+        Returns:
+            tuple: (status, cabeçalhos, corpo)
+        """
+        page_index = int(page) - 5 * 10 ** 15
+        forms = [
+            {'id': form_id(i), 'name': f"Formulário {i}", 'status': 'ACTIVE', 'updated_time': '2024-01-01T00:00:00+0000'}
+            for i in range(self.forms) if i % self.pages == page_index
+        ]
+        body = {'data': forms}
+        etag = '"' + hashlib.md5(json.dumps(body).encode('utf-8')).hexdigest() + '"'
+        if headers.get('if-none-match') == etag:
+            self._count('not_modified')
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag}, body
+
+    def _get(self, path, params, headers):
+        """
+        Trata uma chamada GET (direta ou dentro de um lote)
+
+        Args:
+            path (str): Caminho sem a versão (ex: 123/leads)
+            params (dict): Parâmetros da query string
+            headers (dict): Cabeçalhos da requisição
+
+        Returns:
+            tuple: (status, cabeçalhos, corpo)
+        """
+        parts = [part for part in path.split('/') if part]
+        if parts == ['debug_token']:
+            return 200, {}, {'data': {'is_valid': True, 'expires_at': int(time.time()) + 60 * 86400}}
+        if not parts and params.get('ids'):
+            leads = {}
+            for lead_id in params['ids'].split(','):
+                number = int(lead_id) - 10 ** 15
+                form_index, position = divmod(number, 10 ** 7)
+                if 0 <= form_index < self.forms and position < self.leads_per_form[form_index]:
+                    leads[lead_id] = make_lead(form_index, position, self.newest_ts, self.spacing)
+            return 200, {}, leads
+        if len(parts) == 2 and parts[1] == 'leads':
+            status, body = self._leads_page(parts[0], params)
+            return status, {}, body
+        if len(parts) == 2 and parts[1] == 'leadgen_forms':
+            return self._forms_page(parts[0], headers)
+        if parts == ['me']:
+            return 200, {}, {'id': '1', 'name': 'Benchmark'}
+        return 404, {}, {'error': {'message': f"Unknown path {path}", 'code': 803}}
+
+    def _batch(self, body):
+        """
+        Executa um lote de chamadas GET
+
+        Args:
+            body (bytes): Corpo do POST (form-urlencoded com o parâmetro batch)
+
+        Returns:
+            tuple: (status, cabeçalhos, corpo)
+        """
+        form = {name: values[0] for name, values in parse_qs(body.decode('utf-8')).items()}
+        include_headers = form.get('include_headers', 'true') != 'false'
+        requests = json.loads(form.get('batch', '[]'))
+        with self.lock:
+            self.stats['batches'] += 1
+            self.stats['sub_requests'] += len(requests)
+
+        results = []
+        for request in requests:
+            parsed = urlparse('/' + request['relative_url'].lstrip('/'))
+            params = {name: values[0] for name, values in parse_qs(parsed.query).items()}
+            headers = {item['name'].lower(): item['value'] for item in request.get('headers', [])}
+            path = parsed.path
+            if path.startswith(f"/{API_VERSION}/"):
+                path = path[len(API_VERSION) + 1:]
+
+            # As sub-requisições falham individualmente, como no Graph API
+            fault = self._draw_fault()
+            if fault == 'throttle':
+                self._count('throttled')
+                status, reply_headers, payload = self.throttle_response()
+            elif fault == 'error':
+                self._count('errors')
+                status, reply_headers, payload = 500, {}, {'error': {'message': 'An unknown error occurred', 'code': 1}}
+            else:
+                status, reply_headers, payload = self._get(path, params, headers)
+
+            if isinstance(payload, bytes):
+                payload = payload.decode('utf-8')
+            elif not isinstance(payload, str):
+                payload = json.dumps(payload)
+            item = {'code': status, 'body': payload}
+            if include_headers:
+                item['headers'] = [{'name': name, 'value': value} for name, value in reply_headers.items()]
+            results.append(item)
+        return 200, self._headers(), results
+
+    def _export_csv(self, params):
+        """
+        Exportação CSV dos leads de um formulário em um intervalo de datas
+
+        Args:
+            params (dict): id, type, from_date e to_date (timestamps Unix)
+
+        Returns:
+            tuple: (status, cabeçalhos, corpo)
+        """
+        object_id = params.get('id')
+        if params.get('type') == 'ad':
+            object_id = form_id(int(object_id) - 2 * 10 ** 15)
+        form_index = self.form_index.get(object_id)
+        if form_index is None:
+            return 404, {}, {'error': {'message': f"Unknown object {object_id}", 'code': 100}}
+
+        from_ts, to_ts = int(params.get('from_date', 0)), int(params.get('to_date', 2 ** 31))
+        total = self.leads_per_form[form_index]
+        # Posições cujo created_time cai em [from_ts, to_ts)
+        first = max(0, (self.newest_ts - to_ts) // self.spacing + 1)
+        last = min(total, max(0, (self.newest_ts - from_ts) // self.spacing + 1))
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['id', 'created_time', 'ad_id', 'campaign_id', 'form_id', 'full_name', 'email', 'phone_number', 'state', 'city'])
+        for position in range(first, last):
+            lead = make_lead(form_index, position, self.newest_ts, self.spacing)
+            values = [field['values'][0] for field in lead['field_data']]
+            writer.writerow([f"l:{lead['id']}", lead['created_time'], f"ag:{lead['ad_id']}", lead['campaign_id'], lead['form_id']] + values)
+        with self.lock:
+            self.stats['leads_served'] += max(0, last - first)
+        return 200, {'Content-Type': 'text/csv'}, output.getvalue()
+
+    def handle(self, method, path, params, body, headers):
+        if path.rstrip('/').endswith('/export_csv'):
+            return self._export_csv(params)
+        if path.startswith(f"/{API_VERSION}"):
+            path = path[len(API_VERSION) + 1:]
+        if method == 'POST' and path in ('', '/'):
+            return self._batch(body)
+        if method == 'GET':
+            status, reply_headers, payload = self._get(path, params, headers)
+            reply_headers.update(self._headers())
+            return status, reply_headers, payload
+        return 405, {}, {'error': {'message': 'Unsupported method', 'code': 100}}
+
+
+class StubB2CorServer(StubServer):
+    """
+    Servidor local que imita a API do B2Cor, guardando os leads recebidos em memória
+    """
+
+    # Outro hostname que o do Graph API local: cada serviço com seu limite de taxa e métricas
+    url_host = 'localhost'
+
+    def __init__(self, api_key='benchmark', **kwargs):
+        """
+        Inicializa o servidor
+
+        Args:
+            api_key (str): Chave aceita no cabeçalho x-api-key
+            **kwargs: Controles de falhas de StubServer
+        """
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.leads = {}
+        self.next_id = 1
+        self.facebook_ids = {}
+        # Instante (time.monotonic) da criação de cada lead, por id_facebook
+        self.created_at = {}
+        self.stats.update({'created': 0, 'repeated': 0, 'funnel': 0, 'user': 0, 'history': 0, 'find': 0, 'list_all': 0})
+
+    def _find(self, payload, leads):
+        """
+        Página de leads de /lead/find (filtrados por data) ou /lead/listAll
+
+        Args:
+            payload (dict): Filtros (data_inicial, data_final, pagina, limite)
+            leads (list): Leads do servidor
+
+        Returns:
+            list: Leads da página
+        """
+        date_from = payload.get('data_inicial') or ''
+        date_to = payload.get('data_final') or '9999-12-31'
+        if date_from or payload.get('data_final'):
+            leads = [lead for lead in leads if date_from <= lead['data'][:10] <= date_to]
+        page = max(1, int(payload.get('pagina', 1)))
+        limit = int(payload.get('limite', 500))
+        return leads[(page - 1) * limit:page * limit]
+
+    def handle(self, method, path, params, body, headers):
+        if headers.get('x-api-key') != self.api_key:
+            return 403, {}, {'error': 'Chave inválida'}
+        parts = [part for part in path.split('/') if part]
+        payload = json.loads(body) if body else {}
+
+        if method == 'POST' and parts[:2] == ['lead', 'add']:
+            with self.lock:
+                # Lead reenviado (ex: após um erro no meio de um lote): devolve o cadastro existente
+                if payload.get('id_facebook') in self.facebook_ids:
+                    self.stats['repeated'] += 1
+                    return 200, {}, {'id_cliente': self.facebook_ids[payload['id_facebook']]}
+                lead_id = self.next_id
+                if payload.get('id_facebook'):
+                    self.facebook_ids[payload['id_facebook']] = lead_id
+                    self.created_at[payload['id_facebook']] = time.monotonic()
+                self.next_id += 1
+                self.leads[lead_id] = dict(payload, id_cliente=lead_id, status='', data=time.strftime('%Y-%m-%d %H:%M:%S'))
+                self.stats['created'] += 1
+            return 200, {}, {'id_cliente': lead_id}
+        if method == 'POST' and parts == ['lead', 'addFunnel']:
+            self._count('funnel')
+            return 200, {}, {'ok': True}
+        if method == 'POST' and parts[:2] == ['lead', 'updateLead']:
+            self._count('user')
+            return 200, {}, {'ok': True}
+        if method == 'POST' and parts[:2] == ['lead', 'addHistory']:
+            self._count('history')
+            return 200, {}, {'ok': True}
+        if method == 'POST' and parts == ['lead', 'find']:
+            self._count('find')
+            with self.lock:
+                leads = list(self.leads.values())
+            return 200, {}, {'leads': self._find(payload, leads)}
+        if method == 'GET' and parts == ['lead', 'listAll']:
+            self._count('list_all')
+            with self.lock:
+                leads = list(self.leads.values())
+            return 200, {}, self._find(params, leads)
+        if parts[:1] == ['lead']:
+            return 405, {}, {'error': 'Método não aceito'}
+        return 404, {}, {'error': 'Não encontrado'}
@@ -9,44 +9,56 @@ Este script integra a extração de leads do Facebook Ads e o envio para o B2Cor
 import os
 import sys
 import json
+import math
 import argparse
 import logging
 import time
-import schedule
-from datetime import datetime, timedelta
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 
-# Importa os módulos criados
+# Importa os módulos criados. Os clientes de API e as dependências HTTP (requests) são
+# importados sob demanda, para que comandos como --send e --find-lead iniciem rapidamente.
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from scripts.facebook_auth import FacebookAdsAuth
-from scripts.facebook_leads import FacebookLeadsExtractor
-from scripts.b2cor_auth import B2CorAuth
-from scripts.b2cor_leads import B2CorLeadsSender
+from scripts.lead_cursors import LeadCursorStore, parse_created_time, CREATED_TIME_FORMAT
+from scripts.metrics import HttpMetrics, MetricsRegistry, timed_stage, peak_rss_bytes, compare_summaries
+from scripts.scheduler import JobScheduler
+from scripts.send_journal import SendJournal, journal_key, STARTED, SENT, PARTIAL
+from scripts.auth_cache import AuthCache
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("facebook_b2cor_automation.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("facebook_b2cor_automation")
 
+def configure_logging():
+    """
+    Configura o logging no terminal e no arquivo de log (o arquivo só é aberto no primeiro registro)
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("facebook_b2cor_automation.log", delay=True),
+            logging.StreamHandler()
+        ]
+    )
+
 class FacebookB2CorIntegration:
     """
     Classe para integrar a extração de leads do Facebook Ads e o envio para o B2Cor
     """
     
-    def __init__(self, config_file=None):
+    def __init__(self, config_file=None, state_dir=None):
         """
         Inicializa a integração
         
         Args:
             config_file (str): Caminho para o arquivo de configuração (opcional)
+            state_dir (str): Diretório para os leads, cursores, índices e caches (opcional,
+                padrão: diretório do arquivo de configuração, com os leads ao lado do main.py)
         """
         self.config_file = config_file or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
         self.config = self._load_config()
+        self.state_dir = state_dir or os.path.dirname(os.path.abspath(self.config_file))
         
         # Inicializa os componentes
         self.facebook_auth = None
@@ -55,8 +67,39 @@ class FacebookB2CorIntegration:
         self.b2cor_sender = None
         
         # Diretório para armazenar os leads extraídos
-        self.leads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'leads')
+        if state_dir:
+            self.leads_dir = os.path.join(state_dir, 'leads')
+        else:
+            self.leads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'leads')
         os.makedirs(self.leads_dir, exist_ok=True)
+        
+        # Cursores da extração incremental (último created_time por formulário/anúncio)
+        self.cursor_store = LeadCursorStore(os.path.join(self.state_dir, 'lead_cursors.json'))
+        
+        # Verificações de credenciais recentes (evita as chamadas de verificação em execuções próximas)
+        self.auth_cache = AuthCache(os.path.join(self.state_dir, 'auth_cache.json'))
+        self._pending_cursors = {}
+        
+        # Leads cujo envio falhou na execução atual (os cursores não passam deles)
+        self._undelivered = []
+        
+        # Índice de leads já enviados (aberto sob demanda)
+        self.lead_index = None
+        
+        # Segmentos comprimidos dos leads extraídos (aberto sob demanda)
+        self.snapshot_store = None
+        
+        # Estatísticas da última execução
+        self.run_stats = {}
+        self.http_metrics = HttpMetrics()
+        self.metrics = MetricsRegistry()
+        self.http_adapter = None
+        self.graph_batch_client = None
+        self.form_cache = None
+        self.field_mapper = None
+        self.lead_prioritizer = None
+        self.last_snapshot = None
+        self.scheduler = JobScheduler()
     
     def _load_config(self):
         """
@@ -87,20 +130,77 @@ class FacebookB2CorIntegration:
                 "form_ids": [],
                 "ad_ids": [],
                 "days_back": 30,
+                "max_workers": 1,
+                "incremental": True,
+                "usage_threshold": 75,
+                "batch_requests": False,
+                "page_ids": [],
+                "forms_cache_ttl": 86400,
+                "forms_cache_max_stale": 604800,
+                "backfill_shard_days": 7,
+                "backfill_workers": 4,
+                "api_version": "v22.0",
+                "graph_url": "https://graph.facebook.com",
+                "export_url": "https://www.facebook.com/ads/lead_gen/export_csv/",
+                "requests_per_minute": 200,
                 "schedule": {
                     "enabled": False,
                     "interval": "daily",
-                    "time": "00:00"
+                    "time": "00:00",
+                    "minutes": 5,
+                    "overlap": "coalesce"
                 }
             },
             "b2cor": {
+                "base_url": "https://b2corapi.agencialink.com.br",
+                "max_workers": 1,
+                "batch_size": 50,
+                "requests_per_minute": 0,
+                "journal": True,
+                "map_fields": None,
+                "facebook_id_field": "id_facebook",
+                "reconcile_page_size": 500,
+                "reconcile_filters": {},
+                "reconcile_mismatch_statuses": ["Invalida", "Repetida", "devolvido"],
+                "field_mapping": {},
+                "priority": {
+                    "enabled": True,
+                    "realtime_window_hours": 24,
+                    "lane_weights": {"realtime": 4, "backfill": 1},
+                    "form_weights": {},
+                    "campaign_weights": {},
+                    "sla_seconds": 300
+                },
                 "add_to_funnel": True,
                 "change_user": True,
                 "add_history": True
             },
+            "webhook": {
+                "host": "0.0.0.0",
+                "port": 8080,
+                "verify_token": "",
+                "app_secret": "",
+                "access_token": "",
+                "api_version": "v22.0",
+                "batch_size": 50,
+                "batch_wait": 1.0
+            },
             "general": {
                 "auto_process": True,
-                "keep_leads_days": 30
+                "streaming": False,
+                "stream_queue_batches": 10,
+                "snapshot_jsonl": True,
+                "snapshot_store": True,
+                "snapshot_compression": "gzip",
+                "keep_leads_days": 30,
+                "dedup": True,
+                "metrics_file": "",
+                "auth_cache_ttl": 3600,
+                "retry": {
+                    "max_retries": 5,
+                    "backoff_base": 1.0,
+                    "backoff_max": 60.0
+                }
             }
         }
     
@@ -112,19 +212,35 @@ class FacebookB2CorIntegration:
             json.dump(self.config, f, indent=4)
         logger.info(f"Configuração salva em: {self.config_file}")
     
-    def setup(self):
+    @timed_stage('setup')
+    def setup(self, interactive=True):
         """
         Configura os componentes da integração
         
+        Args:
+            interactive (bool): Solicita as credenciais no terminal quando forem inválidas
+        
         Returns:
             bool: True se a configuração foi bem-sucedida
         """
         try:
+            from scripts.facebook_auth import FacebookAdsAuth
+            from scripts.facebook_leads import FacebookLeadsExtractor
+            from scripts.b2cor_auth import B2CorAuth
+            from scripts.b2cor_leads import B2CorLeadsSender
+            
             # Configura a autenticação do Facebook
             logger.info("Configurando autenticação do Facebook Ads...")
             self.facebook_auth = FacebookAdsAuth()
             
-            if not self.facebook_auth.verify_token():
+            # Credenciais informadas no config.json têm prioridade (ex: uma configuração por corretora)
+            if self.config.get('facebook', {}).get('access_token'):
+                self.facebook_auth.access_token = self.config['facebook']['access_token']
+            
+            if not self._verify_credential('facebook', self.facebook_auth, 'access_token', 'verify_token'):
+                if not interactive:
+                    logger.error("Token do Facebook Ads não encontrado ou inválido.")
+                    return False
                 logger.info("Token do Facebook Ads não encontrado ou inválido. Iniciando processo de autenticação...")
                 if not self.facebook_auth.interactive_auth():
                     logger.error("Falha na autenticação do Facebook Ads.")
@@ -138,7 +254,13 @@ class FacebookB2CorIntegration:
             logger.info("Configurando autenticação do B2Cor...")
             self.b2cor_auth = B2CorAuth()
             
-            if not self.b2cor_auth.verify_api_key():
+            if self.config.get('b2cor', {}).get('api_key'):
+                self.b2cor_auth.api_key = self.config['b2cor']['api_key']
+            
+            if not self._verify_credential('b2cor', self.b2cor_auth, 'api_key', 'verify_api_key'):
+                if not interactive:
+                    logger.error("Chave da API do B2Cor não encontrada ou inválida.")
+                    return False
                 logger.info("Chave da API do B2Cor não encontrada ou inválida. Iniciando processo de configuração...")
                 if not self.b2cor_auth.interactive_setup():
                     logger.error("Falha na configuração do B2Cor.")
@@ -148,104 +270,1654 @@ class FacebookB2CorIntegration:
             logger.info("Configurando enviador de leads para o B2Cor...")
             self.b2cor_sender = B2CorLeadsSender(self.b2cor_auth)
             
+            # Aplica o limite de taxa e as novas tentativas aos clientes HTTP
+            self._install_http_policy()
+            
             logger.info("Configuração concluída com sucesso!")
             return True
         
-        except Exception as e:
-            logger.error(f"Erro durante a configuração: {str(e)}")
-            return False
+        except Exception as e:
+            logger.error(f"Erro durante a configuração: {str(e)}")
+            return False
+    
+    def _verify_credential(self, service, auth, attribute, verify_method):
+        """
+        Verifica uma credencial, reutilizando uma verificação recente do cache
+        
+        Args:
+            service (str): Nome do serviço no cache (facebook, b2cor)
+            auth (object): Objeto de autenticação do serviço
+            attribute (str): Atributo com a credencial (access_token, api_key)
+            verify_method (str): Método de verificação do objeto de autenticação
+        
+        Returns:
+            bool: True se a credencial é válida
+        """
+        ttl = self.config.get('general', {}).get('auth_cache_ttl', 3600)
+        secret = getattr(auth, attribute, None)
+        
+        if ttl > 0 and self.auth_cache.is_valid(service, secret):
+            logger.info(f"Credencial do {service} verificada recentemente. Verificação pulada.")
+            return True
+        
+        if not getattr(auth, verify_method)():
+            self.auth_cache.invalidate(service)
+            return False
+        
+        secret = getattr(auth, attribute, None)
+        if ttl > 0:
+            expires_at = self._credential_expiry(auth)
+            if expires_at is None:
+                expires_at = self.auth_cache.credential_expiry(service, secret)
+            self.auth_cache.store(service, secret, ttl, expires_at)
+            if expires_at is None and service == 'facebook' and secret:
+                # A expiração do token é consultada em segundo plano, sem atrasar a inicialização
+                threading.Thread(target=self._store_token_expiry, args=(service, secret, ttl), daemon=True).start()
+        return True
+    
+    def _credential_expiry(self, auth):
+        """
+        Obtém a expiração de uma credencial informada pelo objeto de autenticação
+        
+        Args:
+            auth (object): Objeto de autenticação do serviço
+        
+        Returns:
+            float: Expiração em timestamp Unix ou None se desconhecida
+        """
+        for attribute in ('token_expires_at', 'expires_at'):
+            value = getattr(auth, attribute, None)
+            if isinstance(value, datetime):
+                return value.timestamp()
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+                return float(value)
+        return None
+    
+    def _store_token_expiry(self, service, secret, ttl):
+        """
+        Consulta a expiração do token do Facebook pelo debug_token do Graph API e limita a ela
+        o registro da verificação (feito uma vez por token, em segundo plano)
+        
+        Args:
+            service (str): Nome do serviço no cache
+            secret (str): Token de acesso
+            ttl (int): Validade máxima do registro em segundos
+        """
+        try:
+            import requests
+            facebook_config = self.config.get('facebook', {})
+            graph_url = facebook_config.get('graph_url', 'https://graph.facebook.com').rstrip('/')
+            response = requests.get(
+                f"{graph_url}/{facebook_config.get('api_version', 'v22.0')}/debug_token",
+                params={'input_token': secret, 'access_token': secret},
+                timeout=30
+            )
+            response.raise_for_status()
+            expires_at = response.json().get('data', {}).get('expires_at') or 0
+        
+        except Exception as e:
+            logger.warning(f"Não foi possível obter a expiração do token do Facebook: {str(e)}")
+            return
+        
+        self.auth_cache.store(service, secret, ttl, float(expires_at) if expires_at > 0 else 0)
+    
+    def _setup_non_interactive(self):
+        """
+        Configura os componentes sem solicitar credenciais no terminal
+        
+        Returns:
+            bool: True se a configuração foi bem-sucedida
+        """
+        return self.setup(interactive=False)
+    
+    def _install_http_policy(self):
+        """
+        Instala o limite de taxa por host e as novas tentativas nas sessões HTTP dos clientes
+        """
+        from scripts.http_policy import ThrottledAdapter, find_session, install as install_http_policy
+        
+        facebook_config = self.config.get('facebook', {})
+        b2cor_config = self.config.get('b2cor', {})
+        retry_config = self.config.get('general', {}).get('retry', {})
+        
+        graph_url = facebook_config.get('graph_url', 'https://graph.facebook.com').rstrip('/')
+        b2cor_url = b2cor_config.get('base_url', 'https://b2corapi.agencialink.com.br').rstrip('/')
+        
+        # Chaveado pelo hostname, como em ThrottledAdapter.send (URLs com porta, ex: servidores locais)
+        self.http_adapter = adapter = ThrottledAdapter(
+            self.http_metrics,
+            rate_limits={
+                urlparse(graph_url).hostname: facebook_config.get('requests_per_minute', 200),
+                urlparse(b2cor_url).hostname: b2cor_config.get('requests_per_minute', 0)
+            },
+            max_retries_count=retry_config.get('max_retries', 5),
+            backoff_base=retry_config.get('backoff_base', 1.0),
+            backoff_max=retry_config.get('backoff_max', 60.0),
+            usage_threshold=facebook_config.get('usage_threshold', 75),
+            registry=self.metrics,
+            # POSTs de leitura: lotes do Graph API e busca de leads do B2Cor
+            idempotent_urls=[f"{graph_url}/", f"{b2cor_url}/lead/find"],
+            pool_maxsize=max(10, facebook_config.get('max_workers', 1), b2cor_config.get('max_workers', 1))
+        )
+        
+        clients = {
+            'Facebook': (self.facebook_extractor, self.facebook_auth),
+            'B2Cor': (self.b2cor_sender, self.b2cor_auth)
+        }
+        for name, objects in clients.items():
+            sessions = [session for session in map(find_session, objects) if session is not None]
+            if not sessions:
+                logger.warning(f"Cliente {name} não expõe uma sessão HTTP. Limite de taxa e novas tentativas não aplicados.")
+                continue
+            for session in sessions:
+                install_http_policy(session, adapter)
+    
+    @timed_stage('extract_leads')
+    def extract_leads(self, full_resync=False, commit_cursors=True):
+        """
+        Extrai leads do Facebook Ads
+        
+        Args:
+            full_resync (bool): Ignora os cursores salvos e busca toda a janela de days_back
+            commit_cursors (bool): Salva os cursores ao final da extração (se False, use _commit_cursors())
+        
+        Returns:
+            str: Caminho para o arquivo de leads extraídos ou None em caso de erro
+        """
+        try:
+            if not self.facebook_extractor:
+                logger.error("Extrator de leads do Facebook não configurado. Execute setup() primeiro.")
+                return None
+            
+            # Define o nome do arquivo de saída
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = os.path.join(self.leads_dir, f"facebook_leads_{timestamp}.json")
+            
+            # Extrai os leads
+            logger.info("Extraindo leads do Facebook Ads...")
+            form_ids, ad_ids = self._get_extraction_targets()
+            days_back = self.config.get('facebook', {}).get('days_back', 30)
+            
+            # Extrai os leads
+            max_workers = self.config.get('facebook', {}).get('max_workers', 1)
+            incremental = self.config.get('facebook', {}).get('incremental', True)
+            self._pending_cursors = {}
+            self._undelivered = []
+            
+            batch_requests = self.config.get('facebook', {}).get('batch_requests', False)
+            
+            if incremental or batch_requests or (max_workers > 1 and len(form_ids) + len(ad_ids) > 1):
+                leads = self._extract_leads_by_partition(
+                    output_file,
+                    form_ids=form_ids,
+                    ad_ids=ad_ids,
+                    days_back=days_back,
+                    max_workers=max_workers,
+                    use_cursors=incremental and not full_resync
+                )
+                num_leads = len(leads)
+                if leads:
+                    output_file = self._save_snapshot(output_file, leads)
+            else:
+                num_leads = self.facebook_extractor.extract_leads_to_json(
+                    output_file,
+                    form_ids=form_ids,
+                    ad_ids=ad_ids,
+                    days_back=days_back
+                )
+                if num_leads > 0 and self._get_snapshot_store():
+                    output_file = self._save_snapshot(output_file, self._read_leads_file(output_file))
+            
+            if commit_cursors:
+                self._commit_cursors()
+            
+            self.run_stats['http'] = self.http_metrics.snapshot()
+            
+            if num_leads > 0:
+                logger.info(f"Extraídos {num_leads} leads para {output_file}")
+                self.last_snapshot = output_file
+                return output_file
+            else:
+                logger.warning("Nenhum lead extraído.")
+                return None
+        
+        except Exception as e:
+            logger.error(f"Erro durante a extração de leads: {str(e)}")
+            return None
+    
+    def _get_extraction_targets(self):
+        """
+        Obtém os formulários e anúncios a serem extraídos
+        
+        Returns:
+            tuple: (form_ids, ad_ids)
+        """
+        form_ids = self.config.get('facebook', {}).get('form_ids', [])
+        ad_ids = self.config.get('facebook', {}).get('ad_ids', [])
+        batch_requests = self.config.get('facebook', {}).get('batch_requests', False)
+        
+        # Cada extração contabiliza as chamadas em lote desde o início
+        if batch_requests:
+            self._get_graph_batch_client().stats = {'round_trips': 0, 'sub_requests': 0, 'sub_request_errors': 0}
+        
+        # Se não houver IDs específicos configurados, lista os formulários disponíveis
+        if not form_ids and not ad_ids:
+            logger.info("Nenhum formulário ou anúncio específico configurado. Listando formulários disponíveis...")
+            forms = self._get_forms()
+            form_ids = [form.get('id') for form in forms]
+            logger.info(f"Encontrados {len(form_ids)} formulários para extração.")
+        
+        return form_ids, ad_ids
+    
+    def _form_source(self):
+        """
+        Obtém a origem da lista de formulários
+        
+        Returns:
+            tuple: (chave do cache, função que lista os formulários, verificação condicional ou None)
+        """
+        page_ids = self.config.get('facebook', {}).get('page_ids', [])
+        if self.config.get('facebook', {}).get('batch_requests', False) and page_ids:
+            client = self._get_graph_batch_client()
+            return (
+                'pages:' + ','.join(sorted(page_ids)),
+                lambda: client.list_forms(page_ids),
+                lambda etags: client.check_forms(page_ids, etags)
+            )
+        return 'extractor', self.facebook_extractor.get_forms, None
+    
+    def _get_forms(self):
+        """
+        Lista os formulários disponíveis, usando o cache quando configurado
+        
+        Returns:
+            list: Formulários
+        """
+        key, fetch, check = self._form_source()
+        if not self.config.get('facebook', {}).get('forms_cache_ttl', 86400):
+            return fetch()
+        return self._get_form_cache().get(key, fetch, check)
+    
+    def _get_form_cache(self):
+        """
+        Obtém o cache da lista de formulários, salvo ao lado do config.json
+        
+        Returns:
+            FormListCache: Cache de formulários
+        """
+        if not self.form_cache:
+            from scripts.form_cache import FormListCache
+            cache_file = os.path.join(self.state_dir, 'forms_cache.json')
+            self.form_cache = FormListCache(
+                cache_file,
+                ttl=self.config.get('facebook', {}).get('forms_cache_ttl', 86400),
+                max_stale=self.config.get('facebook', {}).get('forms_cache_max_stale', 604800)
+            )
+        return self.form_cache
+    
+    def refresh_forms(self):
+        """
+        Força uma nova listagem dos formulários e atualiza o cache
+        
+        Returns:
+            list: Formulários ou None em caso de erro
+        """
+        try:
+            if not self.facebook_extractor:
+                logger.error("Extrator de leads do Facebook não configurado. Execute setup() primeiro.")
+                return None
+            
+            key, fetch, check = self._form_source()
+            forms = self._get_form_cache().refresh(key, fetch, check, force=True)
+            logger.info(f"Cache de formulários atualizado com {len(forms)} formulários.")
+            return forms
+        
+        except Exception as e:
+            logger.error(f"Erro ao atualizar a lista de formulários: {str(e)}")
+            return None
+    
+    def _extract_leads_by_partition(self, output_file, form_ids, ad_ids, days_back, max_workers, use_cursors):
+        """
+        Extrai os leads de cada formulário/anúncio separadamente e combina os resultados
+        
+        Args:
+            output_file (str): Prefixo dos arquivos temporários de cada extração
+            form_ids (list): IDs dos formulários
+            ad_ids (list): IDs dos anúncios
+            days_back (int): Número de dias para trás (usado quando não há cursor)
+            max_workers (int): Número máximo de extrações simultâneas
+            use_cursors (bool): Busca apenas leads mais novos que o cursor salvo
+            
+        Returns:
+            list: Leads extraídos
+        """
+        leads = []
+        for partition_leads in self._iter_partition_leads(output_file, form_ids, ad_ids, days_back, max_workers, use_cursors):
+            leads.extend(partition_leads)
+        
+        return leads
+    
+    def _iter_partition_leads(self, part_prefix, form_ids, ad_ids, days_back, max_workers, use_cursors):
+        """
+        Extrai os formulários/anúncios, produzindo os leads novos de cada um assim que ficam prontos
+        
+        Args:
+            part_prefix (str): Prefixo dos arquivos temporários de cada extração
+            form_ids (list): IDs dos formulários
+            ad_ids (list): IDs dos anúncios
+            days_back (int): Número de dias para trás (usado quando não há cursor)
+            max_workers (int): Número máximo de extrações simultâneas
+            use_cursors (bool): Busca apenas leads mais novos que o cursor salvo
+            
+        Yields:
+            list: Leads novos (sem duplicatas) de um formulário/anúncio
+        """
+        partitions = [('form', form_id) for form_id in form_ids] + [('ad', ad_id) for ad_id in ad_ids]
+        batch_requests = self.config.get('facebook', {}).get('batch_requests', False)
+        graph_calls_before = self._graph_requests()
+        
+        if batch_requests:
+            logger.info(f"Extraindo {len(partitions)} formulários/anúncios com requisições em lote...")
+            results = self._iter_batched_partitions(partitions, days_back, use_cursors)
+        else:
+            logger.info(f"Extraindo {len(partitions)} formulários/anúncios com até {max_workers} workers...")
+            results = self._iter_pooled_partitions(partitions, part_prefix, days_back, max_workers, use_cursors)
+        
+        seen_ids = set()
+        stats = {'api_calls': 0, 'leads_read': 0, 'leads_new': 0, 'bytes_read': 0}
+        
+        for kind, object_id, result, error in results:
+            if error:
+                logger.error(f"Erro ao extrair leads de {kind} {object_id}: {str(error)}")
+                continue
+            
+            partition_leads, leads_read, bytes_read, newest = result
+            stats['leads_read'] += leads_read
+            stats['bytes_read'] += bytes_read
+            if newest:
+                self._pending_cursors[f"{kind}:{object_id}"] = newest
+            
+            # Um mesmo lead pode aparecer no formulário e no anúncio
+            new_leads = []
+            for lead in partition_leads:
+                lead_id = lead.get('id')
+                if lead_id in seen_ids:
+                    continue
+                if lead_id:
+                    seen_ids.add(lead_id)
+                new_leads.append(lead)
+            
+            stats['leads_new'] += len(new_leads)
+            if new_leads:
+                yield new_leads
+        
+        if batch_requests:
+            batch_stats = self._get_graph_batch_client().stats
+            stats['api_calls'] = batch_stats['round_trips']
+            stats['round_trips_saved'] = batch_stats['sub_requests'] - batch_stats['round_trips']
+            stats['sub_request_errors'] = batch_stats['sub_request_errors']
+        else:
+            # Chamadas HTTP feitas pelo extrator (inclui paginação e novas tentativas); não medido se
+            # a sessão do extrator não usa o adaptador HTTP
+            graph_calls = self._graph_requests() - graph_calls_before
+            stats['api_calls'] = graph_calls if graph_calls or not partitions else None
+        
+        self.run_stats['extract'] = stats
+        logger.info(f"Extração concluída. Chamadas: {stats['api_calls']}, Lidos: {stats['leads_read']}, Novos: {stats['leads_new']}, Bytes: {stats['bytes_read']}")
+        if batch_requests:
+            logger.info(f"Requisições em lote economizaram {stats['round_trips_saved']} chamadas HTTP.")
+    
+    def _graph_requests(self):
+        """
+        Obtém o número de requisições feitas ao Graph API até o momento
+        
+        Returns:
+            int: Requisições registradas pelo adaptador HTTP para o host do Graph API
+        """
+        graph_url = self.config.get('facebook', {}).get('graph_url', 'https://graph.facebook.com')
+        return self.http_metrics.snapshot().get(urlparse(graph_url).hostname, {}).get('requests', 0)
+    
+    def _iter_pooled_partitions(self, partitions, part_prefix, days_back, max_workers, use_cursors):
+        """
+        Extrai cada formulário/anúncio com o extrator, em paralelo
+        
+        Args:
+            partitions (list): Pares (tipo, ID) a extrair
+            part_prefix (str): Prefixo dos arquivos temporários de cada extração
+            days_back (int): Número de dias para trás (usado quando não há cursor)
+            max_workers (int): Número máximo de extrações simultâneas
+            use_cursors (bool): Busca apenas leads mais novos que o cursor salvo
+            
+        Yields:
+            tuple: (tipo, ID, resultado de _extract_partition, erro ou None)
+        """
+        # facebook.requests_per_minute é aplicado pelo adaptador HTTP (_install_http_policy) a
+        # cada requisição ao Graph API, inclusive a cada página, e é compartilhado entre os workers
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._extract_partition, kind, object_id, part_prefix, days_back, use_cursors): (kind, object_id)
+                for kind, object_id in partitions
+            }
+            
+            for future in as_completed(futures):
+                kind, object_id = futures[future]
+                try:
+                    yield kind, object_id, future.result(), None
+                except Exception as e:
+                    yield kind, object_id, None, e
+    
+    def _iter_batched_partitions(self, partitions, days_back, use_cursors):
+        """
+        Extrai os formulários/anúncios com requisições em lote do Graph API
+        
+        Args:
+            partitions (list): Pares (tipo, ID) a extrair
+            days_back (int): Número de dias para trás (usado quando não há cursor)
+            use_cursors (bool): Busca apenas leads mais novos que o cursor salvo
+            
+        Yields:
+            tuple: (tipo, ID, resultado no formato de _extract_partition, erro ou None)
+        """
+        client = self._get_graph_batch_client()
+        default_since = datetime.now(timezone.utc) - timedelta(days=days_back)
+        
+        windows = {}
+        requests_by_key = {}
+        for kind, object_id in partitions:
+            since = self._partition_since(kind, object_id, use_cursors)
+            windows[(kind, object_id)] = since
+            requests_by_key[(kind, object_id)] = client.leads_url(object_id, (since or default_since).timestamp())
+        
+        for (kind, object_id), partition_leads, error in client.fetch_edges(requests_by_key):
+            if error:
+                yield kind, object_id, None, error
+                continue
+            
+            bytes_read = len(json.dumps(partition_leads).encode('utf-8'))
+            partition_leads, leads_read, newest = self._filter_partition(partition_leads, windows[(kind, object_id)])
+            yield kind, object_id, (partition_leads, leads_read, bytes_read, newest), None
+    
+    def _get_graph_batch_client(self):
+        """
+        Obtém o cliente de requisições em lote do Graph API
+        
+        Returns:
+            GraphBatchClient: Cliente de requisições em lote
+        """
+        if not self.graph_batch_client:
+            import requests
+            from scripts.graph_batch import GraphBatchClient
+            from scripts.http_policy import install as install_http_policy
+            
+            session = requests.Session()
+            if self.http_adapter:
+                install_http_policy(session, self.http_adapter)
+            self.graph_batch_client = GraphBatchClient(
+                session,
+                self._get_graph_access_token(),
+                api_version=self.config.get('facebook', {}).get('api_version', 'v22.0'),
+                graph_url=self.config.get('facebook', {}).get('graph_url', 'https://graph.facebook.com')
+            )
+        return self.graph_batch_client
+    
+    def _get_graph_access_token(self):
+        """
+        Obtém o token de acesso ao Graph API
+        
+        Returns:
+            str: Token configurado ou o token do FacebookAdsAuth
+        """
+        return self.config.get('facebook', {}).get('access_token') or getattr(self.facebook_auth, 'access_token', None)
+    
+    def _partition_since(self, kind, object_id, use_cursors):
+        """
+        Obtém o created_time do último lead processado de um formulário/anúncio
+        
+        Args:
+            kind (str): 'form' ou 'ad'
+            object_id (str): ID do formulário/anúncio
+            use_cursors (bool): Se False, sempre retorna None
+            
+        Returns:
+            datetime: Data do cursor ou None
+        """
+        cursor = self.cursor_store.get(f"{kind}:{object_id}") if use_cursors else None
+        return parse_created_time(cursor.get('created_time')) if cursor else None
+    
+    def _filter_partition(self, partition_leads, since):
+        """
+        Descarta os leads já processados em execuções anteriores
+        
+        Args:
+            partition_leads (list): Leads de um formulário/anúncio
+            since (datetime): Data do cursor ou None
+            
+        Returns:
+            tuple: (leads novos, leads lidos, created_time mais recente)
+        """
+        newest = max(
+            (lead.get('created_time') for lead in partition_leads if parse_created_time(lead.get('created_time'))),
+            key=parse_created_time,
+            default=None
+        )
+        leads_read = len(partition_leads)
+        
+        if since:
+            partition_leads = [
+                lead for lead in partition_leads
+                if (parse_created_time(lead.get('created_time')) or datetime.max.replace(tzinfo=timezone.utc)) > since
+            ]
+        
+        return partition_leads, leads_read, newest
+    
+    def _extract_partition(self, kind, object_id, part_prefix, days_back, use_cursors):
+        """
+        Extrai os leads de um único formulário/anúncio
+        
+        Args:
+            kind (str): 'form' ou 'ad'
+            object_id (str): ID do formulário/anúncio
+            part_prefix (str): Prefixo do arquivo temporário
+            days_back (int): Número de dias para trás (usado quando não há cursor)
+            use_cursors (bool): Busca apenas leads mais novos que o cursor salvo
+            
+        Returns:
+            tuple: (leads novos, leads lidos, bytes lidos, created_time mais recente)
+        """
+        # Calcula a janela a partir do cursor, se houver
+        since = self._partition_since(kind, object_id, use_cursors)
+        partition_days = days_back
+        if since:
+            elapsed = datetime.now(timezone.utc) - since
+            partition_days = max(1, math.ceil(elapsed.total_seconds() / 86400))
+        
+        part_file = f"{part_prefix}.{kind}_{object_id}.part"
+        try:
+            with self.metrics.timer('extract_partition_seconds', kind=kind):
+                self.facebook_extractor.extract_leads_to_json(
+                    part_file,
+                    form_ids=[object_id] if kind == 'form' else [],
+                    ad_ids=[object_id] if kind == 'ad' else [],
+                    days_back=partition_days
+                )
+            bytes_read = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+            self.metrics.increment('extract_bytes_total', bytes_read, kind=kind)
+            partition_leads = self._read_leads_file(part_file)
+        finally:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+        
+        partition_leads, leads_read, newest = self._filter_partition(partition_leads, since)
+        return partition_leads, leads_read, bytes_read, newest
+    
+    def _commit_cursors(self):
+        """
+        Salva os cursores da última extração
+        
+        O cursor de um formulário/anúncio com leads não entregues fica logo antes do mais antigo
+        deles, para que sejam extraídos novamente na próxima execução (os leads entregues depois
+        dele são pulados pelo índice de deduplicação).
+        """
+        for lead in self._undelivered:
+            created_time = parse_created_time(lead.get('created_time'))
+            if not created_time:
+                continue
+            limit = created_time - timedelta(seconds=1)
+            for key in (f"form:{lead.get('form_id')}", f"ad:{lead.get('ad_id')}"):
+                pending = parse_created_time(self._pending_cursors.get(key))
+                if pending and pending > limit:
+                    self._pending_cursors[key] = limit.strftime(CREATED_TIME_FORMAT)
+        
+        if self._undelivered:
+            logger.warning(f"{len(self._undelivered)} leads não foram entregues. Os cursores não avançam além deles.")
+        self._undelivered = []
+        
+        if not self._pending_cursors:
+            return
+        
+        for key, created_time in self._pending_cursors.items():
+            self.cursor_store.update(key, created_time)
+        self.cursor_store.save()
+        self._pending_cursors = {}
+    
+    @timed_stage('backfill')
+    def backfill(self, from_date, to_date):
+        """
+        Carga histórica: baixa as exportações CSV de cada formulário/anúncio em fatias de datas,
+        em paralelo, salva os leads (sem duplicatas) e os envia para o B2Cor
+        
+        Args:
+            from_date (str): Data inicial no formato YYYY-MM-DD
+            to_date (str): Data final (inclusive) no formato YYYY-MM-DD
+        
+        Returns:
+            dict: Estatísticas do envio ou None em caso de erro
+        """
+        try:
+            if not self.facebook_extractor or not self.b2cor_sender:
+                logger.error("Componentes não configurados. Execute setup() primeiro.")
+                return None
+            
+            from scripts.csv_export import date_shards
+            
+            start = datetime.strptime(from_date, '%Y-%m-%d')
+            end = datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)
+            if end <= start:
+                logger.error(f"Intervalo de datas inválido: {from_date} a {to_date}")
+                return None
+            
+            facebook_config = self.config.get('facebook', {})
+            shards = date_shards(start, end, max(1, facebook_config.get('backfill_shard_days', 7)))
+            form_ids, ad_ids = self._get_extraction_targets()
+            tasks = [('form', form_id, shard) for form_id in form_ids for shard in shards]
+            tasks += [('ad', ad_id, shard) for ad_id in ad_ids for shard in shards]
+            max_workers = max(1, facebook_config.get('backfill_workers', 4))
+            logger.info(f"Carga histórica de {from_date} a {to_date}: {len(tasks)} exportações com até {max_workers} workers...")
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = os.path.join(self.leads_dir, f"facebook_leads_backfill_{timestamp}.json")
+            snapshot_store = self._get_snapshot_store()
+            writer = snapshot_store.open_segment(os.path.splitext(os.path.basename(output_file))[0]) if snapshot_store else None
+            leads = []
+            
+            exporter = self._get_csv_exporter()
+            seen_ids = set()
+            stats = {'shards': len(tasks), 'shards_failed': 0, 'leads_read': 0, 'leads_new': 0}
+            
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {
+                        executor.submit(self._download_shard, exporter, kind, object_id, shard): (kind, object_id)
+                        for kind, object_id, shard in tasks
+                    }
+                    
+                    for future in as_completed(futures):
+                        kind, object_id = futures[future]
+                        try:
+                            shard_leads = future.result()
+                        except Exception as e:
+                            stats['shards_failed'] += 1
+                            logger.error(f"Erro ao exportar leads de {kind} {object_id}: {str(e)}")
+                            continue
+                        
+                        # Um mesmo lead pode aparecer no formulário e no anúncio
+                        new_leads = []
+                        for lead in shard_leads:
+                            lead_id = lead.get('id')
+                            if lead_id in seen_ids:
+                                continue
+                            if lead_id:
+                                seen_ids.add(lead_id)
+                            new_leads.append(lead)
+                        
+                        stats['leads_read'] += len(shard_leads)
+                        stats['leads_new'] += len(new_leads)
+                        if writer:
+                            writer.write(new_leads)
+                        else:
+                            leads.extend(new_leads)
+            finally:
+                if writer:
+                    output_file = writer.close()
+                elif leads:
+                    self._write_leads_file(output_file, leads)
+            
+            self.run_stats['backfill'] = stats
+            logger.info(f"Carga histórica concluída. Exportações: {stats['shards']}, Falhas: {stats['shards_failed']}, Lidos: {stats['leads_read']}, Novos: {stats['leads_new']}")
+            if stats['shards_failed']:
+                logger.warning(f"{stats['shards_failed']} exportações falharam. Execute a carga histórica novamente para completá-las.")
+            
+            if not stats['leads_new']:
+                logger.warning("Nenhum lead encontrado no intervalo.")
+                return None
+            
+            self.last_snapshot = output_file
+            return self.send_leads(output_file, lane='backfill')
+        
+        except Exception as e:
+            logger.error(f"Erro durante a carga histórica: {str(e)}")
+            return None
+    
+    def _get_csv_exporter(self):
+        """
+        Cria o exportador CSV de leads com a política HTTP da integração
+        
+        Returns:
+            CsvLeadExporter: Exportador de leads
+        """
+        import requests
+        from scripts.csv_export import CsvLeadExporter
+        from scripts.http_policy import install as install_http_policy
+        
+        session = requests.Session()
+        if self.http_adapter:
+            install_http_policy(session, self.http_adapter)
+        export_url = self.config.get('facebook', {}).get('export_url', 'https://www.facebook.com/ads/lead_gen/export_csv/')
+        return CsvLeadExporter(session, self._get_graph_access_token(), export_url=export_url)
+    
+    def _download_shard(self, exporter, kind, object_id, shard):
+        """
+        Baixa e converte a exportação de um formulário/anúncio em uma fatia de datas
+        
+        Args:
+            exporter (CsvLeadExporter): Exportador de leads
+            kind (str): 'form' ou 'ad'
+            object_id (str): ID do formulário/anúncio
+            shard (tuple): (início, fim) em timestamp Unix
+            
+        Returns:
+            list: Leads da fatia
+        """
+        with self.metrics.timer('backfill_shard_seconds', kind=kind):
+            return list(exporter.iter_leads(object_id, kind, *shard))
+    
+    @timed_stage('reconcile')
+    def reconcile(self, from_date=None, to_date=None, resend=False):
+        """
+        Confere quais leads extraídos estão no B2Cor e, opcionalmente, reenvia os ausentes
+        
+        Sem o reenvio a conciliação só lê: o índice de deduplicação só é alterado quando os
+        leads ausentes são reenviados, e as alterações constam no relatório.
+        
+        Args:
+            from_date (str): Data inicial no formato YYYY-MM-DD (padrão: days_back dias atrás)
+            to_date (str): Data final (inclusive) no formato YYYY-MM-DD (padrão: hoje)
+            resend (bool): Reenvia os leads ausentes no B2Cor e atualiza o índice local
+        
+        Returns:
+            dict: Relatório da conciliação ou None em caso de erro
+        """
+        try:
+            if not self.b2cor_sender:
+                logger.error("Enviador de leads para o B2Cor não configurado. Execute setup() primeiro.")
+                return None
+            
+            from scripts.b2cor_reconcile import B2CorLeadPager, LeadReconciler
+            
+            if from_date and to_date:
+                start = datetime.strptime(from_date, '%Y-%m-%d')
+                end = datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)
+            else:
+                end = datetime.now()
+                start = end - timedelta(days=self.config.get('facebook', {}).get('days_back', 30))
+            
+            b2cor_config = self.config.get('b2cor', {})
+            reconciler = LeadReconciler(
+                b2cor_config.get('facebook_id_field', 'id_facebook'),
+                b2cor_config.get('reconcile_mismatch_statuses', ['Invalida', 'Repetida', 'devolvido'])
+            )
+            lead_index = self._get_lead_index()
+            sent_ids = set() if lead_index else None
+            
+            # Tabela hash com as chaves dos leads locais
+            logger.info(f"Conciliando leads de {start:%Y-%m-%d} a {end - timedelta(days=1):%Y-%m-%d}...")
+            for lead in self._iter_local_leads(start, end):
+                reconciler.add_local(lead)
+                if lead_index and lead_index.contains(lead):
+                    sent_ids.add(journal_key(lead))
+            
+            # Leads do B2Cor, página a página
+            pager = B2CorLeadPager(
+                self._get_b2cor_session(),
+                getattr(self.b2cor_auth, 'api_key', None) or b2cor_config.get('api_key'),
+                base_url=b2cor_config.get('base_url', 'https://b2corapi.agencialink.com.br'),
+                page_size=b2cor_config.get('reconcile_page_size', 500),
+                find_filters=b2cor_config.get('reconcile_filters', {})
+            )
+            for page in pager.iter_find(start.strftime('%Y-%m-%d'), (end - timedelta(days=1)).strftime('%Y-%m-%d')):
+                reconciler.add_remote(page)
+            for page in pager.iter_list_all():
+                reconciler.add_remote(page)
+            
+            report = reconciler.report(sent_ids)
+            report['pages'] = pager.stats['pages']
+            report['index_added'] = report['index_removed'] = 0
+            logger.info(f"Conciliação concluída. Locais: {report['local_total']}, B2Cor: {report['remote_total']}, Encontrados: {report['matched']}, Ausentes: {len(report['missing'])}, Duplicados: {len(report['duplicates'])}, Divergentes: {len(report['status_mismatch'])}, Fora do índice: {len(report['unindexed'])}")
+            
+            if resend and report['remote_total'] == 0 and report['local_total']:
+                # Nenhum lead no B2Cor costuma indicar filtro ou chave errada, não ausência real
+                logger.warning("O B2Cor não retornou nenhum lead no período. Reenvio dos ausentes cancelado.")
+                resend = False
+            
+            missing_ids = set(report['missing']) if resend else set()
+            unindexed_ids = set(report['unindexed']) if resend and lead_index else set()
+            missing_leads, unindexed_leads = [], []
+            if missing_ids or unindexed_ids:
+                for lead in self._iter_local_leads(start, end):
+                    lead_id = journal_key(lead)
+                    if lead_id in missing_ids:
+                        missing_ids.discard(lead_id)
+                        missing_leads.append(lead)
+                    elif lead_id in unindexed_ids:
+                        unindexed_ids.discard(lead_id)
+                        unindexed_leads.append(lead)
+            
+            # Leads que estão no B2Cor passam a constar como enviados no índice local
+            if unindexed_leads:
+                lead_index.add_many(unindexed_leads)
+                report['index_added'] = len(unindexed_leads)
+                logger.info(f"{len(unindexed_leads)} leads encontrados no B2Cor adicionados ao índice local.")
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            if missing_leads:
+                # Os leads ausentes deixam o índice de deduplicação para serem enviados novamente
+                if lead_index:
+                    lead_index.remove_many(missing_leads)
+                    report['index_removed'] = len(missing_leads)
+                leads_file = self._save_snapshot(
+                    os.path.join(self.leads_dir, f"facebook_leads_reconcile_{timestamp}.json"),
+                    missing_leads
+                )
+                logger.info(f"Reenviando {len(missing_leads)} leads ausentes no B2Cor...")
+                report['resend'] = self.send_leads(leads_file)
+            
+            report_file = os.path.join(self.leads_dir, f"reconcile_{timestamp}.json")
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4, ensure_ascii=False)
+            logger.info(f"Relatório da conciliação salvo em: {report_file}")
+            
+            self.run_stats['reconcile'] = {
+                'local_total': report['local_total'],
+                'remote_total': report['remote_total'],
+                'matched': report['matched'],
+                'missing': len(report['missing']),
+                'duplicates': len(report['duplicates']),
+                'status_mismatch': len(report['status_mismatch']),
+                'unindexed': len(report['unindexed']),
+                'index_added': report['index_added'],
+                'index_removed': report['index_removed']
+            }
+            return report
+        
+        except Exception as e:
+            logger.error(f"Erro durante a conciliação: {str(e)}")
+            return None
+    
+    def _iter_local_leads(self, start, end):
+        """
+        Lê os leads salvos localmente (segmentos e arquivos JSON) criados em um período
+        
+        Args:
+            start (datetime): Início do período
+            end (datetime): Fim do período (exclusive)
+            
+        Yields:
+            dict: Lead
+        """
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        
+        def in_period(leads):
+            for lead in leads:
+                created_time = parse_created_time(lead.get('created_time'))
+                if created_time and not start_ts <= created_time.timestamp() < end_ts:
+                    continue
+                yield lead
+        
+        snapshot_store = self._get_snapshot_store()
+        if snapshot_store:
+            # iter_leads inclui os leads criados exatamente em until: o fim exclusivo é aplicado aqui
+            yield from in_period(snapshot_store.iter_leads(since=start, until=end))
+        
+        for filename in sorted(os.listdir(self.leads_dir)):
+            if not filename.startswith('facebook_leads_') or not filename.endswith(('.json', '.jsonl')):
+                continue
+            yield from in_period(self._read_leads_file(os.path.join(self.leads_dir, filename)))
+    
+    def _get_b2cor_session(self):
+        """
+        Obtém a sessão HTTP do cliente do B2Cor (ou cria uma com a política HTTP da integração)
+        
+        Returns:
+            requests.Session: Sessão HTTP
+        """
+        import requests
+        from scripts.http_policy import find_session, install as install_http_policy
+        
+        session = find_session(self.b2cor_sender) or find_session(self.b2cor_auth)
+        if session:
+            return session
+        
+        session = requests.Session()
+        if self.http_adapter:
+            install_http_policy(session, self.http_adapter)
+        return session
+    
+    def _read_leads_file(self, leads_file):
+        """
+        Lê um arquivo de leads
+        
+        Args:
+            leads_file (str): Caminho para o arquivo de leads (JSON, JSONL ou segmento comprimido)
+            
+        Returns:
+            list: Lista de leads (vazia se o arquivo não existir)
+        """
+        if not os.path.exists(leads_file):
+            return []
+        
+        if self._is_segment(leads_file):
+            return list(self._get_snapshot_store().read_segment(leads_file))
+        
+        if leads_file.endswith('.jsonl'):
+            with open(leads_file, 'r', encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        
+        with open(leads_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        if isinstance(data, dict):
+            return data.get('leads', data.get('data', []))
+        return data
+    
+    def _write_leads_file(self, leads_file, leads):
+        """
+        Salva uma lista de leads em um arquivo JSON
+        
+        Args:
+            leads_file (str): Caminho para o arquivo de leads
+            leads (list): Lista de leads
+        """
+        with open(leads_file, 'w', encoding='utf-8') as f:
+            json.dump(leads, f, indent=4, ensure_ascii=False)
+    
+    def _get_snapshot_store(self):
+        """
+        Obtém o armazenamento de segmentos comprimidos, se estiver ativado
+        
+        Returns:
+            SnapshotStore: Armazenamento de segmentos ou None se desativado
+        """
+        general_config = self.config.get('general', {})
+        if not general_config.get('snapshot_store', True):
+            return None
+        
+        if not self.snapshot_store:
+            from scripts.snapshot_store import SnapshotStore
+            self.snapshot_store = SnapshotStore(
+                os.path.join(self.leads_dir, 'segments'),
+                compression=general_config.get('snapshot_compression', 'gzip')
+            )
+        return self.snapshot_store
+    
+    def _is_segment(self, leads_file):
+        """
+        Verifica se um arquivo de leads é um segmento comprimido
+        
+        Args:
+            leads_file (str): Caminho para o arquivo de leads
+            
+        Returns:
+            bool: True se o arquivo é um segmento do armazenamento
+        """
+        snapshot_store = self._get_snapshot_store()
+        return bool(snapshot_store and snapshot_store.is_segment(leads_file))
+    
+    def _save_snapshot(self, output_file, leads):
+        """
+        Salva os leads extraídos em um segmento comprimido (ou em JSON, se o armazenamento estiver desativado)
+        
+        Args:
+            output_file (str): Caminho do arquivo JSON da extração
+            leads (list): Leads extraídos
+            
+        Returns:
+            str: Caminho do arquivo salvo
+        """
+        snapshot_store = self._get_snapshot_store()
+        if not snapshot_store:
+            self._write_leads_file(output_file, leads)
+            return output_file
+        
+        name = os.path.splitext(os.path.basename(output_file))[0]
+        segment_file = snapshot_store.write_segment(name, leads)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        return segment_file
+    
+    def _append_snapshot(self, output_file, leads):
+        """
+        Acrescenta leads ao segmento de output_file (ou ao próprio arquivo JSONL, se o
+        armazenamento estiver desativado), criando-o se ainda não existir
+        
+        Args:
+            output_file (str): Caminho do arquivo JSONL
+            leads (list): Leads recebidos
+            
+        Returns:
+            str: Caminho do arquivo salvo
+        """
+        snapshot_store = self._get_snapshot_store()
+        if not snapshot_store:
+            with open(output_file, 'a', encoding='utf-8') as f:
+                for lead in leads:
+                    f.write(json.dumps(lead, ensure_ascii=False) + '\n')
+            return output_file
+        
+        name = os.path.splitext(os.path.basename(output_file))[0]
+        return snapshot_store.append_segment(name, leads)
+    
+    def find_lead(self, lead_id):
+        """
+        Busca um lead extraído pelo ID do Facebook
+        
+        Args:
+            lead_id (str): ID do lead no Facebook
+            
+        Returns:
+            tuple: (lead, caminho do segmento) ou None se o lead não for encontrado
+        """
+        snapshot_store = self._get_snapshot_store()
+        if not snapshot_store:
+            logger.info("Armazenamento de segmentos desativado na configuração.")
+            return None
+        return snapshot_store.get(lead_id)
+    
+    def migrate_snapshots(self):
+        """
+        Converte os arquivos de leads JSON/JSONL existentes em segmentos comprimidos
+        
+        Returns:
+            int: Número de arquivos convertidos ou None se o armazenamento estiver desativado
+        """
+        snapshot_store = self._get_snapshot_store()
+        if not snapshot_store:
+            logger.info("Armazenamento de segmentos desativado na configuração.")
+            return None
+        
+        converted = 0
+        for filename in sorted(os.listdir(self.leads_dir)):
+            file_path = os.path.join(self.leads_dir, filename)
+            if not filename.startswith('facebook_leads_') or not filename.endswith(('.json', '.jsonl')):
+                continue
+            
+            try:
+                leads = self._read_leads_file(file_path)
+                if leads:
+                    # Mantém a data do arquivo original para a retenção
+                    snapshot_store.write_segment(filename.split('.')[0], leads, created_at=os.path.getmtime(file_path))
+                os.remove(file_path)
+                converted += 1
+                logger.info(f"Arquivo convertido em segmento: {file_path}")
+            except Exception as e:
+                logger.error(f"Erro ao converter arquivo de leads {file_path}: {str(e)}")
+        
+        return converted
+    
+    @timed_stage('send_leads')
+    def send_leads(self, leads_file, resume=False, lane=None):
+        """
+        Envia leads para o B2Cor
+        
+        Args:
+            leads_file (str): Caminho para o arquivo de leads
+            resume (bool): Retoma um envio interrompido, pulando os leads já enviados segundo o diário
+            lane (str): Fila de todos os leads do arquivo (padrão: pela idade de cada lead)
+            
+        Returns:
+            dict: Estatísticas de processamento ou None em caso de erro
+        """
+        try:
+            if not self.b2cor_sender:
+                logger.error("Enviador de leads para o B2Cor não configurado. Execute setup() primeiro.")
+                return None
+            
+            if not leads_file or not os.path.exists(leads_file):
+                logger.error(f"Arquivo de leads não encontrado: {leads_file}")
+                return None
+            
+            # Envia os leads
+            logger.info(f"Enviando leads para o B2Cor a partir de {leads_file}...")
+            max_workers = self.config.get('b2cor', {}).get('max_workers', 1)
+            started_at = time.monotonic()
+            
+            journal = None
+            if self.config.get('b2cor', {}).get('journal', True):
+                journal = SendJournal(f"{leads_file}.journal")
+            
+            if max_workers > 1 or self._get_lead_index() or journal or self._is_segment(leads_file) or self._get_prioritizer():
+                leads = self._read_leads_file(leads_file)
+                already_sent = 0
+                partial = []
+                batch_size = None
+                if resume:
+                    leads, already_sent, partial = self._resume_from_journal(leads, journal)
+                    # Um lead por chamada: a entrega de cada lead retomado fica registrada no diário
+                    batch_size = 1
+                
+                leads, skipped = self._filter_duplicates(leads)
+                if journal:
+                    journal.open(resume=resume)
+                try:
+                    stats = self._send_lead_batches(leads, max_workers, journal=journal, lane=lane, batch_size=batch_size)
+                    if partial:
+                        self._merge_stats(stats, self._complete_partial(leads_file, partial, journal))
+                finally:
+                    if journal:
+                        journal.close()
+                stats.pop('delivered_ids', None)
+                stats['total'] = stats.get('total', 0) + skipped + already_sent
+                stats['skipped'] = stats.get('skipped', 0) + skipped + already_sent
+            else:
+                stats = self.b2cor_sender.process_facebook_leads(leads_file, **self._sender_options())
+            
+            elapsed = time.monotonic() - started_at
+            leads_per_second = stats.get('total', 0) / elapsed if elapsed > 0 else 0.0
+            self.run_stats['send'] = stats
+            self.run_stats['http'] = self.http_metrics.snapshot()
+            self.run_stats['lanes'] = self._lane_stats()
+            
+            logger.info(f"Envio concluído. Total: {stats.get('total', 0)}, Sucesso: {stats.get('success', 0)}, Falha: {stats.get('failed', 0)}, Pulados: {stats.get('skipped', 0)}, Leads/s: {leads_per_second:.1f}")
+            return stats
+        
+        except Exception as e:
+            logger.error(f"Erro durante o envio de leads: {str(e)}")
+            return None
+    
+    def _resume_from_journal(self, leads, journal):
+        """
+        Separa os leads do arquivo pela situação registrada no diário
+        
+        Os leads sem registro de envio (SENT) são enviados novamente, exceto os registrados como
+        PARTIAL: eles já foram criados no B2Cor (ou a criação não pôde ser confirmada) e não são
+        criados de novo (ver _complete_partial).
+        
+        Args:
+            leads (list): Leads do arquivo
+            journal (SendJournal): Diário do arquivo (ou None se desativado)
+            
+        Returns:
+            tuple: (leads a enviar, número de leads já enviados, leads PARTIAL)
+        """
+        if not journal or not os.path.exists(journal.journal_file):
+            logger.warning("Diário de envio não encontrado. Enviando todos os leads do arquivo.")
+            return leads, 0, []
+        
+        states = journal.replay()
+        remaining, partial = [], []
+        for lead in leads:
+            state = states.get(journal_key(lead))
+            if state == PARTIAL:
+                partial.append(lead)
+            elif state != SENT:
+                remaining.append(lead)
+        already_sent = len(leads) - len(remaining) - len(partial)
+        
+        logger.info(f"Retomando envio: {already_sent} leads já enviados, {len(remaining)} a enviar, {len(partial)} criados sem concluir funil/histórico.")
+        return remaining, already_sent, partial
+    
+    def _complete_partial(self, leads_file, leads, journal=None):
+        """
+        Conclui o funil, o responsável e o histórico dos leads PARTIAL sem criá-los novamente
+        
+        Usa o método opcional complete_facebook_leads do enviador (mesmos argumentos de
+        process_facebook_leads). Sem ele, os leads são salvos para revisão manual e continuam
+        PARTIAL no diário.
+        
+        Args:
+            leads_file (str): Arquivo de leads retomado
+            leads (list): Leads PARTIAL
+            journal (SendJournal): Diário do arquivo (opcional)
+            
+        Returns:
+            dict: Estatísticas de processamento, com os leads não concluídos em 'partial'
+        """
+        complete = getattr(self.b2cor_sender, 'complete_facebook_leads', None)
+        if not complete:
+            review_file = os.path.join(self.leads_dir, f"partial_{os.path.basename(leads_file).split('.')[0]}.json")
+            self._write_leads_file(review_file, leads)
+            logger.warning(f"{len(leads)} leads criados no B2Cor sem concluir funil/histórico não foram reenviados. Revise-os em: {review_file}")
+            return {'total': len(leads), 'partial': len(leads)}
+        
+        batch_file = os.path.join(self.leads_dir, f".complete_batch_{os.getpid()}.json.part")
+        try:
+            self._write_leads_file(batch_file, leads)
+            batch_stats = complete(batch_file, **self._sender_options())
+        except Exception as e:
+            logger.error(f"Erro ao concluir leads criados parcialmente: {str(e)}")
+            batch_stats = None
+        finally:
+            if os.path.exists(batch_file):
+                os.remove(batch_file)
+        
+        delivered = self._batch_outcome(leads, batch_stats)[0]
+        if delivered:
+            if journal:
+                journal.record(delivered, SENT)
+            lead_index = self._get_lead_index()
+            if lead_index:
+                lead_index.add_many(delivered)
+        
+        if batch_stats is None:
+            batch_stats = {'total': len(leads), 'success': 0, 'failed': len(leads)}
+        stats = {key: value for key, value in batch_stats.items() if key not in ('delivered_ids', 'partial_ids')}
+        stats['partial'] = len(leads) - len(delivered)
+        return stats
+    
+    def _get_lead_index(self):
+        """
+        Obtém o índice de leads já enviados, se a deduplicação estiver ativada
+        
+        Returns:
+            LeadIndex: Índice de leads ou None se desativado
+        """
+        if not self.config.get('general', {}).get('dedup', True):
+            return None
+        
+        if not self.lead_index:
+            from scripts.lead_index import LeadIndex
+            index_file = os.path.join(self.state_dir, 'lead_index.sqlite3')
+            self.lead_index = LeadIndex(index_file)
+        return self.lead_index
+    
+    def _filter_duplicates(self, leads):
+        """
+        Remove os leads já enviados (mesmo ID, celular ou email) antes de qualquer chamada ao B2Cor
+        
+        Args:
+            leads (list): Lista de leads
+            
+        Returns:
+            tuple: (leads a enviar, número de leads pulados)
+        """
+        lead_index = self._get_lead_index()
+        if not lead_index:
+            return leads, 0
+        
+        from scripts.lead_index import lead_keys
+        
+        new_leads = []
+        seen_keys = set()
+        for lead in leads:
+            keys = lead_keys(lead)
+            if seen_keys.intersection(keys) or lead_index.contains(lead):
+                continue
+            seen_keys.update(keys)
+            new_leads.append(lead)
+        
+        skipped = len(leads) - len(new_leads)
+        if skipped:
+            logger.info(f"{skipped} leads já enviados anteriormente foram pulados.")
+        return new_leads, skipped
+    
+    def warm_up_index(self):
+        """
+        Popula o índice de deduplicação com os arquivos de leads existentes
+        
+        Returns:
+            int: Número de leads indexados ou None se a deduplicação estiver desativada
+        """
+        lead_index = self._get_lead_index()
+        if not lead_index:
+            logger.info("Deduplicação desativada na configuração.")
+            return None
+        
+        total = lead_index.warm_up(self.leads_dir)
+        
+        snapshot_store = self._get_snapshot_store()
+        if snapshot_store:
+            for name, _, _ in snapshot_store.list_segments():
+                leads = list(snapshot_store.read_segment(name))
+                lead_index.add_many(leads)
+                total += len(leads)
+        
+        logger.info(f"Índice de deduplicação populado com {total} leads de {self.leads_dir}")
+        return total
+    
+    def _sender_options(self):
+        """
+        Obtém as opções de envio configuradas para o B2Cor
+        
+        Returns:
+            dict: Argumentos para process_facebook_leads
+        """
+        return {
+            'add_to_funnel': self.config.get('b2cor', {}).get('add_to_funnel', True),
+            'change_user': self.config.get('b2cor', {}).get('change_user', True),
+            'add_history': self.config.get('b2cor', {}).get('add_history', True)
+        }
+    
+    def _send_lead_batches(self, leads, max_workers, journal=None, lane=None, batch_size=None):
+        """
+        Envia os leads em lotes simultâneos, dos mais urgentes para os menos urgentes
+        
+        Cada lead pertence a um único lote, portanto a sequência criação -> funil ->
+        responsável -> histórico de cada lead continua sendo executada em ordem.
+        
+        Args:
+            leads (list): Lista de leads
+            max_workers (int): Número máximo de lotes enviados simultaneamente
+            journal (SendJournal): Diário para registrar o progresso de cada lote (opcional)
+            lane (str): Fila de todos os leads (padrão: pela idade de cada lead)
+            batch_size (int): Número de leads por lote (padrão: _batch_size())
+            
+        Returns:
+            dict: Estatísticas de processamento somadas de todos os lotes
+        """
+        self._map_fields(leads)
+        batch_size = batch_size or self._batch_size()
+        options = self._sender_options()
+        stats = {'total': 0, 'success': 0, 'failed': 0, 'skipped': 0}
+        stats_lock = threading.Lock()
+        
+        lanes = self._create_lane_queue()
+        for batch_lane, priority, batch in self._plan_batches(leads, batch_size, lane):
+            lanes.put(batch_lane, priority, batch)
+        lanes.close()
+        
+        def worker():
+            index = 0
+            while True:
+                item = lanes.get()
+                if item is None:
+                    return
+                batch_stats = self._deliver_batch(*item, index, options, journal)
+                index += 1
+                with stats_lock:
+                    self._merge_stats(stats, batch_stats)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(worker) for _ in range(max(1, max_workers))]:
+                future.result()
+        
+        return stats
+    
+    def _get_prioritizer(self):
+        """
+        Obtém o priorizador de envio, se a priorização estiver ativada
+        
+        Returns:
+            LeadPrioritizer: Priorizador ou None se desativado
+        """
+        priority_config = self.config.get('b2cor', {}).get('priority', {})
+        if not priority_config.get('enabled', True):
+            return None
+        
+        if not self.lead_prioritizer:
+            from scripts.lead_priority import LeadPrioritizer
+            self.lead_prioritizer = LeadPrioritizer(
+                form_weights=priority_config.get('form_weights', {}),
+                campaign_weights=priority_config.get('campaign_weights', {}),
+                realtime_window_hours=priority_config.get('realtime_window_hours', 24)
+            )
+        return self.lead_prioritizer
+    
+    def _create_lane_queue(self, maxsize=0):
+        """
+        Cria a fila de lotes com as lanes configuradas
+        
+        Args:
+            maxsize (int): Número máximo de lotes por lane (0 = sem limite)
+            
+        Returns:
+            LaneQueue: Fila de lotes
+        """
+        from scripts.lead_priority import LaneQueue
+        priority_config = self.config.get('b2cor', {}).get('priority', {})
+        return LaneQueue(priority_config.get('lane_weights'), maxsize=maxsize)
+    
+    def _plan_batches(self, leads, batch_size, lane=None):
+        """
+        Divide os leads em lotes por lane e prioridade (ou na ordem do arquivo, se desativado)
+        
+        Args:
+            leads (list): Lista de leads
+            batch_size (int): Número de leads por lote
+            lane (str): Fila de todos os leads (padrão: pela idade de cada lead)
+            
+        Returns:
+            list: Tuplas (lane, prioridade, lote)
+        """
+        prioritizer = self._get_prioritizer()
+        if prioritizer:
+            return prioritizer.plan(leads, batch_size, lane)
+        
+        return [
+            (lane or 'default', i, leads[i:i + batch_size])
+            for i in range(0, len(leads), batch_size)
+        ]
+    
+    def _deliver_batch(self, lane, batch, waited, index, options, journal=None):
+        """
+        Envia um lote retirado da fila e registra a espera na fila e a latência ponta a ponta
+        (created_time no Facebook -> aceito pelo B2Cor) de cada lead
+        
+        Args:
+            lane (str): Lane do lote
+            batch (list): Leads do lote
+            waited (float): Tempo (em segundos) que o lote esperou na fila
+            index (int): Número do lote (usado no nome do arquivo temporário)
+            options (dict): Argumentos para process_facebook_leads
+            journal (SendJournal): Diário para registrar o progresso do lote (opcional)
+            
+        Returns:
+            dict: Estatísticas de processamento do lote
+        """
+        from scripts.lead_priority import created_timestamp
+        
+        self.metrics.observe('lane_wait_seconds', waited, lane=lane)
+        try:
+            batch_stats = self._send_batch(index, batch, options, journal)
+        except Exception as e:
+            logger.error(f"Erro ao enviar lote de leads: {str(e)}")
+            return {'total': len(batch), 'failed': len(batch)}
+        
+        # A latência é registrada apenas para os leads entregues
+        delivered_ids = set(batch_stats.get('delivered_ids', []))
+        if delivered_ids:
+            accepted_at = time.time()
+            sla_seconds = self.config.get('b2cor', {}).get('priority', {}).get('sla_seconds', 300)
+            breaches = 0
+            for lead in batch:
+                if journal_key(lead) not in delivered_ids:
+                    continue
+                created_at = created_timestamp(lead)
+                if created_at is None:
+                    continue
+                latency = max(0.0, accepted_at - created_at)
+                self.metrics.observe('lead_latency_seconds', latency, lane=lane)
+                if sla_seconds and latency > sla_seconds:
+                    breaches += 1
+            if breaches:
+                self.metrics.increment('lead_sla_breaches_total', breaches, lane=lane)
+        
+        return batch_stats
+    
+    def _lane_stats(self):
+        """
+        Resume a espera na fila e a latência ponta a ponta de cada lane
+        
+        Returns:
+            dict: Lane -> lotes, leads, espera (p50/p95) e latência (p50/p95) em segundos e violações do SLA
+        """
+        summary = self.metrics.summary()
+        lanes = {}
+        for entry in summary['latencies'].get('lane_wait_seconds', []):
+            lanes.setdefault(entry['labels']['lane'], {}).update({
+                'batches': entry['count'],
+                'wait_p50_seconds': round(entry['p50'], 3),
+                'wait_p95_seconds': round(entry['p95'], 3)
+            })
+        for entry in summary['latencies'].get('lead_latency_seconds', []):
+            lanes.setdefault(entry['labels']['lane'], {}).update({
+                'leads': entry['count'],
+                'latency_p50_seconds': round(entry['p50'], 3),
+                'latency_p95_seconds': round(entry['p95'], 3)
+            })
+        for entry in summary['counters'].get('lead_sla_breaches_total', []):
+            lanes.setdefault(entry['labels']['lane'], {})['sla_breaches'] = entry['value']
+        return lanes
     
-    def extract_leads(self):
+    def _map_fields(self, leads):
         """
-        Extrai leads do Facebook Ads
+        Calcula os campos do B2Cor (nome, email, uf, celular_ddd, ...) de todos os leads de uma
+        vez e os anexa a cada lead em 'b2cor_fields', que o enviador usa no lugar do próprio
+        mapeamento. Com b2cor.map_fields nulo (padrão), só é feito para enviadores que leem
+        esse campo (uses_b2cor_fields); true/false força ou desativa o mapeamento.
+        
+        Args:
+            leads (list): Lista de leads (alterada no lugar)
+        """
+        b2cor_config = self.config.get('b2cor', {})
+        map_fields = b2cor_config.get('map_fields')
+        if map_fields is None:
+            map_fields = getattr(self.b2cor_sender, 'uses_b2cor_fields', False)
+        if not leads or not map_fields:
+            return
+        
+        if not self.field_mapper:
+            from scripts.field_mapping import FieldMapper
+            self.field_mapper = FieldMapper(b2cor_config.get('field_mapping', {}))
+        
+        with self.metrics.timer('map_fields_seconds'):
+            payloads = self.field_mapper.transform(leads)
+        for lead, payload in zip(leads, payloads):
+            lead['b2cor_fields'] = payload
+    
+    def _merge_stats(self, stats, batch_stats):
+        """
+        Soma as estatísticas de um lote às estatísticas gerais (as listas, como 'delivered_ids', são concatenadas)
+        
+        Args:
+            stats (dict): Estatísticas gerais (alteradas no próprio dicionário)
+            batch_stats (dict): Estatísticas do lote
+        """
+        for key, value in (batch_stats or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats[key] = stats.get(key, 0) + value
+            elif isinstance(value, list):
+                stats.setdefault(key, []).extend(value)
+    
+    def _batch_size(self):
+        """
+        Obtém o número de leads enviados em cada chamada ao enviador
+        
+        O B2CorLeadsSender informa apenas os totais de cada chamada: com ele cada lead é enviado
+        em sua própria chamada, para que se saiba quais leads foram entregues. Lotes de
+        b2cor.batch_size leads são usados com enviadores que informam o resultado de cada lead
+        (reports_lead_results).
         
         Returns:
-            str: Caminho para o arquivo de leads extraídos ou None em caso de erro
+            int: Número de leads por lote
         """
-        try:
-            if not self.facebook_extractor:
-                logger.error("Extrator de leads do Facebook não configurado. Execute setup() primeiro.")
-                return None
-            
-            # Define o nome do arquivo de saída
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = os.path.join(self.leads_dir, f"facebook_leads_{timestamp}.json")
-            
-            # Extrai os leads
-            logger.info("Extraindo leads do Facebook Ads...")
-            form_ids = self.config.get('facebook', {}).get('form_ids', [])
-            ad_ids = self.config.get('facebook', {}).get('ad_ids', [])
-            days_back = self.config.get('facebook', {}).get('days_back', 30)
-            
-            # Se não houver IDs específicos configurados, lista os formulários disponíveis
-            if not form_ids and not ad_ids:
-                logger.info("Nenhum formulário ou anúncio específico configurado. Listando formulários disponíveis...")
-                forms = self.facebook_extractor.get_forms()
-                form_ids = [form.get('id') for form in forms]
-                logger.info(f"Encontrados {len(form_ids)} formulários para extração.")
-            
-            # Extrai os leads
-            num_leads = self.facebook_extractor.extract_leads_to_json(
-                output_file,
-                form_ids=form_ids,
-                ad_ids=ad_ids,
-                days_back=days_back
-            )
+        if not getattr(self.b2cor_sender, 'reports_lead_results', False):
+            return 1
+        return max(1, self.config.get('b2cor', {}).get('batch_size', 50))
+    
+    def _batch_outcome(self, batch, batch_stats):
+        """
+        Classifica os leads de um lote pelo resultado do envio
+        
+        Args:
+            batch (list): Leads do lote
+            batch_stats (dict): Estatísticas do enviador (None se a chamada falhou)
             
-            if num_leads > 0:
-                logger.info(f"Extraídos {num_leads} leads para {output_file}")
-                return output_file
-            else:
-                logger.warning("Nenhum lead extraído.")
-                return None
+        Returns:
+            tuple: (leads entregues, leads criados com falha no funil/histórico ou com resultado
+                desconhecido, leads não criados)
+        """
+        if batch_stats and 'delivered_ids' in batch_stats:
+            delivered_ids = set(map(str, batch_stats['delivered_ids']))
+            partial_ids = set(map(str, batch_stats.get('partial_ids', [])))
+            delivered, partial, failed = [], [], []
+            for lead in batch:
+                key = journal_key(lead)
+                if key in delivered_ids:
+                    delivered.append(lead)
+                elif key in partial_ids:
+                    partial.append(lead)
+                else:
+                    failed.append(lead)
+            return delivered, partial, failed
         
-        except Exception as e:
-            logger.error(f"Erro durante a extração de leads: {str(e)}")
-            return None
+        if batch_stats and not batch_stats.get('failed', 0):
+            return list(batch), [], []
+        # Sem o resultado de cada lead não se sabe quais foram criados
+        return [], list(batch), []
     
-    def send_leads(self, leads_file):
+    def _send_batch(self, index, batch, options, journal=None):
         """
-        Envia leads para o B2Cor
+        Envia um lote de leads para o B2Cor
+        
+        Os leads de um lote com falhas não são reenviados: o B2Cor pode já ter criado alguns
+        deles. Os leads não entregues ficam no diário (PARTIAL) e limitam o avanço dos cursores.
         
         Args:
-            leads_file (str): Caminho para o arquivo de leads
+            index (int): Número do lote (usado no nome do arquivo temporário)
+            batch (list): Leads do lote
+            options (dict): Argumentos para process_facebook_leads
+            journal (SendJournal): Diário para registrar o progresso do lote (opcional)
             
         Returns:
-            dict: Estatísticas de processamento ou None em caso de erro
+            dict: Estatísticas de processamento do lote, com as chaves do diário dos leads
+                entregues em 'delivered_ids'
         """
+        batch_file = os.path.join(self.leads_dir, f".send_batch_{os.getpid()}_{threading.get_ident()}_{index}.json.part")
         try:
-            if not self.b2cor_sender:
-                logger.error("Enviador de leads para o B2Cor não configurado. Execute setup() primeiro.")
-                return None
-            
-            if not leads_file or not os.path.exists(leads_file):
-                logger.error(f"Arquivo de leads não encontrado: {leads_file}")
-                return None
-            
-            # Envia os leads
-            logger.info(f"Enviando leads para o B2Cor a partir de {leads_file}...")
-            add_to_funnel = self.config.get('b2cor', {}).get('add_to_funnel', True)
-            change_user = self.config.get('b2cor', {}).get('change_user', True)
-            add_history = self.config.get('b2cor', {}).get('add_history', True)
-            
-            stats = self.b2cor_sender.process_facebook_leads(
-                leads_file,
-                add_to_funnel=add_to_funnel,
-                change_user=change_user,
-                add_history=add_history
-            )
+            self._write_leads_file(batch_file, batch)
+            if journal:
+                journal.record(batch, STARTED)
             
-            logger.info(f"Envio concluído. Total: {stats.get('total', 0)}, Sucesso: {stats.get('success', 0)}, Falha: {stats.get('failed', 0)}, Pulados: {stats.get('skipped', 0)}")
-            return stats
+            try:
+                with self.metrics.timer('send_batch_seconds'):
+                    batch_stats = self.b2cor_sender.process_facebook_leads(batch_file, **options)
+            except Exception as e:
+                logger.error(f"Erro ao enviar lote de {len(batch)} leads: {str(e)}")
+                batch_stats = None
+            else:
+                self.metrics.increment('send_leads_total', len(batch))
+        finally:
+            if os.path.exists(batch_file):
+                os.remove(batch_file)
         
-        except Exception as e:
-            logger.error(f"Erro durante o envio de leads: {str(e)}")
-            return None
+        delivered, partial, failed = self._batch_outcome(batch, batch_stats)
+        if journal:
+            if delivered:
+                journal.record(delivered, SENT)
+            if partial:
+                journal.record(partial, PARTIAL)
+        
+        if delivered:
+            lead_index = self._get_lead_index()
+            if lead_index:
+                lead_index.add_many(delivered)
+        if partial or failed:
+            self._undelivered.extend(partial + failed)
+        
+        if batch_stats is None:
+            batch_stats = {'total': len(batch), 'success': 0, 'failed': len(batch)}
+        stats = {key: value for key, value in batch_stats.items() if key not in ('delivered_ids', 'partial_ids')}
+        stats['delivered_ids'] = [journal_key(lead) for lead in delivered]
+        return stats
     
-    def process(self):
+    def process(self, full_resync=False):
         """
         Processa a integração completa: extrai leads e envia para o B2Cor
         
+        Args:
+            full_resync (bool): Ignora os cursores salvos e busca toda a janela de days_back
+        
+        Returns:
+            bool: True se o processamento foi bem-sucedido
+        """
+        self.run_stats = {}
+        self.http_metrics.reset()
+        # A duração do setup (feito uma vez, antes da primeira execução) continua no resumo
+        self.metrics.reset(keep=[('stage_seconds', {'stage': 'setup'})])
+        self.last_snapshot = None
+        
+        try:
+            return self._process_run(full_resync=full_resync)
+        finally:
+            self._export_metrics()
+    
+    @timed_stage('process')
+    def _process_run(self, full_resync=False):
+        """
+        Executa uma rodada de extração e envio (ver process())
+        
+        Args:
+            full_resync (bool): Ignora os cursores salvos e busca toda a janela de days_back
+        
         Returns:
             bool: True se o processamento foi bem-sucedido
         """
@@ -255,8 +1927,11 @@ class FacebookB2CorIntegration:
                 logger.error("Componentes não configurados. Execute setup() primeiro.")
                 return False
             
+            if self.config.get('general', {}).get('streaming', False):
+                return self._process_streaming(full_resync=full_resync)
+            
             # Extrai os leads
-            leads_file = self.extract_leads()
+            leads_file = self.extract_leads(full_resync=full_resync, commit_cursors=False)
             
             if not leads_file:
                 logger.warning("Nenhum lead extraído ou erro durante a extração.")
@@ -269,6 +1944,9 @@ class FacebookB2CorIntegration:
                 logger.error("Erro durante o envio de leads.")
                 return False
             
+            # Avança os cursores somente após o envio
+            self._commit_cursors()
+            
             # Limpa arquivos antigos
             self._cleanup_old_files()
             
@@ -278,6 +1956,298 @@ class FacebookB2CorIntegration:
             logger.error(f"Erro durante o processamento: {str(e)}")
             return False
     
+    def _export_metrics(self):
+        """
+        Grava as métricas no formato do Prometheus e o resumo JSON da execução ao lado do arquivo de leads
+        """
+        try:
+            metrics_file = self.config.get('general', {}).get('metrics_file') or os.path.join(self.leads_dir, 'metrics.prom')
+            self.metrics.write_prometheus(metrics_file)
+            
+            if not self.last_snapshot:
+                return
+            
+            snapshot_name = os.path.basename(self.last_snapshot).split('.')[0]
+            summary_file = os.path.join(self.leads_dir, snapshot_name.replace('facebook_leads_', 'run_summary_') + '.json')
+            summary = {
+                'snapshot': self.last_snapshot,
+                'finished_at': datetime.now().isoformat(),
+                'run_stats': self.run_stats,
+                'scheduler': self.scheduler.get_stats(),
+                'benchmark': self.benchmark_summary(),
+                'metrics': self.metrics.summary()
+            }
+            with open(summary_file, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=4, ensure_ascii=False)
+            logger.info(f"Resumo da execução salvo em: {summary_file}")
+        
+        except Exception as e:
+            logger.error(f"Erro ao gravar as métricas: {str(e)}")
+    
+    def benchmark_summary(self):
+        """
+        Resume os indicadores de desempenho da última execução
+        
+        Returns:
+            dict: Vazão (leads/s), p95 de cada latência, pico de memória e número de chamadas de API
+        """
+        summary = self.metrics.summary()
+        
+        p95_seconds = {}
+        for name, series in summary['latencies'].items():
+            for entry in series:
+                labels = ','.join(f"{key}={value}" for key, value in sorted(entry['labels'].items()))
+                p95_seconds[f"{name}{{{labels}}}" if labels else name] = entry['p95']
+        
+        # Vazão do processamento completo ou, sem ele, do envio
+        stage_seconds = {entry['labels'].get('stage'): entry['sum'] for entry in summary['latencies'].get('stage_seconds', [])}
+        elapsed = stage_seconds.get('process') or stage_seconds.get('send_leads')
+        leads_total = self.run_stats.get('send', {}).get('total', 0)
+        
+        return {
+            'leads_total': leads_total,
+            'leads_per_second': leads_total / elapsed if elapsed else None,
+            'p95_seconds': p95_seconds,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'api_calls': sum(entry['value'] for entry in summary['counters'].get('http_requests_total', []))
+        }
+    
+    def check_baseline(self, baseline_file, tolerance=0.2):
+        """
+        Compara a última execução com uma execução de referência
+        
+        Args:
+            baseline_file (str): Resumo de execução (run_summary_*.json) ou arquivo salvo com --save-baseline
+            tolerance (float): Variação relativa aceita (0.2 = 20%)
+        
+        Returns:
+            list: Regressões encontradas ou None em caso de erro
+        """
+        try:
+            with open(baseline_file, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            baseline = baseline.get('benchmark', baseline)
+            
+            regressions = compare_summaries(self.benchmark_summary(), baseline, tolerance)
+            for regression in regressions:
+                logger.warning(f"Regressão de desempenho: {regression}")
+            return regressions
+        
+        except Exception as e:
+            logger.error(f"Erro ao comparar com a execução de referência: {str(e)}")
+            return None
+    
+    def save_baseline(self, baseline_file):
+        """
+        Salva os indicadores da última execução como referência
+        
+        Args:
+            baseline_file (str): Caminho do arquivo de referência
+        """
+        with open(baseline_file, 'w', encoding='utf-8') as f:
+            json.dump(self.benchmark_summary(), f, indent=4)
+        logger.info(f"Execução de referência salva em: {baseline_file}")
+    
+    def _process_streaming(self, full_resync=False):
+        """
+        Processa a integração em fluxo contínuo: os leads de cada formulário/anúncio são
+        enviados ao B2Cor assim que extraídos, através de uma fila limitada
+        
+        Args:
+            full_resync (bool): Ignora os cursores salvos e busca toda a janela de days_back
+        
+        Returns:
+            bool: True se o processamento foi bem-sucedido
+        """
+        general_config = self.config.get('general', {})
+        facebook_config = self.config.get('facebook', {})
+        b2cor_config = self.config.get('b2cor', {})
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        part_prefix = os.path.join(self.leads_dir, f"facebook_leads_{timestamp}")
+        snapshot_file = f"{part_prefix}.jsonl" if general_config.get('snapshot_jsonl', True) else None
+        snapshot_store = self._get_snapshot_store() if snapshot_file else None
+        self.last_snapshot = snapshot_file or part_prefix
+        
+        batch_size = self._batch_size()
+        send_workers = max(1, b2cor_config.get('max_workers', 1))
+        lanes = self._create_lane_queue(maxsize=general_config.get('stream_queue_batches', 10))
+        options = self._sender_options()
+        
+        stats = {'total': 0, 'success': 0, 'failed': 0, 'skipped': 0}
+        stats_lock = threading.Lock()
+        started_at = time.monotonic()
+        first_delivery = []
+        
+        def sender_worker():
+            index = 0
+            while True:
+                item = lanes.get()
+                if item is None:
+                    return
+                batch_stats = self._deliver_batch(*item, index, options)
+                batch_stats.pop('delivered_ids', None)
+                index += 1
+                with stats_lock:
+                    self._merge_stats(stats, batch_stats)
+                    if not first_delivery:
+                        first_delivery.append(time.monotonic() - started_at)
+        
+        senders = [threading.Thread(target=sender_worker, daemon=True) for _ in range(send_workers)]
+        for sender in senders:
+            sender.start()
+        
+        logger.info("Processando leads em modo streaming...")
+        self._pending_cursors = {}
+        self._undelivered = []
+        if snapshot_store:
+            snapshot = snapshot_store.open_segment(os.path.basename(part_prefix))
+            self.last_snapshot = snapshot.path
+        elif snapshot_file:
+            snapshot = open(snapshot_file, 'a', encoding='utf-8')
+        else:
+            snapshot = None
+        try:
+            form_ids, ad_ids = self._get_extraction_targets()
+            incremental = facebook_config.get('incremental', True)
+            
+            for partition_leads in self._iter_partition_leads(
+                part_prefix,
+                form_ids,
+                ad_ids,
+                days_back=facebook_config.get('days_back', 30),
+                max_workers=max(1, facebook_config.get('max_workers', 1)),
+                use_cursors=incremental and not full_resync
+            ):
+                if snapshot_store:
+                    snapshot.write(partition_leads)
+                elif snapshot:
+                    for lead in partition_leads:
+                        snapshot.write(json.dumps(lead, ensure_ascii=False) + '\n')
+                    snapshot.flush()
+                
+                partition_leads, skipped = self._filter_duplicates(partition_leads)
+                self._map_fields(partition_leads)
+                if skipped:
+                    with stats_lock:
+                        stats['total'] += skipped
+                        stats['skipped'] += skipped
+                
+                # Bloqueia quando a lane está cheia, limitando a memória ao tamanho da fila
+                for lane, priority, batch in self._plan_batches(partition_leads, batch_size):
+                    lanes.put(lane, priority, batch)
+        finally:
+            if snapshot:
+                snapshot.close()
+            lanes.close()
+            for sender in senders:
+                sender.join()
+        
+        elapsed = time.monotonic() - started_at
+        leads_per_second = stats['total'] / elapsed if elapsed > 0 else 0.0
+        stats['first_delivery_seconds'] = first_delivery[0] if first_delivery else None
+        self.run_stats['send'] = stats
+        self.run_stats['http'] = self.http_metrics.snapshot()
+        self.run_stats['lanes'] = self._lane_stats()
+        logger.info(f"Envio concluído. Total: {stats.get('total', 0)}, Sucesso: {stats.get('success', 0)}, Falha: {stats.get('failed', 0)}, Pulados: {stats.get('skipped', 0)}, Leads/s: {leads_per_second:.1f}")
+        
+        if stats['total'] == 0:
+            logger.warning("Nenhum lead extraído.")
+            return False
+        
+        # Avança os cursores somente após o envio
+        self._commit_cursors()
+        
+        # Limpa arquivos antigos
+        self._cleanup_old_files()
+        
+        return True
+    
+    def serve(self):
+        """
+        Recebe leads em tempo real pelos webhooks leadgen do Facebook e os envia ao B2Cor
+        
+        Returns:
+            bool: False se o servidor não pôde ser iniciado
+        """
+        webhook_config = self.config.get('webhook', {})
+        
+        if not self.b2cor_sender:
+            logger.error("Enviador de leads para o B2Cor não configurado. Execute setup() primeiro.")
+            return False
+        
+        if not webhook_config.get('verify_token') or not webhook_config.get('app_secret'):
+            logger.error("Configure webhook.verify_token e webhook.app_secret para receber webhooks.")
+            return False
+        
+        access_token = webhook_config.get('access_token') or self._get_graph_access_token()
+        if not access_token:
+            logger.error("Token de acesso de Página não configurado (webhook.access_token).")
+            return False
+        
+        import requests
+        from scripts.facebook_webhook import LeadFetcher, LeadgenWebhookServer
+        from scripts.http_policy import install as install_http_policy
+        
+        session = requests.Session()
+        if self.http_adapter:
+            install_http_policy(session, self.http_adapter)
+        fetcher = LeadFetcher(
+            session,
+            access_token,
+            webhook_config.get('api_version', 'v22.0'),
+            graph_url=self.config.get('facebook', {}).get('graph_url', 'https://graph.facebook.com')
+        )
+        
+        max_workers = self.config.get('b2cor', {}).get('max_workers', 1)
+        
+        def deliver(leads):
+            started_at = time.monotonic()
+            
+            # Os leads são acrescentados ao segmento da hora antes do envio, para --find-lead,
+            # --reconcile e --resume
+            hour = datetime.now().strftime("%Y%m%d_%H")
+            leads_file = self._append_snapshot(os.path.join(self.leads_dir, f"facebook_leads_webhook_{hour}.jsonl"), leads)
+            journal = SendJournal(f"{leads_file}.journal") if self.config.get('b2cor', {}).get('journal', True) else None
+            
+            received = [journal_key(lead) for lead in leads]
+            leads, skipped = self._filter_duplicates(leads)
+            to_send = {journal_key(lead) for lead in leads}
+            if journal:
+                journal.open(resume=True)
+            try:
+                stats = self._send_lead_batches(leads, max_workers, journal=journal, lane='realtime') if leads else {'total': 0, 'success': 0, 'failed': 0}
+            finally:
+                if journal:
+                    journal.close()
+                # O modo --serve não usa cursores: os leads não entregues continuam no diário de pendências
+                self._undelivered = []
+            delivered = set(stats.pop('delivered_ids', []))
+            logger.info(f"Webhook: Total: {stats.get('total', 0) + skipped}, Sucesso: {stats.get('success', 0)}, Falha: {stats.get('failed', 0)}, Pulados: {stats.get('skipped', 0) + skipped}, Tempo: {time.monotonic() - started_at:.2f}s")
+            
+            # Os leads pulados como duplicados já foram entregues anteriormente
+            return [key for key in received if key in delivered or key not in to_send]
+        
+        server = LeadgenWebhookServer(
+            fetcher,
+            deliver,
+            verify_token=webhook_config['verify_token'],
+            app_secret=webhook_config['app_secret'],
+            host=webhook_config.get('host', '0.0.0.0'),
+            port=webhook_config.get('port', 8080),
+            batch_size=webhook_config.get('batch_size', 50),
+            batch_wait=webhook_config.get('batch_wait', 1.0),
+            pending_journal=SendJournal(os.path.join(self.state_dir, 'webhook_pending.journal'))
+        )
+        
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Servidor de webhooks interrompido pelo usuário.")
+        
+        return True
+    
+    @timed_stage('cleanup_old_files')
     def _cleanup_old_files(self):
         """
         Limpa arquivos de leads antigos
@@ -299,6 +2269,20 @@ class FacebookB2CorIntegration:
                 if file_time < cutoff_date:
                     os.remove(file_path)
                     logger.info(f"Arquivo antigo removido: {file_path}")
+            
+            # Remove os segmentos fora do período de retenção (pela data registrada no índice)
+            snapshot_store = self._get_snapshot_store()
+            if snapshot_store:
+                for segment_file in snapshot_store.evict(keep_days):
+                    if os.path.exists(f"{segment_file}.journal"):
+                        os.remove(f"{segment_file}.journal")
+            
+            # Remove do índice de deduplicação os leads fora do período de retenção
+            lead_index = self._get_lead_index()
+            if lead_index:
+                evicted = lead_index.evict(keep_days)
+                if evicted:
+                    logger.info(f"{evicted} registros antigos removidos do índice de deduplicação")
         
         except Exception as e:
             logger.error(f"Erro durante a limpeza de arquivos antigos: {str(e)}")
@@ -319,16 +2303,21 @@ class FacebookB2CorIntegration:
             
             interval = schedule_config.get('interval', 'daily')
             time_str = schedule_config.get('time', '00:00')
+            overlap = schedule_config.get('overlap', 'coalesce')
             
             if interval == 'daily':
-                schedule.every().day.at(time_str).do(self.process)
+                self.scheduler.add_time_job('process', self.process, time_str, days=1, overlap=overlap)
                 logger.info(f"Integração agendada para execução diária às {time_str}")
             elif interval == 'hourly':
-                schedule.every().hour.do(self.process)
+                self.scheduler.add_interval_job('process', self.process, 60, overlap=overlap)
                 logger.info("Integração agendada para execução horária")
             elif interval == 'weekly':
-                schedule.every().week.at(time_str).do(self.process)
+                self.scheduler.add_time_job('process', self.process, time_str, days=7, overlap=overlap)
                 logger.info(f"Integração agendada para execução semanal às {time_str}")
+            elif interval == 'minutes':
+                minutes = schedule_config.get('minutes', 5)
+                self.scheduler.add_interval_job('process', self.process, minutes, overlap=overlap)
+                logger.info(f"Integração agendada para execução a cada {minutes} minutos")
             else:
                 logger.error(f"Intervalo de agendamento não reconhecido: {interval}")
                 return False
@@ -346,13 +2335,14 @@ class FacebookB2CorIntegration:
         logger.info("Iniciando execução de jobs agendados...")
         
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Verifica a cada minuto
+            self.scheduler.run_forever()
         except KeyboardInterrupt:
             logger.info("Execução de jobs agendados interrompida pelo usuário.")
         except Exception as e:
             logger.error(f"Erro durante a execução de jobs agendados: {str(e)}")
+        finally:
+            self.scheduler.stop()
+            logger.info(f"Estatísticas do agendamento: {self.scheduler.get_stats()}")
     
     def interactive_config(self):
         """
@@ -396,13 +2386,19 @@ class FacebookB2CorIntegration:
         self.config['facebook']['schedule']['enabled'] = use_schedule
         
         if use_schedule:
-            interval = input("Intervalo (daily, hourly, weekly) [daily]: ").lower()
-            if interval in ['daily', 'hourly', 'weekly']:
+            interval = input("Intervalo (daily, hourly, weekly, minutes) [daily]: ").lower()
+            if interval in ['daily', 'hourly', 'weekly', 'minutes']:
                 self.config['facebook']['schedule']['interval'] = interval
             else:
                 self.config['facebook']['schedule']['interval'] = 'daily'
             
-            if interval != 'hourly':
+            if interval == 'minutes':
+                minutes_str = input("Intervalo em minutos [5]: ")
+                if minutes_str.strip() and minutes_str.isdigit():
+                    self.config['facebook']['schedule']['minutes'] = int(minutes_str)
+                else:
+                    self.config['facebook']['schedule']['minutes'] = 5
+            elif interval != 'hourly':
                 time_str = input("Horário (HH:MM) [00:00]: ")
                 if time_str.strip():
                     self.config['facebook']['schedule']['time'] = time_str
@@ -433,6 +2429,115 @@ class FacebookB2CorIntegration:
         
         return True
 
+class MultiTenantRunner:
+    """
+    Classe para executar a integração de várias corretoras em um único processo
+    
+    Cada arquivo .json do diretório de tenants é a configuração de uma corretora. Os ciclos
+    process() de todas as corretoras compartilham um pool limitado de threads, mas cada uma
+    tem seus próprios clientes, limites de taxa, cursores e diretório de leads.
+    """
+    
+    def __init__(self, tenants_dir, max_workers=4):
+        """
+        Inicializa o executor
+        
+        Args:
+            tenants_dir (str): Diretório com um arquivo de configuração por corretora
+            max_workers (int): Número máximo de corretoras processadas simultaneamente
+        """
+        self.tenants_dir = tenants_dir
+        self.max_workers = max_workers
+        self.tenants = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tenant')
+    
+    def load(self):
+        """
+        Carrega as configurações do diretório de tenants
+        
+        Returns:
+            int: Número de corretoras carregadas
+        """
+        for filename in sorted(os.listdir(self.tenants_dir)):
+            if not filename.endswith('.json'):
+                continue
+            name = os.path.splitext(filename)[0]
+            state_dir = os.path.join(self.tenants_dir, name)
+            os.makedirs(state_dir, exist_ok=True)
+            self.tenants[name] = FacebookB2CorIntegration(os.path.join(self.tenants_dir, filename), state_dir=state_dir)
+        
+        logger.info(f"{len(self.tenants)} corretoras carregadas de {self.tenants_dir}")
+        return len(self.tenants)
+    
+    def _run_all(self, method_name):
+        """
+        Executa um método de todas as corretoras no pool, isolando as falhas
+        
+        Args:
+            method_name (str): Nome do método de FacebookB2CorIntegration
+            
+        Returns:
+            dict: Resultado por corretora (False em caso de exceção)
+        """
+        futures = {
+            self.executor.submit(getattr(integration, method_name)): name
+            for name, integration in self.tenants.items()
+        }
+        
+        results = {}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Erro na corretora {name}: {str(e)}")
+                results[name] = False
+        return results
+    
+    def setup(self):
+        """
+        Configura todas as corretoras sem interação, descartando as que falharem
+        
+        Returns:
+            int: Número de corretoras configuradas
+        """
+        results = self._run_all('_setup_non_interactive')
+        for name, ok in results.items():
+            if not ok:
+                logger.error(f"Falha na configuração da corretora {name}. Ela será ignorada.")
+                del self.tenants[name]
+        return len(self.tenants)
+    
+    def run_once(self):
+        """
+        Executa um ciclo process() de cada corretora
+        
+        Returns:
+            dict: Resultado do processamento por corretora
+        """
+        started_at = time.monotonic()
+        results = self._run_all('process')
+        succeeded = sum(1 for ok in results.values() if ok)
+        logger.info(f"Ciclo multi-corretora concluído em {time.monotonic() - started_at:.1f}s. Sucesso: {succeeded}/{len(results)}")
+        return results
+    
+    def run_forever(self, interval_minutes=60):
+        """
+        Executa ciclos periódicos até ser interrompido
+        
+        Args:
+            interval_minutes (int): Intervalo entre o início de ciclos consecutivos
+        """
+        scheduler = JobScheduler()
+        scheduler.add_job('tenants', self.run_once, timedelta(minutes=interval_minutes), first_run=datetime.now())
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            logger.info("Execução multi-corretora interrompida pelo usuário.")
+        finally:
+            scheduler.stop()
+            self.executor.shutdown(wait=False)
+
 def main():
     """
     Função principal para uso em linha de comando
@@ -442,11 +2547,59 @@ def main():
     parser.add_argument('--setup', action='store_true', help='Configurar autenticação e componentes')
     parser.add_argument('--extract', action='store_true', help='Extrair leads do Facebook Ads')
     parser.add_argument('--send', metavar='FILE', help='Enviar leads para o B2Cor a partir de um arquivo')
+    parser.add_argument('--resume', metavar='FILE', help='Retomar o envio interrompido de um arquivo de leads')
     parser.add_argument('--process', action='store_true', help='Processar a integração completa')
     parser.add_argument('--schedule', action='store_true', help='Agendar a execução periódica')
     parser.add_argument('--run', action='store_true', help='Executar jobs agendados')
+    parser.add_argument('--serve', action='store_true', help='Receber leads em tempo real pelos webhooks do Facebook')
+    parser.add_argument('--refresh-forms', action='store_true', help='Atualizar o cache da lista de formulários')
+    parser.add_argument('--warm-index', action='store_true', help='Popular o índice de deduplicação com os arquivos de leads existentes')
+    parser.add_argument('--find-lead', metavar='LEAD_ID', help='Buscar um lead extraído pelo ID do Facebook')
+    parser.add_argument('--migrate-snapshots', action='store_true', help='Converter os arquivos de leads JSON existentes em segmentos comprimidos')
+    parser.add_argument('--backfill', nargs=2, metavar=('FROM', 'TO'), help='Carga histórica pelas exportações CSV entre duas datas (YYYY-MM-DD)')
+    parser.add_argument('--reconcile', nargs='*', metavar='DATE', help='Conciliar os leads extraídos com o B2Cor (opcional: FROM TO no formato YYYY-MM-DD)')
+    parser.add_argument('--reconcile-resend', action='store_true', help='Com --reconcile, reenviar os leads ausentes no B2Cor e atualizar o índice local')
+    parser.add_argument('--full-resync', action='store_true', help='Ignorar os cursores e extrair toda a janela de days_back')
+    parser.add_argument('--tenants', metavar='DIR', help='Executar várias corretoras (um config .json por corretora) em um único processo')
+    parser.add_argument('--tenant-workers', type=int, default=4, help='Número de corretoras processadas simultaneamente (padrão: 4)')
+    parser.add_argument('--tenant-interval', type=int, default=60, help='Intervalo em minutos entre ciclos com --tenants --run (padrão: 60)')
+    parser.add_argument('--baseline', metavar='FILE', help='Comparar o desempenho da execução com uma execução de referência')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Salvar o desempenho da execução como referência')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Variação aceita em relação à referência (padrão: 0.2)')
+    parser.add_argument('--profile', action='store_true', help='Executar com o cProfile e salvar as estatísticas')
     
     args = parser.parse_args()
+    configure_logging()
+    
+    if not args.profile:
+        run_commands(args)
+        return
+    
+    from scripts.metrics import ThreadProfiler
+    
+    # Inclui as threads de extração e envio (ThreadPoolExecutor), e não só a thread principal
+    profile_file = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+    profiler = ThreadProfiler()
+    profiler.start()
+    try:
+        run_commands(args)
+    finally:
+        stats = profiler.stop()
+        stats.dump_stats(profile_file)
+        stats.sort_stats('cumulative').print_stats(20)
+        print(f"Perfil de execução salvo em: {profile_file}")
+
+def run_commands(args):
+    """
+    Executa os comandos informados na linha de comando
+    
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando
+    """
+    # Execução multi-corretora
+    if args.tenants:
+        run_tenants(args)
+        return
     
     # Cria a instância da integração
     integration = FacebookB2CorIntegration()
@@ -456,30 +2609,92 @@ def main():
         integration.interactive_config()
     
     # Configuração de autenticação e componentes
-    if args.setup or args.extract or args.process or args.schedule or args.run:
+    if args.setup or args.extract or args.process or args.schedule or args.run or args.serve or args.refresh_forms or args.resume or args.backfill or args.reconcile is not None:
         if not integration.setup():
             logger.error("Falha na configuração. Abortando.")
             return
     
+    # Cache de formulários
+    if args.refresh_forms:
+        forms = integration.refresh_forms()
+        if forms is not None:
+            print(f"Cache de formulários atualizado com {len(forms)} formulários.")
+    
+    # Índice de deduplicação
+    if args.warm_index:
+        total = integration.warm_up_index()
+        if total is not None:
+            print(f"Índice de deduplicação populado com {total} leads.")
+    
+    # Armazenamento de segmentos
+    if args.migrate_snapshots:
+        converted = integration.migrate_snapshots()
+        if converted is not None:
+            print(f"{converted} arquivos de leads convertidos em segmentos.")
+    
+    if args.find_lead:
+        result = integration.find_lead(args.find_lead)
+        if result:
+            lead, segment_file = result
+            print(f"Lead encontrado em: {segment_file}")
+            print(json.dumps(lead, indent=4, ensure_ascii=False))
+        else:
+            print(f"Lead {args.find_lead} não encontrado.")
+    
     # Extração de leads
     if args.extract:
-        leads_file = integration.extract_leads()
+        leads_file = integration.extract_leads(full_resync=args.full_resync)
         if leads_file:
             print(f"Leads extraídos para: {leads_file}")
     
+    # Carga histórica
+    if args.backfill:
+        stats = integration.backfill(*args.backfill)
+        if stats:
+            print(f"Carga histórica concluída. Total: {stats.get('total', 0)}, Sucesso: {stats.get('success', 0)}, Falha: {stats.get('failed', 0)}, Pulados: {stats.get('skipped', 0)}")
+    
+    # Conciliação com o B2Cor
+    if args.reconcile is not None:
+        if len(args.reconcile) not in (0, 2):
+            print("Informe as duas datas (FROM TO) ou nenhuma para --reconcile.")
+        else:
+            report = integration.reconcile(*args.reconcile, resend=args.reconcile_resend)
+            if report:
+                print(f"Conciliação concluída. Locais: {report['local_total']}, B2Cor: {report['remote_total']}, Ausentes: {len(report['missing'])}, Duplicados: {len(report['duplicates'])}, Divergentes: {len(report['status_mismatch'])}")
+    
     # Envio de leads
     if args.send:
         stats = integration.send_leads(args.send)
         if stats:
             print(f"Envio concluído. Total: {stats.get('total', 0)}, Sucesso: {stats.get('success', 0)}, Falha: {stats.get('failed', 0)}, Pulados: {stats.get('skipped', 0)}")
     
+    # Retomada de envio interrompido
+    if args.resume:
+        stats = integration.send_leads(args.resume, resume=True)
+        if stats:
+            print(f"Envio concluído. Total: {stats.get('total', 0)}, Sucesso: {stats.get('success', 0)}, Falha: {stats.get('failed', 0)}, Pulados: {stats.get('skipped', 0)}")
+    
     # Processamento completo
     if args.process:
-        if integration.process():
+        if integration.process(full_resync=args.full_resync):
             print("Processamento concluído com sucesso!")
         else:
             print("Erro durante o processamento.")
     
+    # Comparação de desempenho
+    if args.save_baseline:
+        integration.save_baseline(args.save_baseline)
+    
+    if args.baseline:
+        regressions = integration.check_baseline(args.baseline, args.tolerance)
+        if regressions:
+            print("Regressões de desempenho encontradas:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        if regressions is not None:
+            print("Nenhuma regressão de desempenho em relação à referência.")
+    
     # Agendamento
     if args.schedule:
         if integration.schedule_job():
@@ -491,6 +2706,10 @@ def main():
     if args.run:
         integration.run_scheduled_jobs()
     
+    # Recebimento de webhooks
+    if args.serve:
+        integration.serve()
+    
     # Processamento automático após configuração
     if args.config and integration.config.get('general', {}).get('auto_process', True):
         print("\nIniciando processamento automático...")
@@ -510,5 +2729,24 @@ def main():
                 print("Pressione Ctrl+C para interromper a execução de jobs agendados.")
                 integration.run_scheduled_jobs()
 
+def run_tenants(args):
+    """
+    Executa a integração de várias corretoras
+    
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando
+    """
+    runner = MultiTenantRunner(args.tenants, max_workers=args.tenant_workers)
+    if not runner.load() or not runner.setup():
+        logger.error("Nenhuma corretora configurada. Abortando.")
+        return
+    
+    if args.run:
+        runner.run_forever(args.tenant_interval)
+    else:
+        results = runner.run_once()
+        for name, ok in sorted(results.items()):
+            print(f"{name}: {'sucesso' if ok else 'erro'}")
+
 if __name__ == "__main__":
     main()
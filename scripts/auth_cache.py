@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache das verificações de credenciais
+Este script registra quando o token do Facebook e a chave da API do B2Cor foram verificados
+com sucesso, para que execuções próximas (ex: cron a cada poucos minutos) não repitam as
+chamadas de verificação enquanto o registro não expirar. O registro vale pelo TTL configurado,
+limitado à expiração da própria credencial (menos uma margem), quando conhecida.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("auth_cache")
+
+# Margem (em segundos) antes da expiração da credencial em que a verificação volta a ser feita
+EXPIRY_MARGIN = 300
+
+
+def _fingerprint(secret):
+    """
+    Calcula a assinatura de uma credencial (a credencial em si não é gravada)
+
+    Args:
+        secret (str): Token ou chave de API
+
+    Returns:
+        str: Hash SHA-256 da credencial
+    """
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()
+
+
+class AuthCache:
+    """
+    Classe para persistir as verificações de credenciais com validade
+    """
+
+    def __init__(self, cache_file):
+        """
+        Inicializa o cache
+
+        Args:
+            cache_file (str): Caminho para o arquivo JSON do cache
+        """
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self):
+        """
+        Carrega o cache do arquivo
+
+        Returns:
+            dict: Verificações por serviço
+        """
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            logger.error(f"Erro ao carregar cache de credenciais: {self.cache_file}")
+            return {}
+
+    def is_valid(self, service, secret):
+        """
+        Verifica se a credencial foi verificada e o registro ainda não expirou
+
+        Args:
+            service (str): Nome do serviço (ex: facebook, b2cor)
+            secret (str): Token ou chave de API atual
+
+        Returns:
+            bool: True se a verificação pode ser pulada
+        """
+        if not secret:
+            return False
+
+        with self.lock:
+            entry = self.entries.get(service)
+        return bool(
+            entry
+            and entry.get('fingerprint') == _fingerprint(secret)
+            and entry.get('expires_at', 0) > time.time()
+        )
+
+    def store(self, service, secret, ttl, credential_expires_at=None):
+        """
+        Registra uma verificação bem-sucedida
+
+        Args:
+            service (str): Nome do serviço
+            secret (str): Token ou chave de API verificado
+            ttl (int): Validade máxima do registro em segundos (0 desativa o cache)
+            credential_expires_at (float): Expiração da credencial em timestamp Unix (0 = não
+                expira, None = desconhecida)
+        """
+        if not secret or ttl <= 0:
+            return
+
+        now = time.time()
+        expires_at = now + ttl
+        if credential_expires_at:
+            expires_at = min(expires_at, credential_expires_at - EXPIRY_MARGIN)
+        if expires_at <= now:
+            return
+
+        entry = {
+            'fingerprint': _fingerprint(secret),
+            'verified_at': now,
+            'expires_at': expires_at
+        }
+        if credential_expires_at is not None:
+            entry['credential_expires_at'] = credential_expires_at
+        with self.lock:
+            self.entries[service] = entry
+            self._save()
+
+    def credential_expiry(self, service, secret):
+        """
+        Obtém a expiração registrada de uma credencial (a mesma credencial tem sempre a mesma
+        expiração, mesmo depois de o registro da verificação expirar)
+
+        Args:
+            service (str): Nome do serviço
+            secret (str): Token ou chave de API atual
+
+        Returns:
+            float: Expiração em timestamp Unix (0 = não expira) ou None se desconhecida
+        """
+        if not secret:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(service)
+        if not entry or entry.get('fingerprint') != _fingerprint(secret):
+            return None
+        return entry.get('credential_expires_at')
+
+    def invalidate(self, service):
+        """
+        Descarta a verificação de um serviço
+
+        Args:
+            service (str): Nome do serviço
+        """
+        with self.lock:
+            if self.entries.pop(service, None) is not None:
+                self._save()
+
+    def _save(self):
+        """
+        Salva o cache no arquivo de forma atômica (chamado com o lock adquirido)
+        """
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.entries, f, indent=4)
+        os.replace(tmp_file, self.cache_file)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Conciliação entre os leads extraídos do Facebook e os leads cadastrados no B2Cor
+Este script lê os leads do B2Cor em páginas (/lead/find e /lead/listAll) e os cruza, por
+ID do Facebook, celular normalizado e email, com os leads salvos localmente, usando uma
+tabela hash das chaves locais. Apenas as chaves dos leads locais ficam em memória.
+"""
+
+import logging
+
+from scripts.lead_index import lead_keys, normalize_phone
+from scripts.send_journal import journal_key
+
+logger = logging.getLogger("b2cor_reconcile")
+
+B2COR_URL = "https://b2corapi.agencialink.com.br"
+
+# Status do B2Cor que indicam que um lead enviado não foi aproveitado
+MISMATCH_STATUSES = ('Invalida', 'Repetida', 'devolvido')
+
+
+def remote_lead_keys(lead, facebook_id_field='id_facebook'):
+    """
+    Calcula as chaves de conciliação de um lead do B2Cor
+
+    Args:
+        lead (dict): Lead retornado pelo B2Cor
+        facebook_id_field (str): Campo do B2Cor com o ID do lead no Facebook
+
+    Returns:
+        list: Chaves do lead, no mesmo formato de lead_keys()
+    """
+    keys = []
+    if lead.get(facebook_id_field):
+        keys.append(f"id:{lead[facebook_id_field]}")
+
+    phone = normalize_phone(f"{lead.get('celular_ddd') or ''}{lead.get('celular_numero') or ''}")
+    if phone:
+        keys.append(f"phone:{phone}")
+
+    email = (lead.get('email') or '').strip().lower()
+    if email:
+        keys.append(f"email:{email}")
+
+    return keys
+
+
+class B2CorLeadPager:
+    """
+    Classe para ler os leads do B2Cor em páginas
+    """
+
+    def __init__(self, session, api_key, base_url=B2COR_URL, page_size=500, find_filters=None):
+        """
+        Inicializa o leitor
+
+        Args:
+            session (requests.Session): Sessão HTTP
+            api_key (str): Chave da API do B2Cor
+            base_url (str): URL da API
+            page_size (int): Número de leads por página
+            find_filters (dict): Filtros adicionais enviados ao /lead/find
+        """
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.page_size = page_size
+        self.find_filters = find_filters or {}
+        self.headers = {'x-api-key': api_key, 'Content-Type': 'application/json'}
+        self.stats = {'pages': 0, 'stalled': 0}
+
+    def _leads_from_response(self, response):
+        """
+        Obtém a lista de leads do corpo da resposta
+
+        Args:
+            response (requests.Response): Resposta da API
+
+        Returns:
+            list: Leads
+        """
+        response.raise_for_status()
+        self.stats['pages'] += 1
+        data = response.json()
+        if isinstance(data, dict):
+            data = data.get('leads', data.get('data', []))
+        return data or []
+
+    def _paginate(self, endpoint, request):
+        """
+        Percorre as páginas de um endpoint até uma página curta ou sem leads novos
+
+        Args:
+            endpoint (str): Nome do endpoint (para o log)
+            request (callable): Função que recebe o número da página e retorna a resposta
+
+        Yields:
+            list: Leads de uma página
+        """
+        page = 1
+        seen_ids = set()
+        while True:
+            leads = self._leads_from_response(request(page))
+            page_ids = {lead.get('id_cliente') or lead.get('id') for lead in leads}
+            page_ids.discard(None)
+
+            # Um servidor que ignora a paginação repete a mesma página indefinidamente
+            if page_ids and page_ids <= seen_ids:
+                self.stats['stalled'] += 1
+                logger.warning(f"Página {page} de {endpoint} não trouxe leads novos. Paginação encerrada.")
+                return
+            seen_ids |= page_ids
+            if leads:
+                yield leads
+            if len(leads) < self.page_size:
+                return
+            page += 1
+
+    def iter_find(self, date_from, date_to):
+        """
+        Busca os leads cadastrados em um período, página a página
+
+        Args:
+            date_from (str): Data inicial (YYYY-MM-DD)
+            date_to (str): Data final (YYYY-MM-DD)
+
+        Yields:
+            list: Leads de uma página
+        """
+        def request(page):
+            payload = dict(
+                {'data_inicial': date_from, 'data_final': date_to, 'pagina': page, 'limite': self.page_size},
+                **self.find_filters
+            )
+            return self.session.post(f"{self.base_url}/lead/find", json=payload, headers=self.headers, timeout=120)
+
+        return self._paginate('/lead/find', request)
+
+    def iter_list_all(self):
+        """
+        Lista os leads ainda não exportados do B2Cor, página a página (se o servidor não paginar,
+        a primeira página traz todos os leads e a segunda, repetida, encerra a leitura)
+
+        Yields:
+            list: Leads de uma página
+        """
+        def request(page):
+            params = {'pagina': page, 'limite': self.page_size}
+            return self.session.get(f"{self.base_url}/lead/listAll", params=params, headers=self.headers, timeout=120)
+
+        return self._paginate('/lead/listAll', request)
+
+
+class LeadReconciler:
+    """
+    Classe para cruzar os leads locais com os leads do B2Cor
+    """
+
+    def __init__(self, facebook_id_field='id_facebook', mismatch_statuses=MISMATCH_STATUSES):
+        """
+        Inicializa a conciliação
+
+        Args:
+            facebook_id_field (str): Campo do B2Cor com o ID do lead no Facebook
+            mismatch_statuses (tuple): Status do B2Cor reportados como divergentes
+        """
+        self.facebook_id_field = facebook_id_field
+        self.mismatch_statuses = {status.lower() for status in mismatch_statuses}
+        # Chave -> leads locais com essa chave (ex: o mesmo celular em dois formulários)
+        self.key_owners = {}
+        self.local_ids = set()
+        self.matches = {}
+        self.remote_ids = set()
+        self.remote_total = 0
+        self.remote_unmatched = 0
+        self.remote_statuses = {}
+
+    def add_local(self, lead):
+        """
+        Registra um lead local na tabela de chaves
+
+        Args:
+            lead (dict): Lead no formato do Graph API
+        """
+        local_id = journal_key(lead)
+        if local_id in self.local_ids:
+            return
+        self.local_ids.add(local_id)
+        for key in lead_keys(lead):
+            self.key_owners.setdefault(key, []).append(local_id)
+
+    def add_remote(self, leads):
+        """
+        Cruza uma página de leads do B2Cor com os leads locais
+
+        Args:
+            leads (list): Leads retornados pelo B2Cor
+        """
+        key_owners = self.key_owners
+        for lead in leads:
+            remote_id = lead.get('id_cliente') or lead.get('id')
+            if remote_id is not None:
+                if remote_id in self.remote_ids:
+                    continue
+                self.remote_ids.add(remote_id)
+            self.remote_total += 1
+
+            status = str(lead.get('status') or '')
+            self.remote_statuses[status] = self.remote_statuses.get(status, 0) + 1
+
+            owners = {
+                local_id
+                for key in remote_lead_keys(lead, self.facebook_id_field) if key in key_owners
+                for local_id in key_owners[key]
+            }
+            if not owners:
+                self.remote_unmatched += 1
+            for local_id in owners:
+                self.matches.setdefault(local_id, []).append({'id_cliente': remote_id, 'status': status})
+
+    def report(self, sent_ids=None):
+        """
+        Monta o relatório da conciliação
+
+        Args:
+            sent_ids (set): Leads locais registrados como enviados (opcional)
+
+        Returns:
+            dict: Totais e listas de leads ausentes, duplicados, com status divergente no B2Cor e
+                presentes no B2Cor mas fora do índice local
+        """
+        missing = sorted(self.local_ids - self.matches.keys())
+        duplicates = {local_id: found for local_id, found in self.matches.items() if len(found) > 1}
+        mismatched = {
+            local_id: found for local_id, found in self.matches.items()
+            if any(str(entry.get('status') or '').lower() in self.mismatch_statuses for entry in found)
+        }
+
+        # Leads presentes no B2Cor que o índice local não registra como enviados
+        unindexed = sorted(self.matches.keys() - sent_ids) if sent_ids is not None else []
+
+        return {
+            'local_total': len(self.local_ids),
+            'remote_total': self.remote_total,
+            'matched': len(self.matches),
+            'remote_unmatched': self.remote_unmatched,
+            'remote_statuses': self.remote_statuses,
+            'missing': missing,
+            'duplicates': duplicates,
+            'status_mismatch': mismatched,
+            'unindexed': unindexed
+        }
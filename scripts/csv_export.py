@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Exportação CSV de leads do Facebook para cargas históricas
+Este script baixa o CSV de leads de um formulário por intervalo de datas
+(/ads/lead_gen/export_csv/) e o converte, em fluxo e linha a linha, para o formato de
+leads do Graph API usado no restante da integração.
+"""
+
+import io
+import re
+import csv
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger("csv_export")
+
+EXPORT_URL = "https://www.facebook.com/ads/lead_gen/export_csv/"
+
+# Colunas do CSV que são metadados do lead (as demais são respostas do formulário)
+META_COLUMNS = {
+    'id': 'id',
+    'lead_id': 'id',
+    'created_time': 'created_time',
+    'ad_id': 'ad_id',
+    'ad_name': 'ad_name',
+    'adset_id': 'adset_id',
+    'adset_name': 'adset_name',
+    'campaign_id': 'campaign_id',
+    'campaign_name': 'campaign_name',
+    'form_id': 'form_id',
+    'form_name': 'form_name',
+    'is_organic': 'is_organic',
+    'platform': 'platform'
+}
+
+# Prefixos de tipo nos IDs exportados (ex: l:123, ag:456)
+_ID_PREFIX = re.compile(r'^[a-z]+:')
+
+CREATED_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+def date_shards(from_date, to_date, shard_days):
+    """
+    Divide um intervalo de datas em fatias
+
+    Args:
+        from_date (datetime): Início do intervalo
+        to_date (datetime): Fim do intervalo
+        shard_days (int): Tamanho de cada fatia em dias
+
+    Returns:
+        list: Tuplas (início, fim) em timestamp Unix
+    """
+    shards = []
+    start = from_date
+    while start < to_date:
+        end = min(start + timedelta(days=shard_days), to_date)
+        shards.append((int(start.timestamp()), int(end.timestamp())))
+        start = end
+    return shards
+
+
+def _normalize_created_time(value):
+    """
+    Converte o created_time do CSV para o formato do Graph API (UTC)
+
+    Args:
+        value (str): Data exportada (ISO 8601)
+
+    Returns:
+        str: Data no formato 2024-05-01T12:34:56+0000 (ou o valor original se inválido)
+    """
+    try:
+        created_time = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return value
+    if created_time.tzinfo is None:
+        created_time = created_time.replace(tzinfo=timezone.utc)
+    return created_time.astimezone(timezone.utc).strftime(CREATED_TIME_FORMAT)
+
+
+def row_to_lead(row, form_id=None):
+    """
+    Converte uma linha do CSV em um lead no formato do Graph API
+
+    Args:
+        row (dict): Linha do CSV (coluna -> valor)
+        form_id (str): ID do formulário exportado (usado se a coluna não existir)
+
+    Returns:
+        dict: Lead com id, created_time, form_id, ad_id e field_data
+    """
+    lead = {'field_data': []}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        name = column.strip()
+        key = META_COLUMNS.get(name.lower())
+        if key:
+            value = value.strip()
+            lead[key] = _ID_PREFIX.sub('', value) if key.endswith('id') else value
+        elif value != '':
+            lead['field_data'].append({'name': name, 'values': [value]})
+
+    if lead.get('created_time'):
+        lead['created_time'] = _normalize_created_time(lead['created_time'])
+    if form_id and not lead.get('form_id'):
+        lead['form_id'] = str(form_id)
+    return lead
+
+
+def _open_text_stream(raw):
+    """
+    Abre a resposta binária como texto, detectando a codificação pelo BOM
+
+    Args:
+        raw (io.RawIOBase): Corpo da resposta HTTP
+
+    Returns:
+        tuple: (fluxo de texto, delimitador)
+    """
+    buffered = io.BufferedReader(raw)
+    head = buffered.peek(4)[:4]
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+        # O Ads Manager exporta em UTF-16 separado por tabulações
+        return io.TextIOWrapper(buffered, encoding='utf-16', newline=''), '\t'
+    return io.TextIOWrapper(buffered, encoding='utf-8-sig', newline=''), ','
+
+
+class CsvLeadExporter:
+    """
+    Classe para baixar e converter exportações CSV de leads
+    """
+
+    def __init__(self, session, access_token, export_url=EXPORT_URL):
+        """
+        Inicializa o exportador
+
+        Args:
+            session (requests.Session): Sessão HTTP
+            access_token (str): Token de acesso
+            export_url (str): URL de exportação
+        """
+        self.session = session
+        self.access_token = access_token
+        self.export_url = export_url
+
+    def iter_leads(self, object_id, kind, from_ts, to_ts):
+        """
+        Baixa a exportação de um formulário/anúncio em um intervalo, lendo o CSV em fluxo
+
+        Args:
+            object_id (str): ID do formulário ou anúncio
+            kind (str): 'form' ou 'ad'
+            from_ts (int): Início do intervalo (timestamp Unix)
+            to_ts (int): Fim do intervalo (timestamp Unix)
+
+        Yields:
+            dict: Lead no formato do Graph API
+        """
+        params = {
+            'id': object_id,
+            'type': kind,
+            'from_date': from_ts,
+            'to_date': to_ts,
+            'access_token': self.access_token
+        }
+        with self.session.get(self.export_url, params=params, stream=True, timeout=300) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            # Sem isso o urllib3 fecha o corpo ao terminar de lê-lo, e o BufferedReader de
+            # _open_text_stream falha com "I/O operation on closed file" em vez de indicar o fim
+            response.raw.auto_close = False
+
+            text, delimiter = _open_text_stream(response.raw)
+            form_id = object_id if kind == 'form' else None
+            for row in csv.DictReader(text, delimiter=delimiter):
+                yield row_to_lead(row, form_id)
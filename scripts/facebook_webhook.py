@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Receptor de webhooks de leads do Facebook
+Este script recebe as notificações leadgen do Facebook, valida o handshake e a assinatura,
+enfileira os leadgen_id recebidos e busca os dados dos leads em lotes com ?ids=. Os leadgen_id
+são registrados em um diário antes da resposta 200, para que os não entregues sejam
+buscados novamente quando o servidor reiniciar.
+"""
+
+import hmac
+import json
+import queue
+import hashlib
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from scripts.send_journal import STARTED, SENT
+
+logger = logging.getLogger("facebook_webhook")
+
+GRAPH_URL = "https://graph.facebook.com"
+LEAD_FIELDS = "created_time,id,ad_id,campaign_id,form_id,field_data"
+
+
+def verify_signature(app_secret, body, signature_header):
+    """
+    Valida o cabeçalho X-Hub-Signature-256 enviado pelo Facebook
+
+    Args:
+        app_secret (str): App Secret do aplicativo
+        body (bytes): Corpo bruto da requisição
+        signature_header (str): Valor do cabeçalho (sha256=<hex>)
+
+    Returns:
+        bool: True se a assinatura for válida
+    """
+    if not signature_header or not signature_header.startswith('sha256='):
+        return False
+    expected = hmac.new(app_secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len('sha256='):])
+
+
+def parse_leadgen_events(payload):
+    """
+    Extrai os eventos leadgen de uma notificação do Facebook
+
+    Args:
+        payload (dict): Corpo JSON da notificação
+
+    Returns:
+        list: Eventos com leadgen_id, form_id, ad_id e created_time
+    """
+    events = []
+    for entry in payload.get('entry', []):
+        for change in entry.get('changes', []):
+            if change.get('field') != 'leadgen':
+                continue
+            value = change.get('value', {})
+            if value.get('leadgen_id'):
+                events.append(value)
+    return events
+
+
+class LeadFetcher:
+    """
+    Classe para buscar os dados de vários leads em uma única chamada ao Graph API
+    """
+
+    def __init__(self, session, access_token, api_version='v22.0', graph_url=GRAPH_URL):
+        """
+        Inicializa o buscador
+
+        Args:
+            session (requests.Session): Sessão HTTP
+            access_token (str): Token de acesso de Página
+            api_version (str): Versão do Graph API
+            graph_url (str): URL base do Graph API (ex: um servidor local para testes de carga)
+        """
+        self.session = session
+        self.access_token = access_token
+        self.api_version = api_version
+        self.graph_url = graph_url.rstrip('/')
+
+    def fetch(self, leadgen_ids):
+        """
+        Busca os leads pelo ID
+
+        Args:
+            leadgen_ids (list): IDs dos leads (até 50)
+
+        Returns:
+            list: Leads no formato do Graph API
+        """
+        response = self.session.get(
+            f"{self.graph_url}/{self.api_version}/",
+            params={
+                'ids': ','.join(leadgen_ids),
+                'fields': LEAD_FIELDS,
+                'access_token': self.access_token
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+        return list(response.json().values())
+
+
+class LeadgenWebhookServer:
+    """
+    Classe para receber webhooks leadgen e repassar os leads em lotes
+    """
+
+    def __init__(self, fetcher, deliver, verify_token, app_secret, host='0.0.0.0', port=8080,
+                 batch_size=50, batch_wait=1.0, queue_size=10000, pending_journal=None):
+        """
+        Inicializa o servidor
+
+        Args:
+            fetcher (LeadFetcher): Buscador dos dados dos leads
+            deliver (callable): Função que recebe a lista de leads buscados e retorna os IDs
+                dos leads entregues
+            verify_token (str): Token de verificação configurado no aplicativo
+            app_secret (str): App Secret usado para validar as assinaturas
+            host (str): Endereço de escuta
+            port (int): Porta de escuta
+            batch_size (int): Número máximo de leads por busca (limite do Graph API: 50)
+            batch_wait (float): Tempo máximo (em segundos) de espera para completar um lote
+            queue_size (int): Tamanho máximo da fila de leadgen_id
+            pending_journal (SendJournal): Diário dos leadgen_id recebidos e entregues (opcional)
+        """
+        self.fetcher = fetcher
+        self.deliver = deliver
+        self.verify_token = verify_token
+        self.app_secret = app_secret
+        self.batch_size = min(50, batch_size)
+        self.batch_wait = batch_wait
+        self.events = queue.Queue(maxsize=queue_size)
+        self.pending_journal = pending_journal
+        self.stats = {'events': 0, 'rejected': 0, 'batches': 0, 'leads': 0, 'errors': 0, 'fetch_failed': 0, 'recovered': 0}
+        self.stats_lock = threading.Lock()
+        self.running = threading.Event()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.worker = threading.Thread(target=self._batch_loop, daemon=True)
+
+    def _count(self, name, value=1):
+        """
+        Incrementa um contador
+
+        Args:
+            name (str): Nome do contador
+            value (int): Valor a somar
+        """
+        with self.stats_lock:
+            self.stats[name] += value
+
+    def _make_handler(self):
+        """
+        Cria a classe de tratamento das requisições HTTP
+
+        Returns:
+            type: Subclasse de BaseHTTPRequestHandler
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _reply(self, status, body=b''):
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                # Handshake de verificação do webhook
+                params = parse_qs(urlparse(self.path).query)
+                mode = params.get('hub.mode', [''])[0]
+                token = params.get('hub.verify_token', [''])[0]
+                challenge = params.get('hub.challenge', [''])[0]
+
+                if mode == 'subscribe' and hmac.compare_digest(token, server.verify_token):
+                    self._reply(200, challenge.encode('utf-8'))
+                else:
+                    self._reply(403)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+                if not verify_signature(server.app_secret, body, self.headers.get('X-Hub-Signature-256')):
+                    server._count('rejected')
+                    self._reply(403)
+                    return
+
+                try:
+                    events = parse_leadgen_events(json.loads(body))
+                except ValueError:
+                    self._reply(400)
+                    return
+
+                # Registra os leadgen_id antes de confirmar o recebimento: o Facebook não reenvia
+                # notificações respondidas com 200
+                server._record(events, STARTED)
+
+                # Responde imediatamente; a busca dos dados acontece em segundo plano
+                for event in events:
+                    server.events.put(event)
+                server._count('events', len(events))
+                self._reply(200)
+
+        return Handler
+
+    def _record(self, events, step):
+        """
+        Registra a situação de leadgen_id no diário de pendências
+
+        Args:
+            events (list): Eventos (ou leads) com leadgen_id/id
+            step (str): STARTED ao receber, SENT após a entrega
+        """
+        if self.pending_journal and events:
+            self.pending_journal.record(
+                [{'id': str(event.get('leadgen_id') or event.get('id'))} for event in events], step
+            )
+
+    def _recover_pending(self):
+        """
+        Reabre o diário de pendências e enfileira os leadgen_id recebidos e não entregues
+        em execuções anteriores
+        """
+        if not self.pending_journal:
+            return
+
+        pending = [lead_id for lead_id, step in self.pending_journal.replay().items() if step != SENT]
+        # O diário é recriado apenas com as pendências
+        self.pending_journal.open()
+        events = [{'leadgen_id': lead_id} for lead_id in pending]
+        self._record(events, STARTED)
+        if pending:
+            logger.info(f"Retomando {len(pending)} leads recebidos e não entregues anteriormente.")
+        for event in events:
+            self.events.put(event)
+        self._count('recovered', len(events))
+
+    def _fetch(self, leadgen_ids):
+        """
+        Busca os leads em uma única chamada ou, se ela falhar, um a um
+
+        Um ID ilegível (ex: lead excluído) faz a chamada com ?ids= inteira falhar; os IDs que
+        falham individualmente continuam pendentes no diário e são buscados ao reiniciar.
+
+        Args:
+            leadgen_ids (list): IDs dos leads
+
+        Returns:
+            list: Leads buscados
+        """
+        try:
+            return self.fetcher.fetch(leadgen_ids)
+        except Exception as e:
+            if len(leadgen_ids) == 1:
+                logger.error(f"Erro ao buscar o lead {leadgen_ids[0]} do webhook: {str(e)}")
+                self._count('fetch_failed')
+                return []
+            logger.warning(f"Erro ao buscar {len(leadgen_ids)} leads do webhook ({str(e)}). Buscando um a um...")
+
+        leads = []
+        for leadgen_id in leadgen_ids:
+            leads.extend(self._fetch([leadgen_id]))
+        return leads
+
+    def _next_batch(self):
+        """
+        Aguarda o próximo lote de eventos
+
+        Returns:
+            list: Eventos do lote (vazio se o servidor estiver parando)
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = 0.5 if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.events.get(timeout=timeout))
+            except queue.Empty:
+                if deadline is None and not self.running.is_set():
+                    break
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.batch_wait
+        return batch
+
+    def _batch_loop(self):
+        """
+        Busca os dados dos leads enfileirados e os repassa em lotes
+        """
+        while self.running.is_set() or not self.events.empty():
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            leadgen_ids = list(dict.fromkeys(str(event['leadgen_id']) for event in batch))
+            leads = self._fetch(leadgen_ids)
+            if not leads:
+                self._count('errors')
+                continue
+
+            try:
+                delivered_ids = set(map(str, self.deliver(leads) or []))
+            except Exception as e:
+                # Os leadgen_id continuam pendentes no diário
+                logger.error(f"Erro ao repassar leads do webhook: {str(e)}")
+                self._count('errors')
+                continue
+
+            # Somente os leads entregues saem das pendências
+            delivered = [lead for lead in leads if str(lead.get('id')) in delivered_ids]
+            self._record(delivered, SENT)
+            if len(delivered) < len(leads):
+                logger.warning(f"{len(leads) - len(delivered)} leads do webhook não foram entregues e continuam pendentes.")
+                self._count('errors')
+            self._count('batches')
+            self._count('leads', len(delivered))
+
+    def serve_forever(self):
+        """
+        Inicia o servidor e bloqueia até ser interrompido
+        """
+        self.running.set()
+        self.worker.start()
+        self._recover_pending()
+        logger.info(f"Recebendo webhooks em {self.httpd.server_address[0]}:{self.httpd.server_address[1]}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Para o servidor e aguarda o envio dos eventos pendentes
+        """
+        if not self.running.is_set():
+            return
+        self.running.clear()
+        self.httpd.server_close()
+        self.worker.join()
+        if self.pending_journal:
+            self.pending_journal.close()
+        logger.info(f"Servidor de webhooks encerrado. Estatísticas: {self.stats}")
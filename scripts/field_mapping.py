@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mapeamento dos campos dos leads do Facebook para os campos do B2Cor
+Este script converte o field_data dos leads em campos do B2Cor (nome, email, uf, cidade,
+celular_ddd, celular_numero, ...) a partir de uma especificação declarativa por formulário.
+A normalização é feita por coluna: os valores de um campo de todos os leads são unidos em um
+único texto e tratados com uma chamada de regex/str por coluna, em vez de uma por lead.
+"""
+
+import re
+import unicodedata
+
+# Separador dos valores de uma coluna (não é espaço para str.split() nem ocorre em formulários)
+SEPARATOR = '\x00'
+
+_NON_DIGITS = bytes(set(range(128)) - set(b'0123456789\x00'))
+_NAME_PARTICLES = ('Da', 'De', 'Do', 'Das', 'Dos', 'E')
+
+# Um telefone por valor da coluna (cada valor termina com o separador): DDD + número, com o
+# código do país opcional, ou ('', '') se inválido
+_PHONES = re.compile(r'(?:55(?=\d{10,11}\x00))?(\d{2})(\d{8,9})\x00|\d*\x00')
+
+UFS = frozenset((
+    'AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MT', 'MS', 'MG', 'PA',
+    'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO'
+))
+
+UF_NAMES = {
+    'ACRE': 'AC', 'ALAGOAS': 'AL', 'AMAPA': 'AP', 'AMAZONAS': 'AM', 'BAHIA': 'BA',
+    'CEARA': 'CE', 'DISTRITO FEDERAL': 'DF', 'ESPIRITO SANTO': 'ES', 'GOIAS': 'GO',
+    'MARANHAO': 'MA', 'MATO GROSSO': 'MT', 'MATO GROSSO DO SUL': 'MS', 'MINAS GERAIS': 'MG',
+    'PARA': 'PA', 'PARAIBA': 'PB', 'PARANA': 'PR', 'PERNAMBUCO': 'PE', 'PIAUI': 'PI',
+    'RIO DE JANEIRO': 'RJ', 'RIO GRANDE DO NORTE': 'RN', 'RIO GRANDE DO SUL': 'RS',
+    'RONDONIA': 'RO', 'RORAIMA': 'RR', 'SANTA CATARINA': 'SC', 'SAO PAULO': 'SP',
+    'SERGIPE': 'SE', 'TOCANTINS': 'TO'
+}
+
+# Campo do B2Cor -> nomes aceitos no field_data do Facebook
+DEFAULT_MAPPING = {
+    'nome': ['full_name', 'nome', 'nome_completo', 'name'],
+    'email': ['email', 'e-mail', 'work_email'],
+    'celular': ['phone_number', 'phone', 'celular', 'telefone'],
+    'fixo': ['telefone_fixo', 'work_phone_number'],
+    'uf': ['state', 'uf', 'estado'],
+    'cidade': ['city', 'cidade']
+}
+
+
+def _join(values):
+    """
+    Une os valores de uma coluna em um único texto
+
+    Args:
+        values (list): Valores da coluna
+
+    Returns:
+        str: Valores separados por SEPARATOR
+    """
+    try:
+        text = SEPARATOR.join(values)
+    except TypeError:
+        text = None
+
+    # Valores que não são texto ou que contêm o separador (raro) são tratados um a um
+    if text is None or text.count(SEPARATOR) != len(values) - 1:
+        text = SEPARATOR.join(str(value).replace(SEPARATOR, '') for value in values)
+    return text
+
+
+def normalize_text(values):
+    """
+    Remove espaços repetidos e das pontas de cada valor
+
+    Args:
+        values (list): Valores da coluna
+
+    Returns:
+        list: Valores normalizados
+    """
+    if not values:
+        return []
+    # str.split() sem argumentos trata espaços, tabulações e quebras de linha da coluna inteira
+    text = ' '.join(_join(values).split())
+    text = text.replace(' ' + SEPARATOR, SEPARATOR).replace(SEPARATOR + ' ', SEPARATOR)
+    return text.split(SEPARATOR)
+
+
+def normalize_name(values):
+    """
+    Normaliza nomes (ex: "JOÃO DA SILVA" -> "João da Silva")
+
+    Args:
+        values (list): Valores da coluna
+
+    Returns:
+        list: Nomes normalizados
+    """
+    if not values:
+        return []
+    text = _join(normalize_text(values)).title()
+    # Preposições no meio do nome ficam em minúsculas
+    for particle in _NAME_PARTICLES:
+        text = text.replace(f" {particle} ", f" {particle.lower()} ")
+    return text.split(SEPARATOR)
+
+
+def normalize_email(values):
+    """
+    Normaliza emails (sem espaços e em minúsculas)
+
+    Args:
+        values (list): Valores da coluna
+
+    Returns:
+        list: Emails normalizados
+    """
+    if not values:
+        return []
+    return ''.join(_join(values).split()).lower().split(SEPARATOR)
+
+
+def normalize_uf(values):
+    """
+    Converte estados (sigla ou nome, com ou sem acento) na sigla da UF
+
+    Args:
+        values (list): Valores da coluna
+
+    Returns:
+        list: Siglas das UFs ('' se inválida)
+    """
+    if not values:
+        return []
+    text = _join(normalize_text(values)).upper()
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return [value if value in UFS else UF_NAMES.get(value, '') for value in text.split(SEPARATOR)]
+
+
+def split_phone(values):
+    """
+    Separa telefones brasileiros em DDD e número, sem o código do país
+
+    Args:
+        values (list): Valores da coluna
+
+    Returns:
+        tuple: (lista de DDDs, lista de números), com '' para telefones inválidos
+    """
+    if not values:
+        return [], []
+    digits = _join(values).encode('ascii', 'ignore').translate(None, _NON_DIGITS).decode('ascii')
+    matches = _PHONES.findall(digits + SEPARATOR)
+    return [match[0] for match in matches], [match[1] for match in matches]
+
+
+NORMALIZERS = {
+    'nome': normalize_name,
+    'cidade': normalize_name,
+    'email': normalize_email,
+    'uf': normalize_uf
+}
+
+# Campos de telefone, separados em <campo>_ddd e <campo>_numero
+PHONE_TARGETS = ('celular', 'fixo')
+
+
+def _lower_names(spec):
+    """
+    Converte os nomes de campos de uma especificação para minúsculas
+
+    Args:
+        spec (dict): Campo do B2Cor -> nomes aceitos no field_data
+
+    Returns:
+        dict: Especificação com os nomes em minúsculas
+    """
+    return {target: [name.lower() for name in names] for target, names in spec.items()}
+
+
+class FieldMapper:
+    """
+    Classe para converter lotes de leads do Facebook em campos do B2Cor
+    """
+
+    def __init__(self, mapping=None):
+        """
+        Inicializa o mapeador
+
+        Args:
+            mapping (dict): Especificações por ID de formulário (e 'default'), cada uma no
+                formato {campo do B2Cor: [nomes no field_data]}, aplicadas sobre DEFAULT_MAPPING.
+                Os nomes são comparados sem diferenciar maiúsculas de minúsculas.
+        """
+        mapping = mapping or {}
+        default = _lower_names(dict(DEFAULT_MAPPING, **mapping.get('default', {})))
+        self.specs = {
+            form_id: dict(default, **_lower_names(spec))
+            for form_id, spec in mapping.items() if form_id != 'default'
+        }
+        self.default = default
+
+    def spec_for(self, form_id):
+        """
+        Obtém a especificação de um formulário
+
+        Args:
+            form_id (str): ID do formulário
+
+        Returns:
+            dict: Campo do B2Cor -> nomes aceitos no field_data
+        """
+        return self.specs.get(str(form_id), self.default)
+
+    def _extract_columns(self, leads, spec):
+        """
+        Monta uma coluna de valores brutos para cada campo do B2Cor
+
+        Args:
+            leads (list): Leads no formato do Graph API
+            spec (dict): Especificação do formulário (nomes em minúsculas)
+
+        Returns:
+            dict: Campo do B2Cor -> lista de valores (um por lead, '' se ausente)
+        """
+        try:
+            rows = [{field['name'].lower(): field['values'][0] for field in lead['field_data']} for lead in leads]
+        except (KeyError, IndexError, TypeError):
+            # Leads com field_data incompleto: caminho lento, campo a campo
+            rows = [
+                {
+                    str(field.get('name', '')).lower(): field['values'][0]
+                    for field in lead.get('field_data') or () if field.get('values')
+                }
+                for lead in leads
+            ]
+
+        columns = {}
+        for target, names in spec.items():
+            column = [row.get(names[0], '') for row in rows]
+            for name in names[1:]:
+                if '' not in column:
+                    break
+                column = [value or row.get(name, '') for value, row in zip(column, rows)]
+            columns[target] = column
+
+        return columns
+
+    def _transform_group(self, leads, spec):
+        """
+        Converte leads de um mesmo formulário
+
+        Args:
+            leads (list): Leads no formato do Graph API
+            spec (dict): Especificação do formulário
+
+        Returns:
+            list: Campos do B2Cor de cada lead (somente os preenchidos)
+        """
+        columns = self._extract_columns(leads, spec)
+        normalized = {}
+        for target, values in columns.items():
+            # Colunas sem nenhum valor (ex: formulário sem telefone fixo) não entram no resultado
+            if not any(values):
+                continue
+            if target in PHONE_TARGETS:
+                normalized[f"{target}_ddd"], normalized[f"{target}_numero"] = split_phone(values)
+            else:
+                normalized[target] = NORMALIZERS.get(target, normalize_text)(values)
+
+        names = list(normalized)
+        return [
+            {name: value for name, value in zip(names, row) if value}
+            for row in zip(*(normalized[name] for name in names))
+        ]
+
+    def transform(self, leads):
+        """
+        Converte um lote de leads, agrupando-os por formulário
+
+        Args:
+            leads (list): Leads no formato do Graph API
+
+        Returns:
+            list: Campos do B2Cor de cada lead, na mesma ordem dos leads
+        """
+        form_ids = [str(lead.get('form_id', '')) for lead in leads]
+        if not self.specs or len(set(form_ids)) <= 1:
+            return self._transform_group(leads, self.spec_for(form_ids[0] if form_ids else ''))
+
+        groups = {}
+        for position, form_id in enumerate(form_ids):
+            groups.setdefault(form_id, []).append(position)
+
+        results = [None] * len(leads)
+        for form_id, positions in groups.items():
+            payloads = self._transform_group([leads[position] for position in positions], self.spec_for(form_id))
+            for position, payload in zip(positions, payloads):
+                results[position] = payload
+        return results
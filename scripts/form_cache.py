@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache da lista de formulários de leads do Facebook
+Este script persiste em disco a lista de formulários descoberta, evitando listar todos os
+formulários a cada execução.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("form_cache")
+
+
+def forms_fingerprint(forms):
+    """
+    Calcula uma assinatura da lista de formulários a partir do ID, status e updated_time
+
+    Args:
+        forms (list): Formulários no formato do Graph API
+
+    Returns:
+        str: Hash da lista
+    """
+    items = sorted(
+        (str(form.get('id')), str(form.get('status', '')), str(form.get('updated_time', '')))
+        for form in forms
+    )
+    return hashlib.sha256(json.dumps(items).encode('utf-8')).hexdigest()
+
+
+class FormListCache:
+    """
+    Classe para armazenar a lista de formulários com tempo de validade
+
+    Dentro do TTL a lista em cache é usada diretamente. Depois do TTL, e até max_stale, a
+    lista em cache continua sendo usada enquanto uma nova listagem é feita em segundo plano
+    para a próxima execução. Acima de max_stale (ou sem cache) a listagem é síncrona.
+
+    Quando a origem oferece uma verificação condicional (ex: ETags do Graph API), a revalidação
+    só refaz a listagem se a verificação indicar mudança; uma listagem completa é feita ao
+    menos a cada max_stale.
+    """
+
+    def __init__(self, cache_file, ttl=86400, max_stale=604800):
+        """
+        Inicializa o cache
+
+        Args:
+            cache_file (str): Caminho para o arquivo JSON do cache
+            ttl (int): Validade (em segundos) da lista em cache
+            max_stale (int): Idade máxima (em segundos) para usar a lista vencida enquanto revalida
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_stale = max(ttl, max_stale)
+        self.lock = threading.Lock()
+        self.refreshing = None
+
+    def _load(self):
+        """
+        Carrega o cache do arquivo
+
+        Returns:
+            dict: Entradas do cache por chave
+        """
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            logger.error(f"Erro ao carregar cache de formulários: {self.cache_file}")
+            return {}
+
+    def _store(self, key, forms, validators=None):
+        """
+        Grava uma lista de formulários no cache
+
+        Args:
+            key (str): Chave da origem da lista
+            forms (list): Formulários
+            validators (dict): Dados da verificação condicional (ex: ETags por Página)
+        """
+        with self.lock:
+            entries = self._load()
+            previous = entries.get(key, {})
+            fingerprint = forms_fingerprint(forms)
+            if previous and previous.get('fingerprint') != fingerprint:
+                logger.info(f"Lista de formulários alterada ({len(previous.get('forms', []))} -> {len(forms)} formulários)")
+
+            now = time.time()
+            entries[key] = {
+                'fetched_at': now,
+                'listed_at': now,
+                'fingerprint': fingerprint,
+                'forms': forms,
+                'validators': validators
+            }
+            self._save(entries)
+
+    def _touch(self, key, validators):
+        """
+        Renova a validade de uma lista confirmada como inalterada
+
+        Args:
+            key (str): Chave da origem da lista
+            validators (dict): Dados da verificação condicional
+        """
+        with self.lock:
+            entries = self._load()
+            if key in entries:
+                entries[key]['fetched_at'] = time.time()
+                entries[key]['validators'] = validators
+                self._save(entries)
+
+    def _save(self, entries):
+        """
+        Salva o cache no arquivo de forma atômica (chamado com o lock adquirido)
+
+        Args:
+            entries (dict): Entradas do cache por chave
+        """
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(entries, f, indent=4)
+        os.replace(tmp_file, self.cache_file)
+
+    def refresh(self, key, fetch, check=None, force=False):
+        """
+        Lista os formulários e atualiza o cache
+
+        Args:
+            key (str): Chave da origem da lista
+            fetch (callable): Função que lista os formulários
+            check (callable): Verificação condicional: recebe os validadores salvos (ou None) e
+                retorna (mudou, novos validadores) (opcional)
+            force (bool): Refaz a listagem sem a verificação condicional
+
+        Returns:
+            list: Formulários listados
+        """
+        validators = None
+        if check and not force:
+            with self.lock:
+                entry = self._load().get(key)
+            if entry and entry.get('validators') and time.time() - entry.get('listed_at', 0) < self.max_stale:
+                changed, validators = check(entry['validators'])
+                if not changed:
+                    logger.info("Lista de formulários inalterada (verificação condicional).")
+                    self._touch(key, validators)
+                    return entry['forms']
+
+        forms = fetch()
+        if check and validators is None:
+            validators = check(None)[1]
+        self._store(key, forms, validators)
+        return forms
+
+    def _refresh_in_background(self, key, fetch, check=None):
+        """
+        Revalida o cache em segundo plano
+
+        Args:
+            key (str): Chave da origem da lista
+            fetch (callable): Função que lista os formulários
+            check (callable): Verificação condicional (opcional)
+        """
+        def run():
+            try:
+                self.refresh(key, fetch, check)
+            except Exception as e:
+                logger.error(f"Erro ao revalidar cache de formulários: {str(e)}")
+
+        with self.lock:
+            if self.refreshing and self.refreshing.is_alive():
+                return
+            self.refreshing = threading.Thread(target=run)
+            self.refreshing.start()
+
+    def get(self, key, fetch, check=None):
+        """
+        Obtém a lista de formulários do cache ou da API
+
+        Args:
+            key (str): Chave da origem da lista (ex: IDs das Páginas)
+            fetch (callable): Função que lista os formulários
+            check (callable): Verificação condicional (ver refresh()) (opcional)
+
+        Returns:
+            list: Formulários
+        """
+        with self.lock:
+            entry = self._load().get(key)
+
+        if entry:
+            age = time.time() - entry.get('fetched_at', 0)
+            if age < self.ttl:
+                logger.info(f"Usando lista de formulários em cache ({len(entry['forms'])} formulários)")
+                return entry['forms']
+            if age < self.max_stale:
+                logger.info("Lista de formulários em cache vencida. Revalidando em segundo plano...")
+                self._refresh_in_background(key, fetch, check)
+                return entry['forms']
+
+        return self.refresh(key, fetch, check)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cliente de requisições em lote do Graph API
+Este script agrupa até 50 chamadas GET em um único POST para o Graph API, tratando o erro
+de cada sub-requisição e seguindo a paginação das arestas.
+"""
+
+import json
+import logging
+from urllib.parse import urlparse, quote
+
+logger = logging.getLogger("graph_batch")
+
+GRAPH_URL = "https://graph.facebook.com"
+MAX_BATCH_SIZE = 50
+LEAD_FIELDS = "created_time,id,ad_id,campaign_id,form_id,field_data"
+
+
+class GraphBatchError(Exception):
+    """
+    Erro retornado por uma sub-requisição do lote
+    """
+
+
+class GraphBatchClient:
+    """
+    Classe para executar chamadas ao Graph API em lotes
+    """
+
+    def __init__(self, session, access_token, api_version='v22.0', page_limit=100, graph_url=GRAPH_URL):
+        """
+        Inicializa o cliente
+
+        Args:
+            session (requests.Session): Sessão HTTP
+            access_token (str): Token de acesso
+            api_version (str): Versão do Graph API
+            page_limit (int): Número de itens por página das arestas
+            graph_url (str): URL base do Graph API (ex: um servidor local para testes de carga)
+        """
+        self.session = session
+        self.access_token = access_token
+        self.api_version = api_version
+        self.graph_url = graph_url.rstrip('/')
+        self.page_limit = page_limit
+        self.stats = {'round_trips': 0, 'sub_requests': 0, 'sub_request_errors': 0}
+
+    def _relative_url(self, url):
+        """
+        Converte a URL de paginação (paging.next) em URL relativa para o lote
+
+        Args:
+            url (str): URL absoluta retornada pelo Graph API
+
+        Returns:
+            str: URL relativa, sem versão e sem access_token
+        """
+        parsed = urlparse(url)
+        path = parsed.path.lstrip('/')
+        if path.startswith(self.api_version + '/'):
+            path = path[len(self.api_version) + 1:]
+        query = '&'.join(part for part in parsed.query.split('&') if not part.startswith('access_token='))
+        return f"{path}?{query}" if query else path
+
+    def execute(self, relative_urls):
+        """
+        Executa até 50 chamadas GET em uma única requisição
+
+        Args:
+            relative_urls (list): URLs relativas das chamadas
+
+        Returns:
+            list: Para cada chamada, o corpo JSON decodificado ou uma GraphBatchError
+        """
+        batch = [{'method': 'GET', 'relative_url': url} for url in relative_urls]
+        response = self.session.post(
+            f"{self.graph_url}/{self.api_version}/",
+            data={
+                'access_token': self.access_token,
+                'batch': json.dumps(batch),
+                'include_headers': 'false'
+            },
+            timeout=60
+        )
+        response.raise_for_status()
+        self.stats['round_trips'] += 1
+        self.stats['sub_requests'] += len(relative_urls)
+
+        results = []
+        for url, item in zip(relative_urls, response.json()):
+            # Sub-requisições que excedem o tempo do lote retornam null
+            if item is None:
+                results.append(GraphBatchError(f"Sub-requisição sem resposta: {url}"))
+                continue
+            try:
+                body = json.loads(item.get('body') or '{}')
+            except ValueError:
+                body = {}
+            if item.get('code') != 200:
+                message = body.get('error', {}).get('message', item.get('code'))
+                results.append(GraphBatchError(f"Erro na sub-requisição {url}: {message}"))
+                continue
+            results.append(body)
+
+        self.stats['sub_request_errors'] += sum(isinstance(result, GraphBatchError) for result in results)
+        return results
+
+    def fetch_edges(self, requests_by_key, max_attempts=3):
+        """
+        Busca todas as páginas de várias arestas, agrupando as chamadas em lotes
+
+        Args:
+            requests_by_key (dict): URL relativa da primeira página por chave
+            max_attempts (int): Número de tentativas de cada sub-requisição
+
+        Yields:
+            tuple: (chave, lista de itens, erro ou None) quando a paginação de uma chave termina
+        """
+        pending = [(key, url, 1) for key, url in requests_by_key.items()]
+        items = {key: [] for key in requests_by_key}
+
+        while pending:
+            chunk, pending = pending[:MAX_BATCH_SIZE], pending[MAX_BATCH_SIZE:]
+            results = self.execute([url for _, url, _ in chunk])
+
+            for (key, url, attempt), result in zip(chunk, results):
+                if isinstance(result, GraphBatchError):
+                    if attempt < max_attempts:
+                        pending.append((key, url, attempt + 1))
+                    else:
+                        yield key, items.pop(key), result
+                    continue
+
+                items[key].extend(result.get('data', []))
+                next_url = result.get('paging', {}).get('next')
+                if next_url:
+                    pending.append((key, self._relative_url(next_url), 1))
+                else:
+                    yield key, items.pop(key), None
+
+    def list_forms(self, page_ids):
+        """
+        Lista os formulários de leads de várias Páginas
+
+        Args:
+            page_ids (list): IDs das Páginas
+
+        Returns:
+            list: Formulários encontrados
+        """
+        forms = []
+        requests_by_key = {page_id: self._forms_url(page_id) for page_id in page_ids}
+        for page_id, page_forms, error in self.fetch_edges(requests_by_key):
+            if error:
+                logger.error(f"Erro ao listar formulários da Página {page_id}: {str(error)}")
+            forms.extend(page_forms)
+        return forms
+
+    def _forms_url(self, page_id):
+        """
+        Monta a URL relativa da primeira página de formulários de uma Página
+
+        Args:
+            page_id (str): ID da Página
+
+        Returns:
+            str: URL relativa
+        """
+        return f"{page_id}/leadgen_forms?fields=id,name,status,updated_time&limit={self.page_limit}"
+
+    def check_forms(self, page_ids, etags=None):
+        """
+        Verifica com requisições condicionais (If-None-Match) se a primeira página de formulários
+        de cada Página mudou, sem transferir as listas inalteradas (resposta 304)
+
+        Args:
+            page_ids (list): IDs das Páginas
+            etags (dict): ETag da primeira página de cada Página na última verificação (opcional)
+
+        Returns:
+            tuple: (True se alguma Página mudou ou não tinha ETag, ETags atuais por Página)
+        """
+        etags = etags or {}
+        page_ids = list(page_ids)
+        changed = False
+        current = {}
+
+        for start in range(0, len(page_ids), MAX_BATCH_SIZE):
+            chunk = page_ids[start:start + MAX_BATCH_SIZE]
+            batch = []
+            for page_id in chunk:
+                request = {'method': 'GET', 'relative_url': self._forms_url(page_id)}
+                if etags.get(page_id):
+                    request['headers'] = [{'name': 'If-None-Match', 'value': etags[page_id]}]
+                batch.append(request)
+
+            response = self.session.post(
+                f"{self.graph_url}/{self.api_version}/",
+                data={
+                    'access_token': self.access_token,
+                    'batch': json.dumps(batch),
+                    'include_headers': 'true'
+                },
+                timeout=60
+            )
+            response.raise_for_status()
+            self.stats['round_trips'] += 1
+            self.stats['sub_requests'] += len(chunk)
+
+            for page_id, item in zip(chunk, response.json()):
+                item = item or {}
+                if item.get('code') == 304:
+                    current[page_id] = etags[page_id]
+                    continue
+                changed = True
+                headers = {header.get('name', '').lower(): header.get('value') for header in item.get('headers') or []}
+                if item.get('code') == 200 and headers.get('etag'):
+                    current[page_id] = headers['etag']
+
+        return changed, current
+
+    def leads_url(self, object_id, since=None):
+        """
+        Monta a URL relativa da primeira página de leads de um formulário/anúncio
+
+        Args:
+            object_id (str): ID do formulário ou anúncio
+            since (int): Timestamp Unix mínimo de criação (opcional)
+
+        Returns:
+            str: URL relativa
+        """
+        url = f"{object_id}/leads?fields={LEAD_FIELDS}&limit={self.page_limit}"
+        if since:
+            filtering = json.dumps([{'field': 'time_created', 'operator': 'GREATER_THAN', 'value': int(since)}])
+            url += f"&filtering={quote(filtering)}"
+        return url
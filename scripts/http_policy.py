@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Política de requisições HTTP compartilhada pelos clientes do Facebook e do B2Cor
+Este script implementa um adaptador do requests com limite de taxa por host, novas
+tentativas com backoff exponencial e redução de ritmo baseada nos cabeçalhos de uso
+do Facebook.
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+from scripts.rate_limiter import RateLimiter
+from scripts.metrics import HttpMetrics
+
+logger = logging.getLogger("http_policy")
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Métodos que podem ser repetidos após um erro 5xx ou um timeout de leitura sem risco de
+# duplicar o efeito (um POST de criação pode ter sido gravado antes do erro)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE')
+
+# Códigos de erro do Graph API que indicam limite de taxa atingido
+FACEBOOK_THROTTLE_CODES = (4, 17, 32, 613)
+
+USAGE_HEADERS = ('x-business-use-case-usage', 'x-app-usage', 'x-ad-account-usage')
+
+
+def parse_usage_percent(response):
+    """
+    Obtém o maior percentual de uso informado nos cabeçalhos do Facebook
+
+    Args:
+        response (requests.Response): Resposta do Graph API
+
+    Returns:
+        tuple: (percentual de uso, segundos estimados para recuperar o acesso)
+    """
+    highest = 0.0
+    regain_seconds = 0.0
+
+    for header in USAGE_HEADERS:
+        value = response.headers.get(header)
+        if not value:
+            continue
+        try:
+            usage = json.loads(value)
+        except ValueError:
+            continue
+        if not isinstance(usage, dict):
+            continue
+
+        # x-business-use-case-usage: {"<business_id>": [{...}, ...]}; x-app-usage: {...}
+        entries = [usage] if 'call_count' in usage else [
+            entry for entries in usage.values() if isinstance(entries, list) for entry in entries
+        ]
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            for key in ('call_count', 'total_cputime', 'total_time', 'acc_id_util_pct'):
+                if isinstance(entry.get(key), (int, float)):
+                    highest = max(highest, float(entry[key]))
+            minutes = entry.get('estimated_time_to_regain_access') or 0
+            regain_seconds = max(regain_seconds, float(minutes) * 60)
+
+    return highest, regain_seconds
+
+
+def parse_retry_after(response):
+    """
+    Obtém o tempo de espera do cabeçalho Retry-After
+
+    Args:
+        response (requests.Response): Resposta HTTP
+
+    Returns:
+        float: Segundos de espera ou None se ausente
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def is_connect_error(error):
+    """
+    Verifica se o erro ocorreu antes de a requisição ser enviada (conexão recusada, DNS ou
+    timeout de conexão), quando repetir é seguro para qualquer método
+
+    Args:
+        error (requests.exceptions.RequestException): Erro da requisição
+
+    Returns:
+        bool: True se o servidor não recebeu a requisição
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ReadTimeout):
+        return False
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, 'reason', reason), ConnectTimeoutError)
+
+
+def is_facebook_throttle(response):
+    """
+    Verifica se a resposta é um erro de limite de taxa do Graph API
+
+    Args:
+        response (requests.Response): Resposta HTTP
+
+    Returns:
+        bool: True se o erro indica limite de taxa
+    """
+    if response.status_code not in (400, 403):
+        return False
+    try:
+        error = response.json().get('error', {})
+    except ValueError:
+        return False
+    return isinstance(error, dict) and error.get('code') in FACEBOOK_THROTTLE_CODES
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """
+    Adaptador do requests com limite de taxa por host e novas tentativas
+    """
+
+    def __init__(self, metrics, rate_limits=None, max_retries_count=5, backoff_base=1.0,
+                 backoff_max=60.0, usage_threshold=75.0, max_slowdown=30.0, registry=None,
+                 idempotent_urls=None, **kwargs):
+        """
+        Inicializa o adaptador
+
+        Args:
+            metrics (HttpMetrics): Contadores compartilhados
+            rate_limits (dict): Chamadas por minuto permitidas por host
+            max_retries_count (int): Número máximo de novas tentativas por requisição
+            backoff_base (float): Espera base (em segundos) do backoff exponencial
+            backoff_max (float): Espera máxima (em segundos) entre tentativas
+            usage_threshold (float): Percentual de uso do Facebook a partir do qual as chamadas são desaceleradas
+            max_slowdown (float): Espera máxima (em segundos) aplicada ao atingir 100% de uso
+            registry (MetricsRegistry): Registro de latências e bytes transferidos (opcional)
+            idempotent_urls (list): Prefixos de URL cujos POSTs são apenas leituras (ex: /lead/find)
+        """
+        super().__init__(**kwargs)
+        self.metrics = metrics
+        self.rate_limits = rate_limits or {}
+        self.max_retries_count = max_retries_count
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.usage_threshold = usage_threshold
+        self.max_slowdown = max_slowdown
+        self.registry = registry
+        self.idempotent_urls = tuple(idempotent_urls or ())
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+
+    def _get_limiter(self, host):
+        """
+        Obtém o limitador de um host
+
+        Args:
+            host (str): Host da requisição
+
+        Returns:
+            RateLimiter: Limitador do host
+        """
+        with self.limiters_lock:
+            if host not in self.limiters:
+                self.limiters[host] = RateLimiter(self.rate_limits.get(host, 0))
+            return self.limiters[host]
+
+    def _is_idempotent(self, request):
+        """
+        Verifica se a requisição pode ser repetida após um erro 5xx ou um timeout de leitura
+
+        Args:
+            request (requests.PreparedRequest): Requisição enviada
+
+        Returns:
+            bool: True para métodos idempotentes e URLs de leitura configuradas
+        """
+        return request.method in IDEMPOTENT_METHODS or request.url.startswith(self.idempotent_urls)
+
+    def _backoff(self, attempt):
+        """
+        Calcula a espera do backoff exponencial com jitter
+
+        Args:
+            attempt (int): Número da tentativa (começando em 0)
+
+        Returns:
+            float: Segundos de espera
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _observe_usage(self, host, response, limiter):
+        """
+        Desacelera as chamadas ao host conforme os cabeçalhos de uso do Facebook
+
+        Args:
+            host (str): Host da requisição
+            response (requests.Response): Resposta HTTP
+            limiter (RateLimiter): Limitador do host
+        """
+        usage, regain_seconds = parse_usage_percent(response)
+        if regain_seconds > 0:
+            limiter.pause(regain_seconds)
+            self.metrics.increment(host, 'usage_pauses')
+        elif usage >= self.usage_threshold:
+            ratio = (usage - self.usage_threshold) / max(1.0, 100.0 - self.usage_threshold)
+            limiter.pause(min(1.0, ratio) * self.max_slowdown)
+            self.metrics.increment(host, 'usage_pauses')
+
+    def _record(self, host, request, response, elapsed):
+        """
+        Registra a latência e os bytes transferidos de uma chamada
+
+        Args:
+            host (str): Host da requisição
+            request (requests.PreparedRequest): Requisição enviada
+            response (requests.Response): Resposta recebida
+            elapsed (float): Duração da chamada em segundos
+        """
+        if not self.registry:
+            return
+        body = request.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.registry.observe('http_request_seconds', elapsed, host=host)
+        self.registry.increment('http_requests_total', host=host, status=str(response.status_code))
+        self.registry.increment('http_bytes_sent_total', len(body), host=host)
+        self.registry.increment('http_bytes_received_total', int(response.headers.get('Content-Length', 0) or 0), host=host)
+
+    def send(self, request, **kwargs):
+        """
+        Envia a requisição respeitando o limite do host e repetindo em caso de erro temporário
+
+        Requisições não idempotentes (ex: POST de criação de lead) só são repetidas quando o
+        servidor certamente não as processou: 429, respostas com Retry-After, limite de taxa do
+        Graph API ou falha ao conectar.
+
+        Args:
+            request (requests.PreparedRequest): Requisição a enviar
+
+        Returns:
+            requests.Response: Resposta HTTP
+        """
+        host = urlparse(request.url).hostname or ''
+        limiter = self._get_limiter(host)
+        idempotent = self._is_idempotent(request)
+        attempt = 0
+
+        while True:
+            waited = limiter.acquire()
+            if waited > 0:
+                self.metrics.increment(host, 'throttled_waits')
+                self.metrics.increment(host, 'throttled_seconds', waited)
+
+            self.metrics.increment(host, 'requests')
+            started_at = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not idempotent and not is_connect_error(e):
+                    self.metrics.increment(host, 'unsafe_not_retried')
+                    raise
+                if attempt >= self.max_retries_count:
+                    self.metrics.increment(host, 'give_ups')
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Erro de conexão com {host} ({str(e)}). Nova tentativa em {delay:.1f}s")
+            else:
+                self._record(host, request, response, time.perf_counter() - started_at)
+                self._observe_usage(host, response, limiter)
+
+                throttled = is_facebook_throttle(response)
+                if response.status_code not in RETRY_STATUSES and not throttled:
+                    return response
+
+                delay = parse_retry_after(response)
+                if not idempotent and response.status_code != 429 and not throttled and delay is None:
+                    self.metrics.increment(host, 'unsafe_not_retried')
+                    return response
+                if attempt >= self.max_retries_count:
+                    self.metrics.increment(host, 'give_ups')
+                    return response
+
+                if delay is None:
+                    delay = self._backoff(attempt)
+                logger.warning(f"{host} respondeu {response.status_code}. Nova tentativa em {delay:.1f}s")
+                response.close()
+
+            # A espera vale para todos os workers que usam o mesmo host
+            self.metrics.increment(host, 'retries')
+            limiter.pause(delay)
+            attempt += 1
+
+
+def find_session(client):
+    """
+    Localiza a sessão do requests usada por um cliente de API
+
+    Args:
+        client (object): Cliente de API (ou objeto de autenticação)
+
+    Returns:
+        requests.Session: Sessão encontrada ou None
+    """
+    for name in ('session', '_session', 'http'):
+        session = getattr(client, name, None)
+        if isinstance(session, requests.Session):
+            return session
+    return None
+
+
+def install(session, adapter):
+    """
+    Instala o adaptador em uma sessão do requests
+
+    Args:
+        session (requests.Session): Sessão do cliente de API
+        adapter (ThrottledAdapter): Adaptador a instalar
+    """
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
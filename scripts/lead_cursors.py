@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Armazenamento de cursores de extração incremental
+Este script guarda, por formulário/anúncio, o created_time do último lead processado.
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger("lead_cursors")
+
+CREATED_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+
+def parse_created_time(value):
+    """
+    Converte o created_time do Facebook em datetime
+
+    Args:
+        value (str): Data no formato do Graph API (ex: 2024-05-01T12:34:56+0000)
+
+    Returns:
+        datetime: Data convertida ou None se inválida
+    """
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, CREATED_TIME_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+class LeadCursorStore:
+    """
+    Classe para persistir a marca d'água (último created_time) de cada formulário/anúncio
+    """
+
+    def __init__(self, cursor_file):
+        """
+        Inicializa o armazenamento
+
+        Args:
+            cursor_file (str): Caminho para o arquivo JSON de cursores
+        """
+        self.cursor_file = cursor_file
+        self.lock = threading.Lock()
+        self.cursors = self._load()
+
+    def _load(self):
+        """
+        Carrega os cursores do arquivo
+
+        Returns:
+            dict: Cursores por chave (ex: form:123)
+        """
+        if not os.path.exists(self.cursor_file):
+            return {}
+        try:
+            with open(self.cursor_file, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            logger.error(f"Erro ao carregar arquivo de cursores: {self.cursor_file}")
+            return {}
+
+    def get(self, key):
+        """
+        Obtém o cursor de um formulário/anúncio
+
+        Args:
+            key (str): Chave do cursor (ex: form:123)
+
+        Returns:
+            dict: Cursor com created_time e updated_at, ou None
+        """
+        with self.lock:
+            return self.cursors.get(key)
+
+    def update(self, key, created_time):
+        """
+        Avança o cursor se o created_time informado for mais recente
+
+        Args:
+            key (str): Chave do cursor
+            created_time (str): created_time do lead mais recente processado
+        """
+        new_time = parse_created_time(created_time)
+        if not new_time:
+            return
+
+        with self.lock:
+            current = self.cursors.get(key)
+            current_time = parse_created_time(current.get('created_time')) if current else None
+            if current_time and current_time >= new_time:
+                return
+            self.cursors[key] = {
+                'created_time': created_time,
+                'updated_at': datetime.now().isoformat()
+            }
+
+    def save(self):
+        """
+        Salva os cursores no arquivo de forma atômica
+        """
+        with self.lock:
+            tmp_file = f"{self.cursor_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self.cursors, f, indent=4)
+            os.replace(tmp_file, self.cursor_file)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Índice local de leads já enviados ao B2Cor
+Este script mantém um índice SQLite com o ID do Facebook, o celular normalizado e o
+email de cada lead entregue, para evitar o reenvio de leads duplicados.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger("lead_index")
+
+PHONE_FIELDS = ('phone_number', 'phone', 'celular', 'telefone')
+EMAIL_FIELDS = ('email', 'e-mail', 'work_email')
+
+
+def get_field_value(lead, names):
+    """
+    Obtém o primeiro valor de um campo do field_data do Facebook
+
+    Args:
+        lead (dict): Lead no formato do Graph API
+        names (tuple): Nomes aceitos para o campo
+
+    Returns:
+        str: Valor do campo ou None
+    """
+    for field in lead.get('field_data', []):
+        if field.get('name', '').lower() in names and field.get('values'):
+            return field['values'][0]
+    return None
+
+
+def normalize_phone(value):
+    """
+    Normaliza um telefone brasileiro para DDD + número, sem o código do país
+
+    Args:
+        value (str): Telefone em qualquer formato
+
+    Returns:
+        str: Apenas dígitos (DDD + número) ou None se inválido
+    """
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) in (12, 13) and digits.startswith('55'):
+        digits = digits[2:]
+    if len(digits) not in (10, 11):
+        return None
+    return digits
+
+
+def lead_keys(lead):
+    """
+    Calcula as chaves de deduplicação de um lead
+
+    Args:
+        lead (dict): Lead no formato do Graph API
+
+    Returns:
+        list: Chaves do lead (id, celular e email, quando disponíveis)
+    """
+    keys = []
+    if lead.get('id'):
+        keys.append(f"id:{lead['id']}")
+
+    phone = normalize_phone(get_field_value(lead, PHONE_FIELDS))
+    if phone:
+        keys.append(f"phone:{phone}")
+
+    email = (get_field_value(lead, EMAIL_FIELDS) or '').strip().lower()
+    if email:
+        keys.append(f"email:{email}")
+
+    return keys
+
+
+class LeadIndex:
+    """
+    Classe para consultar e registrar leads já enviados
+    """
+
+    def __init__(self, index_file):
+        """
+        Inicializa o índice
+
+        Args:
+            index_file (str): Caminho para o arquivo SQLite
+        """
+        self.index_file = index_file
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(index_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS lead_keys (key TEXT PRIMARY KEY, indexed_at REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_lead_keys_indexed_at ON lead_keys (indexed_at)")
+        self.connection.commit()
+
+    def contains(self, lead):
+        """
+        Verifica se algum identificador do lead já foi enviado
+
+        Args:
+            lead (dict): Lead no formato do Graph API
+
+        Returns:
+            bool: True se o lead já está no índice
+        """
+        keys = lead_keys(lead)
+        if not keys:
+            return False
+
+        placeholders = ','.join('?' * len(keys))
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT 1 FROM lead_keys WHERE key IN ({placeholders}) LIMIT 1", keys
+            ).fetchone()
+        return row is not None
+
+    def add_many(self, leads):
+        """
+        Registra leads como enviados
+
+        Args:
+            leads (list): Leads no formato do Graph API
+        """
+        now = time.time()
+        rows = [(key, now) for lead in leads for key in lead_keys(lead)]
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO lead_keys (key, indexed_at) VALUES (?, ?)", rows)
+            self.connection.commit()
+
+    def remove_many(self, leads):
+        """
+        Remove leads do índice (para que voltem a ser enviados)
+
+        Args:
+            leads (list): Leads no formato do Graph API
+        """
+        rows = [(key,) for lead in leads for key in lead_keys(lead)]
+        with self.lock:
+            self.connection.executemany("DELETE FROM lead_keys WHERE key = ?", rows)
+            self.connection.commit()
+
+    def warm_up(self, leads_dir):
+        """
+        Popula o índice a partir dos arquivos de leads existentes
+
+        Args:
+            leads_dir (str): Diretório com os arquivos facebook_leads_*.json(l)
+
+        Returns:
+            int: Número de leads indexados
+        """
+        total = 0
+        for filename in sorted(os.listdir(leads_dir)):
+            file_path = os.path.join(leads_dir, filename)
+            if not filename.startswith('facebook_leads_'):
+                continue
+
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    if filename.endswith('.jsonl'):
+                        leads = [json.loads(line) for line in f if line.strip()]
+                    elif filename.endswith('.json'):
+                        data = json.load(f)
+                        leads = data.get('leads', data.get('data', [])) if isinstance(data, dict) else data
+                    else:
+                        continue
+            except (OSError, ValueError) as e:
+                logger.error(f"Erro ao ler arquivo de leads {file_path}: {str(e)}")
+                continue
+
+            self.add_many(leads)
+            total += len(leads)
+
+        return total
+
+    def evict(self, keep_days):
+        """
+        Remove do índice os registros mais antigos que o período de retenção
+
+        Args:
+            keep_days (int): Número de dias para manter os registros
+
+        Returns:
+            int: Número de registros removidos
+        """
+        cutoff = time.time() - keep_days * 86400
+        with self.lock:
+            cursor = self.connection.execute("DELETE FROM lead_keys WHERE indexed_at < ?", (cutoff,))
+            self.connection.commit()
+        return cursor.rowcount
+
+    def close(self):
+        """
+        Fecha a conexão com o índice
+        """
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Priorização do envio de leads ao B2Cor
+Este script ordena os leads do mais recente para o mais antigo (created_time), com pesos
+configuráveis por formulário e campanha, e os separa em filas ("lanes"): leads recentes vão
+para a fila de tempo real e leads antigos/cargas históricas para a fila de backfill. As filas
+são atendidas por round-robin ponderado, de modo que o backfill nunca bloqueia o tempo real.
+"""
+
+import time
+import heapq
+import calendar
+import threading
+
+from scripts.lead_cursors import parse_created_time
+
+REALTIME = 'realtime'
+BACKFILL = 'backfill'
+
+DEFAULT_LANE_WEIGHTS = {REALTIME: 4, BACKFILL: 1}
+
+
+def created_timestamp(lead):
+    """
+    Obtém o created_time de um lead como timestamp Unix
+
+    Args:
+        lead (dict): Lead no formato do Graph API
+
+    Returns:
+        float: Timestamp ou None se ausente/inválido
+    """
+    value = lead.get('created_time')
+    # Formato usual do Graph API (2024-05-01T12:34:56+0000), sem o custo do strptime
+    if isinstance(value, str) and len(value) == 24 and value.endswith('+0000'):
+        try:
+            return float(calendar.timegm((
+                int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19])
+            )))
+        except ValueError:
+            pass
+
+    created_time = parse_created_time(value)
+    return created_time.timestamp() if created_time else None
+
+
+class LeadPrioritizer:
+    """
+    Classe para distribuir os leads entre as filas e ordená-los por prioridade
+    """
+
+    def __init__(self, form_weights=None, campaign_weights=None, realtime_window_hours=24):
+        """
+        Inicializa o priorizador
+
+        Args:
+            form_weights (dict): Peso por ID de formulário (padrão: 1)
+            campaign_weights (dict): Peso por ID de campanha (padrão: 1)
+            realtime_window_hours (float): Idade máxima (em horas) de um lead da fila de tempo real
+        """
+        self.form_weights = {str(key): float(value) for key, value in (form_weights or {}).items()}
+        self.campaign_weights = {str(key): float(value) for key, value in (campaign_weights or {}).items()}
+        self.realtime_window = realtime_window_hours * 3600
+
+    def weight(self, lead):
+        """
+        Calcula o peso de um lead (produto dos pesos do formulário e da campanha)
+
+        Args:
+            lead (dict): Lead
+
+        Returns:
+            float: Peso (maior = mais urgente)
+        """
+        return (
+            self.form_weights.get(str(lead.get('form_id', '')), 1.0)
+            * self.campaign_weights.get(str(lead.get('campaign_id', '')), 1.0)
+        )
+
+    def plan(self, leads, batch_size, lane=None, now=None):
+        """
+        Monta os lotes de envio de cada fila, em ordem de prioridade
+
+        A prioridade é a idade do lead dividida pelo peso: um formulário com peso 2 "envelhece"
+        na metade da velocidade. Leads sem created_time ficam no fim da fila de backfill.
+
+        Args:
+            leads (list): Leads a enviar
+            batch_size (int): Número de leads por lote
+            lane (str): Força todos os leads para uma fila (ex: BACKFILL em cargas históricas)
+            now (float): Timestamp de referência (padrão: agora)
+
+        Returns:
+            list: Tuplas (fila, prioridade, lote), com prioridade menor = enviar antes
+        """
+        now = now or time.time()
+        lanes = {}
+        for lead in leads:
+            created_at = created_timestamp(lead)
+            age = max(0.0, now - created_at) if created_at is not None else float('inf')
+            weight = self.weight(lead)
+            priority = age / weight if weight > 0 else float('inf')
+            lead_lane = lane or (REALTIME if age <= self.realtime_window else BACKFILL)
+            lanes.setdefault(lead_lane, []).append((priority, lead))
+
+        batches = []
+        for lead_lane, entries in lanes.items():
+            entries.sort(key=lambda entry: entry[0])
+            for i in range(0, len(entries), batch_size):
+                chunk = entries[i:i + batch_size]
+                batches.append((lead_lane, chunk[0][0], [lead for _, lead in chunk]))
+        return batches
+
+
+class LaneQueue:
+    """
+    Fila de lotes com uma fila de prioridade por lane, atendidas por round-robin ponderado
+    """
+
+    def __init__(self, lane_weights=None, maxsize=0):
+        """
+        Inicializa a fila
+
+        Args:
+            lane_weights (dict): Peso de cada lane no round-robin (lanes não listadas: 1)
+            maxsize (int): Número máximo de lotes por lane (0 = sem limite)
+        """
+        self.lane_weights = dict(DEFAULT_LANE_WEIGHTS, **(lane_weights or {}))
+        self.maxsize = maxsize
+        self.condition = threading.Condition()
+        self.heaps = {}
+        self.credits = {}
+        self.sequence = 0
+        self.closed = False
+
+    def put(self, lane, priority, batch):
+        """
+        Adiciona um lote, bloqueando enquanto a lane estiver cheia
+
+        Args:
+            lane (str): Nome da lane
+            priority (float): Prioridade do lote (menor = enviar antes)
+            batch (list): Leads do lote
+        """
+        with self.condition:
+            heap = self.heaps.setdefault(lane, [])
+            while self.maxsize and len(heap) >= self.maxsize:
+                self.condition.wait()
+            self.sequence += 1
+            heapq.heappush(heap, (priority, self.sequence, time.monotonic(), batch))
+            self.condition.notify_all()
+
+    def close(self):
+        """
+        Indica que não haverá novos lotes (get() retorna None quando as lanes esvaziarem)
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def _next_lane(self):
+        """
+        Escolhe a próxima lane por round-robin ponderado suave (chamado com o lock adquirido)
+
+        Returns:
+            str: Lane com lotes pendentes ou None
+        """
+        ready = [lane for lane, heap in self.heaps.items() if heap]
+        if not ready:
+            return None
+
+        total = 0
+        for lane in ready:
+            weight = max(1, self.lane_weights.get(lane, 1))
+            self.credits[lane] = self.credits.get(lane, 0) + weight
+            total += weight
+
+        chosen = max(ready, key=lambda lane: self.credits[lane])
+        self.credits[chosen] -= total
+        return chosen
+
+    def get(self):
+        """
+        Retira o próximo lote, bloqueando enquanto não houver lotes
+
+        Returns:
+            tuple: (lane, lote, tempo de espera na fila em segundos) ou None se a fila foi fechada
+        """
+        with self.condition:
+            while True:
+                lane = self._next_lane()
+                if lane:
+                    _, _, enqueued_at, batch = heapq.heappop(self.heaps[lane])
+                    self.condition.notify_all()
+                    return lane, batch, time.monotonic() - enqueued_at
+                if self.closed:
+                    return None
+                self.condition.wait()
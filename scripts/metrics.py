@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Métricas de execução da integração
+Este script registra contadores e latências (p50/p95/p99) das etapas e chamadas de API e
+exporta os valores no formato texto do Prometheus ou como um resumo JSON.
+"""
+
+import os
+import sys
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Amostras mantidas por série para os percentis (as mais recentes)
+MAX_SAMPLES = 2048
+
+
+def percentile(sorted_values, quantile):
+    """
+    Calcula um percentil por interpolação linear
+
+    Args:
+        sorted_values (list): Valores ordenados
+        quantile (float): Percentil entre 0 e 1
+
+    Returns:
+        float: Valor do percentil (0.0 se não houver valores)
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * quantile
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _series_key(name, labels):
+    """
+    Monta a chave de uma série a partir do nome e dos rótulos
+
+    Args:
+        name (str): Nome da métrica
+        labels (dict): Rótulos da série
+
+    Returns:
+        tuple: Chave da série
+    """
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels, extra=None):
+    """
+    Formata os rótulos no padrão do Prometheus
+
+    Args:
+        labels (tuple): Pares (nome, valor)
+        extra (tuple): Par adicional (ex: quantile)
+
+    Returns:
+        str: Rótulos formatados (vazio se não houver)
+    """
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    Classe para registrar contadores e latências de forma segura entre threads
+
+    Cada série de latência guarda o número e a soma de todas as amostras, mas apenas as
+    max_samples mais recentes para os percentis: a memória e o custo de cada exportação
+    não crescem nos modos de longa duração (--serve, --tenants).
+    """
+
+    def __init__(self, prefix='facebook_b2cor', max_samples=MAX_SAMPLES):
+        """
+        Inicializa o registro
+
+        Args:
+            prefix (str): Prefixo dos nomes das métricas exportadas
+            max_samples (int): Amostras mantidas por série para os percentis
+        """
+        self.prefix = prefix
+        self.max_samples = max(1, max_samples)
+        self.lock = threading.Lock()
+        self.counters = {}
+        # Série -> [número de amostras, soma, amostras mais recentes]
+        self.samples = {}
+
+    def reset(self, keep=()):
+        """
+        Descarta os valores registrados
+
+        Args:
+            keep (iterable): Séries (nome, rótulos) mantidas (ex: a duração do setup, feito uma vez)
+        """
+        keys = {_series_key(name, labels) for name, labels in keep}
+        with self.lock:
+            self.counters = {key: value for key, value in self.counters.items() if key in keys}
+            self.samples = {key: values for key, values in self.samples.items() if key in keys}
+
+    def increment(self, name, value=1, **labels):
+        """
+        Incrementa um contador
+
+        Args:
+            name (str): Nome do contador
+            value (float): Valor a somar
+            **labels: Rótulos da série
+        """
+        key = _series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        Registra uma amostra (ex: latência em segundos)
+
+        Args:
+            name (str): Nome da métrica
+            value (float): Valor observado
+            **labels: Rótulos da série
+        """
+        key = _series_key(name, labels)
+        with self.lock:
+            series = self.samples.get(key)
+            if series is None:
+                series = self.samples[key] = [0, 0.0, deque(maxlen=self.max_samples)]
+            series[0] += 1
+            series[1] += value
+            series[2].append(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Mede o tempo de execução de um bloco
+
+        Args:
+            name (str): Nome da métrica de latência
+            **labels: Rótulos da série
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def summary(self):
+        """
+        Resume os valores registrados
+
+        Returns:
+            dict: Contadores e, para cada latência, count/sum e p50/p95/p99 das amostras mais recentes
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            samples = {key: (count, total, list(recent)) for key, (count, total, recent) in self.samples.items()}
+
+        result = {'counters': {}, 'latencies': {}}
+        for (name, labels), value in counters.items():
+            result['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+
+        for (name, labels), (count, total, values) in samples.items():
+            values.sort()
+            entry = {'labels': dict(labels), 'count': count, 'sum': total}
+            for quantile in QUANTILES:
+                entry[f"p{int(quantile * 100)}"] = percentile(values, quantile)
+            result['latencies'].setdefault(name, []).append(entry)
+
+        return result
+
+    def to_prometheus(self):
+        """
+        Exporta os valores no formato texto do Prometheus
+
+        Returns:
+            str: Métricas no formato de exposição do Prometheus
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            samples = {key: (count, total, list(recent)) for key, (count, total, recent) in self.samples.items()}
+
+        lines = []
+        declared = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{self.prefix}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        for (name, labels), (count, total, values) in sorted(samples.items()):
+            metric = f"{self.prefix}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} summary")
+                declared.add(metric)
+            values.sort()
+            for quantile in QUANTILES:
+                lines.append(f"{metric}{_format_labels(labels, ('quantile', quantile))} {percentile(values, quantile)}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Grava as métricas em um arquivo (para o textfile collector do node_exporter)
+
+        Args:
+            path (str): Caminho do arquivo .prom
+        """
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_file, path)
+
+
+class HttpMetrics:
+    """
+    Classe para contabilizar esperas, novas tentativas e desistências por host
+    """
+
+    def __init__(self):
+        """
+        Inicializa os contadores
+        """
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def increment(self, host, name, value=1):
+        """
+        Incrementa um contador de um host
+
+        Args:
+            host (str): Host da requisição
+            name (str): Nome do contador
+            value (float): Valor a somar
+        """
+        with self.lock:
+            host_counters = self.counters.setdefault(host, {})
+            host_counters[name] = host_counters.get(name, 0) + value
+
+    def reset(self):
+        """
+        Zera os contadores
+        """
+        with self.lock:
+            self.counters = {}
+
+    def snapshot(self):
+        """
+        Obtém uma cópia dos contadores
+
+        Returns:
+            dict: Contadores por host
+        """
+        with self.lock:
+            return {host: dict(values) for host, values in self.counters.items()}
+
+
+def peak_rss_bytes():
+    """
+    Obtém o pico de memória residente do processo
+
+    Returns:
+        int: Pico de memória em bytes ou None se indisponível (ex: Windows)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é informado em bytes no macOS e em kilobytes no Linux
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def compare_summaries(current, baseline, tolerance=0.2, min_seconds=0.01):
+    """
+    Compara os indicadores de desempenho de uma execução com os de uma execução de referência
+
+    Args:
+        current (dict): Seção 'benchmark' do resumo da execução atual
+        baseline (dict): Seção 'benchmark' do resumo de referência
+        tolerance (float): Variação relativa aceita (0.2 = 20%)
+        min_seconds (float): Latências p95 abaixo deste valor nas duas execuções são ignoradas
+            (variações de microssegundos são ruído, não regressão)
+
+    Returns:
+        list: Descrição de cada regressão encontrada (vazia se não houver)
+    """
+    regressions = []
+
+    def check(name, now, before, higher_is_better=False):
+        if not now or not before:
+            return
+        change = (now - before) / before
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{name}: {before:.4g} -> {now:.4g} ({change:+.0%})")
+
+    check('leads_per_second', current.get('leads_per_second'), baseline.get('leads_per_second'), higher_is_better=True)
+    check('peak_rss_bytes', current.get('peak_rss_bytes'), baseline.get('peak_rss_bytes'))
+    check('api_calls', current.get('api_calls'), baseline.get('api_calls'))
+
+    baseline_p95 = baseline.get('p95_seconds', {})
+    for name, value in sorted(current.get('p95_seconds', {}).items()):
+        if max(value or 0, baseline_p95.get(name) or 0) < min_seconds:
+            continue
+        check(f"p95 {name}", value, baseline_p95.get(name))
+
+    return regressions
+
+
+class ThreadProfiler:
+    """
+    Classe para perfilar com o cProfile a thread principal e as threads iniciadas enquanto ativo
+    (ex: workers de extração e envio, que um único cProfile.Profile não enxerga)
+    """
+
+    def __init__(self):
+        """
+        Inicializa o perfilador
+        """
+        self.profilers = []
+        self.lock = threading.Lock()
+        self.original_run = None
+
+    def start(self):
+        """
+        Inicia o perfil da thread atual e passa a perfilar cada nova thread
+        """
+        import cProfile
+
+        profilers, lock = self.profilers, self.lock
+        original_run = self.original_run = threading.Thread.run
+
+        def run(thread):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+: o perfil da thread principal (sys.monitoring) já cobre todas as threads
+                return original_run(thread)
+            with lock:
+                profilers.append(profiler)
+            try:
+                original_run(thread)
+            finally:
+                profiler.disable()
+
+        main_profiler = cProfile.Profile()
+        profilers.append(main_profiler)
+        threading.Thread.run = run
+        main_profiler.enable()
+
+    def stop(self):
+        """
+        Encerra o perfil e combina as estatísticas de todas as threads
+
+        Returns:
+            pstats.Stats: Estatísticas combinadas
+        """
+        import pstats
+
+        self.profilers[0].disable()
+        threading.Thread.run = self.original_run
+        with self.lock:
+            profilers = list(self.profilers)
+
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+def timed_stage(stage):
+    """
+    Decorador que mede a duração de um método da integração em stage_seconds
+
+    Args:
+        stage (str): Nome da etapa
+
+    Returns:
+        callable: Decorador
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer('stage_seconds', stage=stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
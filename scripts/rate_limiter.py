@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Limitador de taxa compartilhado entre threads
+Este script implementa um token bucket simples para distribuir o orçamento de chamadas
+às APIs entre vários workers.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Classe para limitar a taxa de chamadas usando um token bucket
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        """
+        Inicializa o limitador
+
+        Args:
+            rate_per_minute (float): Número de chamadas permitidas por minuto (0 ou None desativa o limite)
+            burst (int): Número máximo de chamadas acumuladas (opcional, padrão: 1)
+        """
+        self.rate = (rate_per_minute or 0) / 60.0
+        self.capacity = max(1, burst or 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """
+        Repõe os tokens de acordo com o tempo decorrido
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def pause(self, seconds):
+        """
+        Suspende as chamadas de todos os workers por um período
+
+        Args:
+            seconds (float): Tempo (em segundos) sem chamadas
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """
+        Aguarda até que uma chamada seja permitida
+
+        Returns:
+            float: Tempo (em segundos) gasto aguardando
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                pause = self.paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+            waited += pause
+
+        if self.rate <= 0:
+            return waited
+
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
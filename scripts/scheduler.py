@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Agendador de execuções da integração
+Este script calcula o horário exato da próxima execução de cada job (sem polling), executa
+os jobs fora da thread principal e impede que uma execução se sobreponha à anterior.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("scheduler")
+
+
+class ScheduledJob:
+    """
+    Classe que representa um job agendado e suas estatísticas
+    """
+
+    def __init__(self, name, func, period, first_run, overlap='coalesce'):
+        """
+        Inicializa o job
+
+        Args:
+            name (str): Nome do job
+            func (callable): Função a executar
+            period (timedelta): Intervalo entre execuções
+            first_run (datetime): Horário da primeira execução
+            overlap (str): 'coalesce' executa uma vez ao fim da execução em andamento;
+                'skip' descarta o disparo
+        """
+        self.name = name
+        self.func = func
+        self.period = period
+        self.next_run = first_run
+        self.overlap = overlap
+        self.running = False
+        self.pending = False
+        self.stats = {
+            'runs': 0,
+            'failures': 0,
+            'missed': 0,
+            'skipped': 0,
+            'coalesced': 0,
+            'overruns': 0,
+            'last_duration': None,
+            'last_started_at': None
+        }
+
+    def advance(self, now):
+        """
+        Calcula o próximo horário de execução a partir do horário programado (sem deriva)
+
+        Args:
+            now (datetime): Horário atual
+
+        Returns:
+            int: Número de execuções perdidas (horários que ficaram no passado)
+        """
+        missed = 0
+        self.next_run += self.period
+        while self.next_run <= now:
+            self.next_run += self.period
+            missed += 1
+        return missed
+
+
+class JobScheduler:
+    """
+    Classe para executar jobs periódicos em horários exatos
+    """
+
+    def __init__(self):
+        """
+        Inicializa o agendador
+        """
+        self.jobs = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+
+    def add_job(self, name, func, period, first_run=None, overlap='coalesce'):
+        """
+        Agenda um job periódico
+
+        Args:
+            name (str): Nome do job
+            func (callable): Função a executar
+            period (timedelta): Intervalo entre execuções
+            first_run (datetime): Horário da primeira execução (padrão: agora + período)
+            overlap (str): Política para disparos durante uma execução em andamento
+
+        Returns:
+            ScheduledJob: Job agendado
+        """
+        job = ScheduledJob(name, func, period, first_run or datetime.now() + period, overlap)
+        with self.lock:
+            self.jobs.append(job)
+        self.wakeup.set()
+        logger.info(f"Job '{name}' agendado. Próxima execução: {job.next_run:%Y-%m-%d %H:%M:%S}")
+        return job
+
+    def add_interval_job(self, name, func, minutes, overlap='coalesce'):
+        """
+        Agenda um job a cada N minutos
+
+        Args:
+            name (str): Nome do job
+            func (callable): Função a executar
+            minutes (float): Intervalo em minutos
+            overlap (str): Política para disparos durante uma execução em andamento
+
+        Returns:
+            ScheduledJob: Job agendado
+        """
+        return self.add_job(name, func, timedelta(minutes=minutes), overlap=overlap)
+
+    def add_time_job(self, name, func, time_str, days=1, overlap='coalesce'):
+        """
+        Agenda um job em um horário fixo a cada N dias
+
+        Args:
+            name (str): Nome do job
+            func (callable): Função a executar
+            time_str (str): Horário no formato HH:MM
+            days (int): Intervalo em dias (1 = diário, 7 = semanal)
+            overlap (str): Política para disparos durante uma execução em andamento
+
+        Returns:
+            ScheduledJob: Job agendado
+        """
+        hour, minute = (int(part) for part in time_str.split(':'))
+        now = datetime.now()
+        first_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if first_run <= now:
+            first_run += timedelta(days=1)
+        return self.add_job(name, func, timedelta(days=days), first_run=first_run, overlap=overlap)
+
+    def _run_job(self, job):
+        """
+        Executa um job (e as execuções acumuladas durante ele) em uma thread própria
+
+        Args:
+            job (ScheduledJob): Job a executar
+        """
+        while True:
+            started_at = time.monotonic()
+            job.stats['last_started_at'] = datetime.now().isoformat()
+            try:
+                result = job.func()
+                if result is False:
+                    job.stats['failures'] += 1
+            except Exception as e:
+                job.stats['failures'] += 1
+                logger.error(f"Erro durante a execução do job '{job.name}': {str(e)}")
+
+            duration = time.monotonic() - started_at
+            with self.lock:
+                job.stats['runs'] += 1
+                job.stats['last_duration'] = duration
+                if duration > job.period.total_seconds():
+                    job.stats['overruns'] += 1
+                    logger.warning(f"Job '{job.name}' levou {duration:.0f}s, mais que o intervalo de {job.period.total_seconds():.0f}s")
+
+                if not job.pending:
+                    job.running = False
+                    return
+                job.pending = False
+
+    def _fire(self, job):
+        """
+        Dispara um job, respeitando a política de sobreposição
+
+        Args:
+            job (ScheduledJob): Job a disparar
+        """
+        with self.lock:
+            if job.running:
+                if job.overlap == 'coalesce' and not job.pending:
+                    job.pending = True
+                    job.stats['coalesced'] += 1
+                    action = 'agrupado com a próxima execução'
+                else:
+                    job.stats['skipped'] += 1
+                    action = 'descartado'
+                logger.warning(f"Job '{job.name}' ainda em execução. Disparo {action}.")
+                return
+            job.running = True
+
+        threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.name}", daemon=True).start()
+
+    def run_forever(self):
+        """
+        Aguarda e dispara os jobs até stop() ser chamado
+        """
+        while not self.stopped.is_set():
+            with self.lock:
+                next_run = min((job.next_run for job in self.jobs), default=None)
+
+            timeout = None if next_run is None else max(0.0, (next_run - datetime.now()).total_seconds())
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+
+            now = datetime.now()
+            with self.lock:
+                due = [job for job in self.jobs if job.next_run <= now]
+                for job in due:
+                    missed = job.advance(now)
+                    if missed:
+                        job.stats['missed'] += missed
+                        logger.warning(f"Job '{job.name}' perdeu {missed} execuções")
+
+            for job in due:
+                if not self.stopped.is_set():
+                    self._fire(job)
+
+    def stop(self):
+        """
+        Interrompe o agendador
+        """
+        self.stopped.set()
+        self.wakeup.set()
+
+    def get_stats(self):
+        """
+        Obtém as estatísticas dos jobs
+
+        Returns:
+            dict: Estatísticas e próxima execução por job
+        """
+        with self.lock:
+            return {
+                job.name: dict(job.stats, next_run=job.next_run.isoformat(), running=job.running)
+                for job in self.jobs
+            }
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Diário de progresso do envio de leads
+Este script mantém um log append-only (JSONL) com a situação de cada lead de um arquivo,
+gravado com fsync em lotes, para permitir retomar um envio interrompido.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("send_journal")
+
+STARTED = 'started'
+SENT = 'sent'
+PARTIAL = 'partial'
+
+
+def journal_key(lead):
+    """
+    Obtém o identificador de um lead no diário
+
+    Args:
+        lead (dict): Lead no formato do Graph API
+
+    Returns:
+        str: ID do lead no Facebook ou hash do conteúdo
+    """
+    if lead.get('id'):
+        return str(lead['id'])
+    return hashlib.sha1(json.dumps(lead, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SendJournal:
+    """
+    Classe para registrar e reler o progresso do envio de um arquivo de leads
+    """
+
+    def __init__(self, journal_file, fsync_every=500, fsync_interval=1.0):
+        """
+        Inicializa o diário
+
+        Args:
+            journal_file (str): Caminho do arquivo do diário
+            fsync_every (int): Número de registros entre chamadas de fsync
+            fsync_interval (float): Tempo máximo (em segundos) entre chamadas de fsync
+        """
+        self.journal_file = journal_file
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.file = None
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def replay(self):
+        """
+        Relê o diário e obtém a última situação de cada lead
+
+        Returns:
+            dict: Situação (started/sent/partial) por identificador de lead
+        """
+        states = {}
+        if not os.path.exists(self.journal_file):
+            return states
+
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última linha incompleta de uma execução interrompida
+                    continue
+                states[record['lead']] = record['step']
+        return states
+
+    def open(self, resume=False):
+        """
+        Abre o diário para escrita
+
+        Args:
+            resume (bool): Mantém os registros existentes (senão o diário é recriado)
+        """
+        self.file = open(self.journal_file, 'a' if resume else 'w', encoding='utf-8')
+
+    def record(self, leads, step):
+        """
+        Registra a situação de um conjunto de leads
+
+        Args:
+            leads (list): Leads
+            step (str): Situação (started/sent/partial)
+        """
+        now = time.time()
+        lines = ''.join(json.dumps({'lead': journal_key(lead), 'step': step, 't': now}) + '\n' for lead in leads)
+        with self.lock:
+            self.file.write(lines)
+            self.file.flush()
+            self.unsynced += len(leads)
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.synced_at >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        """
+        Força a gravação do diário em disco
+        """
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def close(self):
+        """
+        Fecha o diário
+        """
+        with self.lock:
+            if self.file:
+                self._sync()
+                self.file.close()
+                self.file = None
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Armazenamento compacto dos leads extraídos
+Este script grava os leads de cada execução em um segmento JSONL comprimido (gzip ou zstd),
+dividido em blocos independentes, e mantém um índice SQLite com a posição de cada lead e o
+período coberto por cada segmento.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+
+from scripts.lead_cursors import parse_created_time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("snapshot_store")
+
+SEGMENT_EXTENSIONS = {'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+
+def _compress(data, compression, level):
+    """
+    Comprime um bloco de leads
+
+    Args:
+        data (bytes): Linhas JSONL do bloco
+        compression (str): 'gzip' ou 'zstd'
+        level (int): Nível de compressão
+
+    Returns:
+        bytes: Bloco comprimido (um membro gzip ou um frame zstd)
+    """
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(data, compression):
+    """
+    Descomprime um bloco de leads
+
+    Args:
+        data (bytes): Bloco comprimido
+        compression (str): 'gzip' ou 'zstd'
+
+    Returns:
+        bytes: Linhas JSONL do bloco
+    """
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, 31)
+
+
+class SegmentWriter:
+    """
+    Classe para gravar um segmento, bloco a bloco
+    """
+
+    def __init__(self, store, name, path, compression, level, block_size, created_at=None, previous=None):
+        """
+        Inicializa o gravador (use SnapshotStore.open_segment())
+
+        Args:
+            store (SnapshotStore): Armazenamento do segmento
+            name (str): Nome do segmento
+            path (str): Caminho do arquivo do segmento
+            compression (str): 'gzip' ou 'zstd'
+            level (int): Nível de compressão
+            block_size (int): Número máximo de leads por bloco
+            created_at (float): Data do segmento para a retenção (padrão: agora)
+            previous (tuple): (created_at, min_time, max_time, lead_count) do segmento registrado
+                ao qual os novos blocos são acrescentados (padrão: o arquivo é recriado)
+        """
+        self.store = store
+        self.name = name
+        self.path = path
+        self.compression = compression
+        self.level = level
+        self.block_size = block_size
+        self.created_at = created_at or time.time()
+        self.count = 0
+        self.min_time = None
+        self.max_time = None
+        if previous:
+            self.created_at, self.min_time, self.max_time, self.count = previous
+        # No modo 'ab' a posição inicial é o fim do arquivo; bytes gravados e não registrados
+        # (ex: interrupção antes de close()) ficam fora dos blocos do índice
+        self.file = open(path, 'ab' if previous else 'wb')
+        self.offset = self.file.tell()
+        self.blocks = []
+        self.positions = []
+
+    def write(self, leads):
+        """
+        Grava leads no segmento (cada chamada gera um ou mais blocos)
+
+        Args:
+            leads (list): Leads no formato do Graph API
+        """
+        for start in range(0, len(leads), self.block_size):
+            block = leads[start:start + self.block_size]
+            data = ''.join(json.dumps(lead, ensure_ascii=False) + '\n' for lead in block).encode('utf-8')
+            compressed = _compress(data, self.compression, self.level)
+            self.file.write(compressed)
+
+            self.blocks.append((self.name, self.offset, len(compressed), len(block)))
+            for line, lead in enumerate(block):
+                if lead.get('id'):
+                    self.positions.append((str(lead['id']), self.name, self.offset, line))
+
+                created_time = parse_created_time(lead.get('created_time'))
+                if created_time:
+                    timestamp = created_time.timestamp()
+                    self.min_time = timestamp if self.min_time is None else min(self.min_time, timestamp)
+                    self.max_time = timestamp if self.max_time is None else max(self.max_time, timestamp)
+
+            self.offset += len(compressed)
+            self.count += len(block)
+        self.file.flush()
+
+    def close(self):
+        """
+        Fecha o segmento e registra seus blocos e leads no índice
+
+        Returns:
+            str: Caminho do segmento ou None se nenhum lead foi gravado
+        """
+        self.file.close()
+        if not self.count:
+            os.remove(self.path)
+            return None
+
+        if self.blocks:
+            self.store._register(self)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SnapshotStore:
+    """
+    Classe para gravar, consultar e expirar os segmentos de leads
+    """
+
+    def __init__(self, store_dir, compression='gzip', level=None, block_size=500):
+        """
+        Inicializa o armazenamento
+
+        Args:
+            store_dir (str): Diretório dos segmentos e do índice
+            compression (str): 'gzip' ou 'zstd' (requer o pacote zstandard)
+            level (int): Nível de compressão (padrão: 6 para gzip, 3 para zstd)
+            block_size (int): Número máximo de leads por bloco comprimido
+        """
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("Pacote zstandard não instalado. Usando compressão gzip.")
+            compression = 'gzip'
+        if compression not in SEGMENT_EXTENSIONS:
+            raise ValueError(f"Compressão não suportada: {compression}")
+
+        self.store_dir = store_dir
+        self.compression = compression
+        self.level = level if level is not None else (3 if compression == 'zstd' else 6)
+        self.block_size = max(1, block_size)
+        os.makedirs(store_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(store_dir, 'index.sqlite3'), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS segments (
+                name TEXT PRIMARY KEY,
+                compression TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                min_time REAL,
+                max_time REAL,
+                lead_count INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_segments_created_at ON segments (created_at);
+            CREATE TABLE IF NOT EXISTS blocks (
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                lead_count INTEGER NOT NULL,
+                PRIMARY KEY (segment, offset)
+            );
+            CREATE TABLE IF NOT EXISTS leads (
+                lead_id TEXT PRIMARY KEY,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                line INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_leads_segment ON leads (segment);
+        """)
+        self.connection.commit()
+
+    def is_segment(self, path):
+        """
+        Verifica se um caminho é um segmento do armazenamento
+
+        Args:
+            path (str): Caminho do arquivo
+
+        Returns:
+            bool: True se o arquivo é um segmento deste diretório
+        """
+        return (
+            os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.store_dir)
+            and path.endswith(tuple(SEGMENT_EXTENSIONS.values()))
+        )
+
+    def open_segment(self, name, created_at=None):
+        """
+        Cria um novo segmento
+
+        Args:
+            name (str): Nome base do segmento (ex: facebook_leads_20240501_120000)
+            created_at (float): Data do segmento para a retenção (padrão: agora)
+
+        Returns:
+            SegmentWriter: Gravador do segmento
+        """
+        name = name + SEGMENT_EXTENSIONS[self.compression]
+        path = os.path.join(self.store_dir, name)
+        return SegmentWriter(self, name, path, self.compression, self.level, self.block_size, created_at)
+
+    def write_segment(self, name, leads, created_at=None):
+        """
+        Grava uma lista de leads em um novo segmento
+
+        Args:
+            name (str): Nome base do segmento
+            leads (list): Leads no formato do Graph API
+            created_at (float): Data do segmento para a retenção (padrão: agora)
+
+        Returns:
+            str: Caminho do segmento ou None se a lista estiver vazia
+        """
+        writer = self.open_segment(name, created_at)
+        writer.write(leads)
+        return writer.close()
+
+    def append_segment(self, name, leads):
+        """
+        Acrescenta leads a um segmento, criando-o se ainda não existir (ex: um segmento por
+        hora para os leads recebidos por webhook). Os novos blocos são registrados no índice
+        a cada chamada.
+
+        Args:
+            name (str): Nome base do segmento
+            leads (list): Leads no formato do Graph API
+
+        Returns:
+            str: Caminho do segmento ou None se o segmento não existir e a lista estiver vazia
+        """
+        name = name + SEGMENT_EXTENSIONS[self.compression]
+        path = os.path.join(self.store_dir, name)
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT created_at, min_time, max_time, lead_count FROM segments WHERE name = ?", (name,)
+            ).fetchone()
+        writer = SegmentWriter(self, name, path, self.compression, self.level, self.block_size, previous=previous)
+        writer.write(leads)
+        return writer.close()
+
+    def _register(self, writer):
+        """
+        Registra no índice os blocos e leads de um segmento gravado
+
+        Args:
+            writer (SegmentWriter): Gravador do segmento
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (writer.name, writer.compression, writer.created_at, writer.min_time, writer.max_time, writer.count, writer.offset)
+            )
+            self.connection.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)", writer.blocks)
+            self.connection.executemany("INSERT OR REPLACE INTO leads VALUES (?, ?, ?, ?)", writer.positions)
+            self.connection.commit()
+
+    def _read_block(self, f, offset, length, compression):
+        """
+        Lê e descomprime um bloco de um segmento aberto
+
+        Args:
+            f (file): Arquivo do segmento (modo binário)
+            offset (int): Posição do bloco no arquivo
+            length (int): Tamanho do bloco comprimido
+            compression (str): 'gzip' ou 'zstd'
+
+        Returns:
+            list: Linhas JSONL do bloco
+        """
+        f.seek(offset)
+        text = _decompress(f.read(length), compression).decode('utf-8')
+        # Somente '\n' separa os leads: splitlines() também quebraria em U+2028, U+2029 e U+0085,
+        # que o json.dumps(ensure_ascii=False) grava sem escapar
+        return text.rstrip('\n').split('\n')
+
+    def read_segment(self, path):
+        """
+        Lê os leads de um segmento, bloco a bloco
+
+        Args:
+            path (str): Caminho ou nome do segmento
+
+        Yields:
+            dict: Lead
+        """
+        name = os.path.basename(path)
+        with self.lock:
+            segment = self.connection.execute("SELECT compression FROM segments WHERE name = ?", (name,)).fetchone()
+            blocks = self.connection.execute(
+                "SELECT offset, length FROM blocks WHERE segment = ? ORDER BY offset", (name,)
+            ).fetchall()
+        if not segment:
+            raise FileNotFoundError(f"Segmento não encontrado no índice: {name}")
+
+        with open(os.path.join(self.store_dir, name), 'rb') as f:
+            for offset, length in blocks:
+                for line in self._read_block(f, offset, length, segment[0]):
+                    yield json.loads(line)
+
+    def iter_leads(self, since=None, until=None):
+        """
+        Lê os leads de todos os segmentos, pulando os segmentos fora do período
+
+        Args:
+            since (datetime): Data mínima de criação dos leads (opcional)
+            until (datetime): Data máxima de criação dos leads (opcional)
+
+        Yields:
+            dict: Lead
+        """
+        since_ts = since.timestamp() if since else None
+        until_ts = until.timestamp() if until else None
+        for name, min_time, max_time in self.list_segments():
+            if since_ts is not None and max_time is not None and max_time < since_ts:
+                continue
+            if until_ts is not None and min_time is not None and min_time > until_ts:
+                continue
+
+            for lead in self.read_segment(name):
+                created_time = parse_created_time(lead.get('created_time'))
+                if created_time and since_ts is not None and created_time.timestamp() < since_ts:
+                    continue
+                if created_time and until_ts is not None and created_time.timestamp() > until_ts:
+                    continue
+                yield lead
+
+    def list_segments(self):
+        """
+        Lista os segmentos em ordem de gravação
+
+        Returns:
+            list: Tuplas (nome, menor created_time, maior created_time) em timestamp Unix
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT name, min_time, max_time FROM segments ORDER BY created_at"
+            ).fetchall()
+
+    def get(self, lead_id):
+        """
+        Busca um lead pelo ID, lendo apenas o bloco que o contém
+
+        Args:
+            lead_id (str): ID do lead no Facebook
+
+        Returns:
+            tuple: (lead, caminho do segmento) ou None se o lead não estiver no armazenamento
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT l.segment, l.offset, l.line, b.length, s.compression FROM leads l "
+                "JOIN blocks b ON b.segment = l.segment AND b.offset = l.offset "
+                "JOIN segments s ON s.name = l.segment WHERE l.lead_id = ?",
+                (str(lead_id),)
+            ).fetchone()
+        if not row:
+            return None
+
+        segment, offset, line, length, compression = row
+        path = os.path.join(self.store_dir, segment)
+        with open(path, 'rb') as f:
+            lines = self._read_block(f, offset, length, compression)
+        return json.loads(lines[line]), path
+
+    def evict(self, keep_days):
+        """
+        Remove os segmentos gravados antes do período de retenção
+
+        Args:
+            keep_days (int): Número de dias para manter os segmentos
+
+        Returns:
+            list: Caminhos dos segmentos removidos
+        """
+        cutoff = time.time() - keep_days * 86400
+        with self.lock:
+            names = [row[0] for row in self.connection.execute(
+                "SELECT name FROM segments WHERE created_at < ?", (cutoff,)
+            )]
+            for name in names:
+                self.connection.execute("DELETE FROM leads WHERE segment = ?", (name,))
+                self.connection.execute("DELETE FROM blocks WHERE segment = ?", (name,))
+                self.connection.execute("DELETE FROM segments WHERE name = ?", (name,))
+            self.connection.commit()
+
+        paths = [os.path.join(self.store_dir, name) for name in names]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+            logger.info(f"Segmento antigo removido: {path}")
+        return paths
+
+    def close(self):
+        """
+        Fecha a conexão com o índice
+        """
+        with self.lock:
+            self.connection.close()